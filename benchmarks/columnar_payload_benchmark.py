@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON rows vs columnar MessagePack/Arrow payloads for bar data
+Encodes the same daily_aggregates page as the JSON body the API returns by
+default and as each available columnar format, then reports raw and gzip
+size plus encode and decode time (decode rebuilds usable columns, like a chart
+client would).
+
+Usage:
+    python benchmarks/columnar_payload_benchmark.py --rows 10000 100000
+"""
+
+import os
+import sys
+import gzip
+import time
+import random
+import argparse
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import fast_json  # noqa: E402
+import columnar_format  # noqa: E402
+
+COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume', 'vwap', 'transactions', 'created_at']
+
+def make_rows(count: int):
+    """Rows as fetch_page returns them (floats, ISO dates and datetime timestamps)"""
+    tickers = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'NVDA', 'META', 'NFLX']
+    start = date(2000, 1, 1)
+    loaded_at = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    rows = []
+    for i in range(count):
+        price = round(100 + random.random() * 50, 4)
+        rows.append({
+            'ticker': tickers[i % len(tickers)],
+            'date': (start + timedelta(days=i // len(tickers))).isoformat(),
+            'open': price, 'high': round(price * 1.01, 4), 'low': round(price * 0.99, 4),
+            'close': round(price * 1.002, 4), 'volume': random.randint(10 ** 6, 10 ** 8),
+            'vwap': price, 'transactions': random.randint(1000, 90000),
+            'created_at': loaded_at + timedelta(milliseconds=i)
+        })
+    return rows
+
+def decode_json(body):
+    rows = fast_json.loads(body)['data']
+    return {column: [row[column] for row in rows] for column in COLUMNS}
+
+def decode_msgpack(body):
+    payload = columnar_format.msgpack.unpackb(body, raw=False)
+    columns = {}
+    for column in payload['columns']:
+        kind, data = payload['types'][column], payload['data'][column]
+        if kind == 'list':
+            columns[column] = data
+        else:
+            values = array('d' if kind == 'f64' else 'q')
+            values.frombytes(data)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            columns[column] = values
+    return columns
+
+def decode_arrow(body):
+    return columnar_format.pyarrow.ipc.open_stream(body).read_all()
+
+def time_it(fn, repeat: int):
+    """Median seconds and the last result"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON vs columnar payloads for bar data')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    formats = [('json', lambda rows: fast_json.dumps_bytes({'success': True, 'data': rows}), decode_json)]
+    if columnar_format.msgpack is not None:
+        formats.append(('msgpack', lambda rows: columnar_format.encode_columnar(rows, COLUMNS, 'msgpack')[0],
+                        decode_msgpack))
+    if columnar_format.pyarrow is not None:
+        formats.append(('arrow', lambda rows: columnar_format.encode_columnar(rows, COLUMNS, 'arrow')[0],
+                        decode_arrow))
+    missing = {'msgpack', 'arrow'} - {name for name, _, _ in formats}
+    if missing:
+        print(f"Not installed, skipped: {', '.join(sorted(missing))}")
+
+    for count in args.rows:
+        rows = make_rows(count)
+        print(f"{count} rows:")
+        for name, encode, decode in formats:
+            encode_time, body = time_it(lambda: encode(rows), args.repeat)
+            decode_time, _ = time_it(lambda: decode(body), args.repeat)
+            print(f"  {name:8s} {len(body) / 1024:9.1f} KiB  gzip {len(gzip.compress(body)) / 1024:8.1f} KiB  "
+                  f"encode {encode_time * 1000:7.1f}ms  decode {decode_time * 1000:7.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-value conversion + json vs parse-time typecasting + fast_json
+Builds daily_aggregates rows from the text Postgres sends and times the whole
+path to a JSON body three ways: the original Decimal/date rows converted value
+by value and serialized with the json module, rows typecast while parsing
+(as register_json_typecasters does) with the json fallback, and the same with
+orjson when it is installed.
+
+Usage:
+    python benchmarks/json_serialization_benchmark.py --rows 10000 --repeat 20
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import date, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import fast_json  # noqa: E402
+
+COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume', 'vwap', 'transactions']
+NUMERIC_COLUMNS = {'open', 'high', 'low', 'close', 'vwap'}
+
+def wire_rows(count: int):
+    """Rows as the text values psycopg2 receives from Postgres"""
+    tickers = ['AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'NVDA', 'META', 'NFLX']
+    start = date(2020, 1, 1)
+    rows = []
+    for i in range(count):
+        price = 100 + random.random() * 50
+        rows.append({
+            'ticker': tickers[i % len(tickers)],
+            'date': (start + timedelta(days=i // len(tickers))).isoformat(),
+            'open': f"{price:.4f}", 'high': f"{price * 1.01:.4f}", 'low': f"{price * 0.99:.4f}",
+            'close': f"{price * 1.002:.4f}", 'volume': str(random.randint(10 ** 6, 10 ** 8)),
+            'vwap': f"{price:.4f}", 'transactions': str(random.randint(1000, 90000))
+        })
+    return rows
+
+def parse_default(raw):
+    """What psycopg2 returns by default: Decimal and date objects"""
+    return [{column: (Decimal(value) if column in NUMERIC_COLUMNS else
+                      date.fromisoformat(value) if column == 'date' else
+                      int(value) if column in ('volume', 'transactions') else value)
+             for column, value in row.items()} for row in raw]
+
+def parse_typecast(raw):
+    """What register_json_typecasters returns: floats and ISO date text"""
+    return [{column: (float(value) if column in NUMERIC_COLUMNS else
+                      int(value) if column in ('volume', 'transactions') else value)
+             for column, value in row.items()} for row in raw]
+
+def baseline(raw):
+    """Original path: Decimal/date rows, per-value isinstance conversion, json.dumps"""
+    data = []
+    for row in parse_default(raw):
+        row_dict = {}
+        for key, value in row.items():
+            if isinstance(value, Decimal):
+                row_dict[key] = float(value)
+            elif hasattr(value, 'isoformat'):
+                row_dict[key] = value.isoformat()
+            else:
+                row_dict[key] = value
+        data.append(row_dict)
+    return json.dumps({'success': True, 'data': data}, separators=(',', ':')).encode()
+
+def typecast_json(raw):
+    """Parse-time typecasting, fast_json with the json module fallback"""
+    backend, fast_json.orjson = fast_json.orjson, None
+    try:
+        return fast_json.dumps_bytes({'success': True, 'data': parse_typecast(raw)})
+    finally:
+        fast_json.orjson = backend
+
+def typecast_orjson(raw):
+    """Parse-time typecasting, fast_json with orjson"""
+    return fast_json.dumps_bytes({'success': True, 'data': parse_typecast(raw)})
+
+def time_it(fn, raw, repeat: int):
+    """Best and median wall time over repeat runs, plus the body size"""
+    timings = []
+    body = b''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(raw)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2], len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization of daily_aggregates rows')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    raw = wire_rows(args.rows)
+    strategies = [('Decimal rows + per-value loop + json', baseline),
+                  ('typecast rows + json fallback', typecast_json)]
+    if fast_json.orjson is not None:
+        strategies.append(('typecast rows + orjson', typecast_orjson))
+    else:
+        print("orjson is not installed; skipping the orjson strategy")
+
+    reference = None
+    for name, fn in strategies:
+        best, median, size = time_it(fn, raw, args.repeat)
+        reference = reference or median
+        print(f"{name:40s} best {best * 1000:7.2f}ms  median {median * 1000:7.2f}ms  "
+              f"{size / 1024:7.1f} KiB  {reference / median:5.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: KEYS + per-key HGETALL vs SCAN + pipelined HGETALL
+Populates a keyspace of stock hashes under a benchmark prefix, then times both
+read strategies against it. Point it at a disposable Redis database.
+
+Usage:
+    python benchmarks/redis_read_benchmark.py --url redis://localhost:6379/0 --keys 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+import redis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from redis_stock_store import read_key_families  # noqa: E402
+
+def populate(client, prefix: str, total_keys: int, batch_size: int = 1000):
+    """Write total_keys stock hashes spread over the latest/crash/surge families"""
+    families = ['latest', 'live:crash', 'live:surge']
+    pipe = client.pipeline(transaction=False)
+    for i in range(total_keys):
+        family = families[i % len(families)]
+        pipe.hset(f"{prefix}{family}:T{i:06d}", mapping={
+            'ticker': f"T{i:06d}",
+            'close': 100.0 + i % 50,
+            'volume': 1000000 + i,
+            'price_change_percent': round((i % 200 - 100) / 10, 2)
+        })
+        if (i + 1) % batch_size == 0:
+            pipe.execute()
+    pipe.execute()
+
+def cleanup(client, prefix: str):
+    """Delete every benchmark key"""
+    pipe = client.pipeline(transaction=False)
+    for i, key in enumerate(client.scan_iter(match=f"{prefix}*", count=1000)):
+        pipe.unlink(key)
+        if (i + 1) % 1000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+def keys_baseline(client, patterns, limit):
+    """The original approach: KEYS per family, then one HGETALL round trip per key"""
+    all_keys = []
+    for pattern in patterns:
+        all_keys += client.keys(pattern)
+    rows = 0
+    for key in all_keys[:limit]:
+        if client.hgetall(key):
+            rows += 1
+    return len(all_keys), rows
+
+def scan_pipeline(client, families, page_size):
+    """The new approach: SCAN per family and pipelined HGETALL, page by page"""
+    cursor = None
+    rows = 0
+    pages = 0
+    while True:
+        page = read_key_families(client, families, cursor=cursor, page_size=page_size)
+        rows += len(page['items'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return rows, pages
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Redis stock read strategies')
+    parser.add_argument('--url', default=os.getenv('BENCH_REDIS_URL', 'redis://localhost:6379/0'))
+    parser.add_argument('--keys', type=int, default=100000, help='Keys to populate')
+    parser.add_argument('--page-size', type=int, default=1000, help='Keys per page for SCAN reads')
+    parser.add_argument('--baseline-limit', type=int, default=None,
+                        help='Cap on per-key HGETALLs in the baseline (it is slow over WAN)')
+    parser.add_argument('--prefix', default='bench:')
+    parser.add_argument('--keep', action='store_true', help='Keep benchmark keys afterwards')
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.url, decode_responses=True)
+    patterns = [f"{args.prefix}latest:*", f"{args.prefix}live:crash:*", f"{args.prefix}live:surge:*"]
+    families = list(zip(['latest', 'crash', 'surge'], patterns))
+
+    print(f"Populating {args.keys} keys under '{args.prefix}'...")
+    populate(client, args.prefix, args.keys)
+
+    try:
+        limit = args.baseline_limit or args.keys
+        start = time.perf_counter()
+        total_keys, rows = keys_baseline(client, patterns, limit)
+        baseline = time.perf_counter() - start
+        per_key = baseline / max(rows, 1)
+        print(f"KEYS + HGETALL:     {rows} hashes of {total_keys} keys in {baseline:.2f}s "
+              f"({per_key * 1000:.3f} ms/key, projected {per_key * total_keys:.2f}s for all)")
+
+        start = time.perf_counter()
+        rows, pages = scan_pipeline(client, families, args.page_size)
+        scanned = time.perf_counter() - start
+        print(f"SCAN + pipelines:   {rows} hashes in {pages} pages in {scanned:.2f}s "
+              f"({scanned / max(rows, 1) * 1000:.3f} ms/key)")
+    finally:
+        if not args.keep:
+            cleanup(client, args.prefix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ticker search index latency
+Builds the /api/data/tickers?q= index over a synthetic stock_tickers universe
+and times prefix, company-name and one-typo queries against it, next to the
+old approach of filtering the whole table on every request.
+
+Usage:
+    python benchmarks/ticker_search_benchmark.py --tickers 5000 50000
+"""
+
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ticker_search import TickerIndex  # noqa: E402
+
+NAME_WORDS = ['Apple', 'Micro', 'Systems', 'Global', 'Energy', 'Pharma', 'Bank', 'Holdings', 'Capital',
+              'Technologies', 'Motors', 'Foods', 'Networks', 'Industries', 'Resources', 'Therapeutics',
+              'Financial', 'Semiconductor', 'Airlines', 'Entertainment', 'Software', 'Mining']
+SUFFIXES = ['Inc', 'Corp', 'Ltd', 'Group', 'Co', 'PLC']
+QUERIES = ['A', 'AP', 'MSF', 'apple', 'semicond', 'global bank', 'technolgies', 'phrama', 'ZZZZZ']
+
+def make_rows(count: int):
+    """Rows shaped like SELECT ... FROM stock_tickers"""
+    rows = {}
+    while len(rows) < count:
+        ticker = ''.join(random.choices(string.ascii_uppercase, k=random.randint(1, 5)))
+        name = ' '.join(random.sample(NAME_WORDS, random.randint(1, 3)) + [random.choice(SUFFIXES)])
+        rows[ticker] = {'ticker': ticker, 'name': name, 'active': random.random() > 0.1, 'market': 'stocks',
+                        'locale': 'us', 'primary_exchange': 'XNAS', 'type': 'CS', 'currency_name': 'usd',
+                        'created_at': None, 'updated_at': None}
+    return list(rows.values())
+
+def scan(rows, query: str, limit: int = 10):
+    """What a client-side filter over the full table does"""
+    query = query.lower()
+    return [row for row in rows if query in row['ticker'].lower() or query in row['name'].lower()][:limit]
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ticker search index')
+    parser.add_argument('--tickers', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    for count in args.tickers:
+        rows = make_rows(count)
+        start = time.perf_counter()
+        index = TickerIndex(rows)
+        print(f"{count} tickers: index built in {(time.perf_counter() - start) * 1000:.0f}ms")
+        for query in QUERIES:
+            results = index.search(query)
+            indexed = median_ms(lambda: index.search(query), args.repeat)
+            scanned = median_ms(lambda: scan(rows, query), max(args.repeat // 10, 3))
+            top = ', '.join(f"{row['ticker']}({row['match']})" for row in results[:3])
+            print(f"  {query!r:15s} index {indexed:6.3f}ms  full scan {scanned:7.2f}ms  {len(results):2d} hits  {top}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Server-side downsampling of price histories for charts
+A chart needs at most one point per horizontal pixel, so long histories are
+reduced before they are sent: close-price lines with Largest-Triangle-Three-
+Buckets (keeps the peaks and troughs that define the line's shape) and
+candles by merging consecutive bars into OHLCV buckets (first open, highest
+high, lowest low, last close, summed volume). Both run on NumPy arrays.
+"""
+
+import numpy as np
+from datetime import date, timedelta
+from typing import Dict, Optional, Any
+import psycopg2.extensions
+from fast_json import register_json_typecasters
+
+MAX_CHART_POINTS = 5000
+
+# Bar tables a chart can read, with their time column as epoch milliseconds
+CHART_SOURCES = {
+    'day': ('daily_aggregates', "(EXTRACT(EPOCH FROM date) * 1000)::BIGINT", 'date'),
+    'minute': ('minute_aggregates', '"timestamp"', 'datetime')
+}
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket.
+
+    Returns:
+        Indices of the points to keep, ascending
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the triangle's third corner
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+def ohlc_buckets(bars: np.ndarray, buckets: int) -> Dict[str, np.ndarray]:
+    """
+    Merge consecutive bars into at most `buckets` OHLCV candles
+
+    Args:
+        bars: Array of rows (time, open, high, low, close, volume) in time order
+
+    Returns:
+        Columns time (bucket start), open, high, low, close, volume
+    """
+    n = len(bars)
+    if n == 0:
+        return {name: bars[:, 0] for name in ('time', 'open', 'high', 'low', 'close', 'volume')}
+    buckets = max(1, min(buckets, n))
+    starts = np.unique(np.linspace(0, n, buckets, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], n) - 1
+    return {
+        'time': bars[starts, 0],
+        'open': bars[starts, 1],
+        'high': np.fmax.reduceat(bars[:, 2], starts),
+        'low': np.fmin.reduceat(bars[:, 3], starts),
+        'close': bars[ends, 4],
+        'volume': np.add.reduceat(np.nan_to_num(bars[:, 5]), starts)
+    }
+
+def load_bars(conn, ticker: str, interval: str, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+    """
+    Read a ticker's bars in time order as a float array (time ms, open, high, low, close, volume)
+
+    Args:
+        interval: 'day' or 'minute' (see CHART_SOURCES)
+        start, end: Inclusive date bounds (end covers its whole day of minute bars)
+    """
+    table, time_expr, time_column = CHART_SOURCES[interval]
+    query = f"SELECT {time_expr}, open, high, low, close, volume FROM {table} WHERE ticker = %s AND close IS NOT NULL"
+    params = [ticker]
+    if start:
+        query += f" AND {time_column} >= %s"
+        params.append(start)
+    if end:
+        query += f" AND {time_column} < %s"
+        params.append(end + timedelta(days=1))
+    query += f" ORDER BY {time_column}"
+
+    # Plain tuple rows with NUMERIC parsed straight to float; NULL prices become NaN
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        register_json_typecasters(cur)
+        cur.execute(query, params)
+        rows = cur.fetchall()
+    return np.array(rows, dtype=np.float64).reshape(len(rows), 6)
+
+def downsample_chart(bars: np.ndarray, width: int, kind: str = 'line') -> Dict[str, Any]:
+    """
+    Reduce bars to at most `width` points
+
+    Args:
+        bars: Output of load_bars
+        width: Points wanted, normally the chart's width in pixels
+        kind: 'line' (LTTB over close) or 'ohlc' (merged candles)
+
+    Returns:
+        Columnar data {'time': [...], 'close': [...]} for lines, plus open,
+        high, low and volume for candles (NaN becomes None)
+    """
+    width = max(3, min(width, MAX_CHART_POINTS))
+    if kind == 'ohlc':
+        columns = ohlc_buckets(bars, width)
+    else:
+        kept = lttb(bars[:, 0], bars[:, 4], width)
+        columns = {'time': bars[kept, 0], 'close': bars[kept, 4]}
+
+    data = {}
+    for name, values in columns.items():
+        if name in ('time', 'volume'):
+            data[name] = values.astype(np.int64).tolist()
+        else:
+            data[name] = [None if np.isnan(value) else value for value in values.tolist()]
+    return data
@@ -0,0 +1,129 @@
+"""
+Columnar binary payloads for bulk bar data
+Instead of a JSON array of objects that repeats every key in every row, bars
+are sent column by column: MessagePack with numeric columns packed as
+little-endian float64/int64 arrays (a client reads them straight into a
+Float64Array/BigInt64Array) and timestamps as int64 epoch milliseconds, or an
+Arrow IPC stream when pyarrow is installed.
+Clients opt in through the Accept header; JSON stays the default.
+"""
+
+import sys
+from array import array
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple, Any
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+def available_formats() -> Dict[str, str]:
+    """Formats this process can produce, JSON first, by name -> mimetype"""
+    formats = {'json': JSON_MIMETYPE}
+    if msgpack is not None:
+        formats['msgpack'] = MSGPACK_MIMETYPE
+    if pyarrow is not None:
+        formats['arrow'] = ARROW_MIMETYPE
+    return formats
+
+def negotiate_format(accept) -> str:
+    """
+    Pick the response format for a request's Accept header
+
+    Args:
+        accept: request.accept_mimetypes
+
+    Returns:
+        'json', 'msgpack' or 'arrow'; JSON wins ties and wildcards
+    """
+    by_mimetype = {mimetype: name for name, mimetype in available_formats().items()}
+    return by_mimetype[accept.best_match(list(by_mimetype), default=JSON_MIMETYPE)]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def timestamp_ms(value: datetime) -> int:
+    """Epoch milliseconds of a datetime; naive values are taken as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+def pack_int64(values: List[int]) -> bytes:
+    """Little-endian int64 array"""
+    packed = array('q', values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+def pack_column(values: List[Any]) -> Tuple[str, Any]:
+    """
+    Pack a column as a little-endian int64/float64 array when every value fits
+
+    Returns:
+        ('i64' | 'f64' | 'ts_ms', bytes) or ('list', values) for text, dates and
+        columns with nulls; ts_ms holds timestamps as epoch milliseconds, and
+        timestamps in a list column are ISO text (MessagePack has no datetime type)
+    """
+    if values and all(isinstance(value, datetime) for value in values):
+        return 'ts_ms', pack_int64([timestamp_ms(value) for value in values])
+    for typecode, name in (('q', 'i64'), ('d', 'f64')):
+        try:
+            packed = array(typecode, values)
+        except (TypeError, OverflowError):
+            continue
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return name, packed.tobytes()
+    return 'list', [value.isoformat() if isinstance(value, (date, time)) else value for value in values]
+
+def encode_msgpack(rows: List[Dict[str, Any]], columns: List[str], meta: Dict[str, Any]) -> bytes:
+    """
+    MessagePack map {'rows', 'columns', 'types', 'data', **meta} where data holds
+    one packed column per name
+    """
+    types = {}
+    data = {}
+    for column in columns:
+        types[column], data[column] = pack_column([row[column] for row in rows])
+    payload = dict(meta, rows=len(rows), columns=columns, types=types, data=data)
+    return msgpack.packb(payload, use_bin_type=True)
+
+def encode_arrow(rows: List[Dict[str, Any]], columns: List[str], meta: Dict[str, Any]) -> bytes:
+    """Arrow IPC stream of one record batch; meta goes in the schema metadata"""
+    table = pyarrow.table({column: [row[column] for row in rows] for column in columns})
+    table = table.replace_schema_metadata({key: str(value) for key, value in meta.items() if value is not None})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def encode_columnar(rows: List[Dict[str, Any]], columns: List[str], fmt: str,
+                    meta: Optional[Dict[str, Any]] = None) -> Tuple[bytes, str]:
+    """
+    Encode dict rows as a columnar payload
+
+    Args:
+        rows: Rows with JSON-ready values (see fast_json.register_json_typecasters)
+        columns: Column order
+        fmt: 'msgpack' or 'arrow'
+        meta: Extra top-level fields, e.g. next_cursor
+
+    Returns:
+        (body, mimetype)
+    """
+    meta = meta or {}
+    if fmt == 'msgpack':
+        return encode_msgpack(rows, columns, meta), MSGPACK_MIMETYPE
+    if fmt == 'arrow':
+        return encode_arrow(rows, columns, meta), ARROW_MIMETYPE
+    raise ValueError(f"Unsupported columnar format: {fmt}")
@@ -144,6 +144,9 @@ CREATE TABLE IF NOT EXISTS "data_fetch_log" (
 -- Create indexes for better performance
 \echo 'Creating indexes...'
 CREATE INDEX IF NOT EXISTS "idx_daily_aggregates_ticker_date" ON "daily_aggregates"("ticker", "date");
+CREATE INDEX IF NOT EXISTS "idx_daily_aggregates_updated_at" ON "daily_aggregates"("updated_at");
+-- Keyset pagination in (date DESC, ticker) order; ticker-filtered pages use the (ticker, date) unique index
+CREATE INDEX IF NOT EXISTS "idx_daily_aggregates_date_ticker" ON "daily_aggregates"("date" DESC, "ticker");
 CREATE INDEX IF NOT EXISTS "idx_minute_aggregates_ticker_datetime" ON "minute_aggregates"("ticker", "datetime");
 CREATE INDEX IF NOT EXISTS "idx_trades_ticker_datetime" ON "trades"("ticker", "datetime");
 CREATE INDEX IF NOT EXISTS "idx_quotes_ticker_datetime" ON "quotes"("ticker", "datetime");
@@ -0,0 +1,100 @@
+"""
+Streaming NDJSON/CSV export of daily_aggregates
+Rows are read through a named (server-side) cursor a batch at a time and each
+batch is written out as soon as it arrives, so memory stays constant however
+long the history is and the download starts with the first batch. NUMERIC and
+DATE values are converted while psycopg2 parses them (see fast_json) instead
+of in a per-row Python loop afterwards. An export keeps its pooled connection
+until the download ends, so ExportLimiter caps how many run at once.
+"""
+
+import io
+import csv
+import uuid
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Any
+import psycopg2.extensions
+from polygon_config import config
+from daily_aggregates_query import build_where
+from fast_json import dumps_bytes, register_json_typecasters
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def export_format(value: str) -> str:
+    """Validate a format query parameter (default ndjson)"""
+    value = (value or 'ndjson').lower()
+    if value not in EXPORT_MIMETYPES:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_MIMETYPES)}")
+    return value
+
+class ExportLimiter:
+    """Caps concurrent exports so downloads never hold every pooled connection"""
+
+    def __init__(self, max_exports: Optional[int] = None):
+        """
+        Args:
+            max_exports: Exports streaming at once (default EXPORT_MAX_CONCURRENT)
+        """
+        self.max_exports = max_exports or config.export_max_concurrent
+        # Created on first use so the lock is the (possibly green) one in place by then
+        self.slots: Optional[threading.BoundedSemaphore] = None
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take an export slot without waiting; False when all are in use"""
+        with self.lock:
+            if self.slots is None:
+                self.slots = threading.BoundedSemaphore(self.max_exports)
+        return self.slots.acquire(blocking=False)
+
+    def release(self):
+        """Give a slot back once its download has ended (e.g. response.call_on_close)"""
+        self.slots.release()
+
+def encode_ndjson(columns: List[str], rows: List[tuple]) -> bytes:
+    """One JSON object per line"""
+    return b''.join(dumps_bytes(dict(zip(columns, row))) + b'\n' for row in rows)
+
+def encode_csv(rows: List[tuple]) -> bytes:
+    """CSV lines for a batch"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+def stream_export(connection: Callable, columns: List[str], filters: Dict[str, Any], fmt: str,
+                  batch_size: int = None) -> Iterator[bytes]:
+    """
+    Yield an export of daily_aggregates in (date DESC, ticker) order, one chunk per batch
+
+    Args:
+        connection: Returns a connection context manager, e.g. DatabasePool.connection
+        columns: Columns to export
+        filters: Parsed filters (see daily_aggregates_query.parse_filters); a
+            limit of None exports every matching row
+        fmt: 'ndjson' or 'csv'
+        batch_size: Rows fetched per round trip (default EXPORT_BATCH_SIZE)
+    """
+    batch_size = batch_size or config.export_batch_size
+    where, params = build_where(filters)
+    query = f"SELECT {', '.join(columns)} FROM daily_aggregates{where} ORDER BY date DESC, ticker"
+    if filters.get('limit'):
+        query += " LIMIT %s"
+        params.append(filters['limit'])
+
+    if fmt == 'csv':
+        yield encode_csv([columns])
+
+    with connection() as conn:
+        # Plain tuple rows; the server keeps the result set and sends it batch_size rows at a time
+        with conn.cursor(name=f"export_{uuid.uuid4().hex}", cursor_factory=psycopg2.extensions.cursor) as cur:
+            register_json_typecasters(cur)
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield encode_ndjson(columns, rows) if fmt == 'ndjson' else encode_csv(rows)
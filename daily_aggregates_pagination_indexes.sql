@@ -0,0 +1,12 @@
+-- Index for keyset pagination of the daily_aggregates API on existing databases
+-- Pages are read in (date DESC, ticker) order starting after a cursor row, so
+-- each page is a short index range scan however deep the client has paged.
+-- Ticker-filtered pages use the UNIQUE ("ticker", "date") index already in place.
+-- Run once: psql -U postgres -d chinook -f daily_aggregates_pagination_indexes.sql
+-- (CONCURRENTLY keeps writers running; it cannot run inside a transaction block)
+
+\echo 'Creating daily_aggregates pagination index...'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "idx_daily_aggregates_date_ticker"
+    ON "daily_aggregates"("date" DESC, "ticker");
+ANALYZE "daily_aggregates";
+\echo 'daily_aggregates pagination index created successfully.'
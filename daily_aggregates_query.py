@@ -0,0 +1,145 @@
+"""
+Keyset pagination and filters for daily_aggregates API queries
+Pages are ordered by (date DESC, ticker) and continue from an opaque cursor
+naming the last row served, so page N costs the same as page 1: the scan starts
+at the cursor in idx_daily_aggregates_date_ticker (or the (ticker, date) unique
+index when filtering by ticker) instead of skipping OFFSET rows.
+"""
+
+import re
+import base64
+from datetime import date
+from typing import Dict, List, Optional, Tuple, Any
+from fast_json import register_json_typecasters
+
+MAX_PAGE_SIZE = 1000
+TICKER_PATTERN = re.compile(r'^[A-Z0-9.\-]{1,20}$')
+
+def encode_cursor(row_date: Any, ticker: str) -> str:
+    """Opaque cursor pointing after the row (row_date, ticker)"""
+    value = f"{row_date.isoformat() if hasattr(row_date, 'isoformat') else row_date}|{ticker}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[date, str]:
+    """Parse a cursor from encode_cursor into (date, ticker)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        row_date, ticker = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        if not TICKER_PATTERN.match(ticker):
+            raise ValueError(ticker)
+        return date.fromisoformat(row_date), ticker
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_date(value: Optional[str], name: str) -> Optional[date]:
+    """Parse an optional YYYY-MM-DD query parameter"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+def parse_filters(args, default_limit: Optional[int] = 100,
+                  max_limit: Optional[int] = MAX_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Read pagination and filter parameters from a request's query string
+
+    Args:
+        args: request.args
+        default_limit: Page size when limit is not given (None: no limit)
+        max_limit: Largest page size allowed (None: any)
+
+    Returns:
+        Dict with 'tickers' (list), 'start_date', 'end_date' (inclusive, may be
+        None), 'limit' (1..max_limit, or None) and 'after' ((date, ticker) or None)
+
+    Raises:
+        ValueError: On malformed parameters (answer with 400)
+    """
+    tickers = []
+    for ticker in args.get('ticker', '').split(','):
+        ticker = ticker.strip().upper()
+        if not ticker:
+            continue
+        if not TICKER_PATTERN.match(ticker):
+            raise ValueError(f"Invalid ticker: {ticker}")
+        if ticker not in tickers:
+            tickers.append(ticker)
+
+    start_date = parse_date(args.get('start_date'), 'start_date')
+    end_date = parse_date(args.get('end_date'), 'end_date')
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+
+    try:
+        limit = args.get('limit', default_limit)
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit is not None:
+        limit = max(1, limit if max_limit is None else min(limit, max_limit))
+
+    cursor = args.get('cursor')
+    return {
+        'tickers': tickers,
+        'start_date': start_date,
+        'end_date': end_date,
+        'limit': limit,
+        'after': decode_cursor(cursor) if cursor else None
+    }
+
+def filters_key(filters: Dict[str, Any]) -> Tuple:
+    """Hashable form of parsed filters, e.g. for response cache keys"""
+    return (tuple(filters['tickers']), filters['start_date'], filters['end_date'],
+            filters['limit'], filters['after'])
+
+def build_where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """WHERE clause (possibly empty) and parameters for the filters and cursor"""
+    conditions = []
+    params: List[Any] = []
+    if filters['tickers']:
+        conditions.append("ticker = ANY(%s)")
+        params.append(filters['tickers'])
+    if filters['start_date']:
+        conditions.append("date >= %s")
+        params.append(filters['start_date'])
+    if filters['end_date']:
+        conditions.append("date <= %s")
+        params.append(filters['end_date'])
+    if filters.get('after'):
+        # Rows after the cursor in (date DESC, ticker) order; date <= bounds the index scan
+        after_date, after_ticker = filters['after']
+        conditions.append("date <= %s AND (date < %s OR ticker > %s)")
+        params.extend([after_date, after_date, after_ticker])
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+def build_page_query(columns: List[str], filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """SQL for one page, fetching one extra row to tell whether another page follows"""
+    where, params = build_where(filters)
+    query = f"SELECT {', '.join(columns)} FROM daily_aggregates{where} ORDER BY date DESC, ticker LIMIT %s"
+    return query, params + [filters['limit'] + 1]
+
+def fetch_page(conn, columns: List[str], filters: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Read one page of daily_aggregates (columns must include date and ticker)
+
+    NUMERIC columns come back as float and DATE columns as ISO text, ready to serialize.
+
+    Args:
+        conn: Connection whose cursors return dict rows
+
+    Returns:
+        (rows, next_cursor), next_cursor None on the last page
+    """
+    query, params = build_page_query(columns, filters)
+    with conn.cursor() as cur:
+        register_json_typecasters(cur)
+        cur.execute(query, params)
+        rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > filters['limit']:
+        rows = rows[:filters['limit']]
+        next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['ticker'])
+    return rows, next_cursor
@@ -0,0 +1,145 @@
+"""
+Cooperative Postgres and Redis access for the Flask-SocketIO dashboards
+Under eventlet every request, socket handler and background loop shares one OS
+thread, so a driver call that blocks the thread stalls all of them.
+patch_for_eventlet() monkey-patches the standard library (which makes redis-py
+cooperative) and installs a psycopg2 wait callback so queries yield to the hub
+while Postgres works. DatabasePool and create_redis_client bound how many
+connections are in use at once; callers over the limit wait for a free one.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+ASYNC_MODES = ('eventlet', 'threading')
+
+def patch_for_eventlet(async_mode: Optional[str] = None) -> str:
+    """
+    Make socket, threading and psycopg2 I/O cooperative when running under eventlet
+
+    Call it at the very top of an app module, before anything opens a
+    connection or starts a thread.
+
+    Args:
+        async_mode: 'eventlet' or 'threading' (default DASHBOARD_ASYNC_MODE, else
+            eventlet when it is installed)
+
+    Returns:
+        The async_mode to pass to SocketIO
+    """
+    async_mode = (async_mode or os.getenv('DASHBOARD_ASYNC_MODE', 'eventlet')).lower()
+    if async_mode not in ASYNC_MODES:
+        raise ValueError(f"DASHBOARD_ASYNC_MODE must be one of: {', '.join(ASYNC_MODES)}")
+    if async_mode == 'threading':
+        return async_mode
+
+    try:
+        import eventlet
+        from eventlet.support.psycopg2_patcher import make_psycopg_green
+    except ImportError:
+        return 'threading'
+
+    eventlet.monkey_patch()
+    make_psycopg_green()
+    return async_mode
+
+class DatabasePool:
+    """
+    Bounded Postgres connection pool
+
+    connection() waits up to timeout_seconds for one of max_connections
+    connections instead of opening a new one per request, commits when the
+    block succeeds and rolls back when it raises.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None, timeout_seconds: Optional[float] = None,
+                 **connect_kwargs):
+        """
+        Args:
+            max_connections: Connections open at most (default DB_POOL_MAX_CONNECTIONS)
+            timeout_seconds: How long to wait for a free connection (default DB_POOL_TIMEOUT_SECONDS)
+            connect_kwargs: psycopg2.connect arguments (default the configured
+                database with RealDictCursor rows)
+        """
+        from polygon_config import config
+        from psycopg2.extras import RealDictCursor
+
+        self.max_connections = max_connections or config.db_pool_max_connections
+        self.timeout_seconds = config.db_pool_timeout_seconds if timeout_seconds is None else timeout_seconds
+        self.connect_kwargs = connect_kwargs or {
+            'host': config.db_host,
+            'port': config.db_port,
+            'database': config.db_name,
+            'user': config.db_user,
+            'password': config.db_password,
+            'cursor_factory': RealDictCursor
+        }
+        # Created on first use so the locks are the (possibly green) ones in place by then
+        self.slots: Optional[threading.BoundedSemaphore] = None
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def _pool(self):
+        with self.lock:
+            if self.pool is None:
+                from psycopg2.pool import ThreadedConnectionPool
+                self.slots = threading.BoundedSemaphore(self.max_connections)
+                self.pool = ThreadedConnectionPool(0, self.max_connections, **self.connect_kwargs)
+            return self.pool
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        from psycopg2.pool import PoolError
+
+        pool = self._pool()
+        if not self.slots.acquire(timeout=self.timeout_seconds):
+            raise PoolError(f"No database connection free within {self.timeout_seconds}s "
+                            f"({self.max_connections} in use)")
+        try:
+            conn = pool.getconn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """Close every pooled connection"""
+        with self.lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+
+def create_redis_client(url: Optional[str] = None, max_connections: Optional[int] = None,
+                        timeout_seconds: Optional[float] = None, **connection_kwargs):
+    """
+    Redis client whose pool blocks (up to timeout_seconds) when every connection is busy
+
+    Args:
+        url: redis:// URL; otherwise pass host/port/username/password as keywords
+        max_connections: Pool size (default REDIS_POOL_MAX_CONNECTIONS); each
+            pub/sub subscriber holds one connection for good
+        timeout_seconds: How long to wait for a free connection (default REDIS_POOL_TIMEOUT_SECONDS)
+    """
+    import redis
+    from polygon_config import config
+
+    connection_kwargs.setdefault('decode_responses', True)
+    pool_kwargs = {
+        'max_connections': max_connections or config.redis_pool_max_connections,
+        'timeout': config.redis_pool_timeout_seconds if timeout_seconds is None else timeout_seconds
+    }
+    if url:
+        pool = redis.BlockingConnectionPool.from_url(url, **pool_kwargs, **connection_kwargs)
+    else:
+        pool = redis.BlockingConnectionPool(**pool_kwargs, **connection_kwargs)
+    return redis.Redis(connection_pool=pool)
@@ -0,0 +1,218 @@
+"""
+Fleet-wide state for dashboards running as several workers
+Status that every worker must see lives in Redis hashes, and background jobs
+that must run once across the fleet are guarded by expiring leases. Without a
+Redis client both fall back to in-process state for a single worker.
+"""
+
+import os
+import json
+import uuid
+import time
+import socket
+import threading
+from typing import Dict, List, Optional, Any
+
+STATE_PREFIX = 'dashboard:'
+
+# Extend the lease only while we still own it
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Delete the lease only while we still own it
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def worker_id() -> str:
+    """Identify this worker process in lease values"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class FleetLease:
+    """
+    A named lease held by at most one worker at a time
+
+    acquire() hands out a token for that one acquisition; the job that got it
+    keeps the lease alive with keep_alive(token), checks renew(token) between
+    steps and finally calls release(token). Tokens keep jobs apart: a job
+    stopped by revoke() can never renew or release a lease acquired after it,
+    even by another job on the same worker. A worker that dies stops renewing
+    and the lease expires after ttl_seconds. Any worker can revoke it to ask
+    the holder to stop, which the holder notices at its next renew().
+    """
+
+    def __init__(self, client, name: str, ttl_seconds: int = 60):
+        self.client = client
+        self.name = name
+        self.key = f"{STATE_PREFIX}lease:{name}"
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self._local_token: Optional[str] = None
+        self._local_lock = threading.Lock()
+        if client is not None:
+            self._renew = client.register_script(RENEW_SCRIPT)
+            self._release = client.register_script(RELEASE_SCRIPT)
+
+    def acquire(self) -> Optional[str]:
+        """
+        Take the lease if nobody holds it
+
+        Returns:
+            The token for this acquisition, or None when the lease is held
+        """
+        token = f"{worker_id()}:{uuid.uuid4().hex}"
+        if self.client is None:
+            with self._local_lock:
+                if self._local_token is not None:
+                    return None
+                self._local_token = token
+        elif not self.client.set(self.key, token, nx=True, px=self.ttl_ms):
+            return None
+        return token
+
+    def renew(self, token: Optional[str]) -> bool:
+        """
+        Extend the lease acquired with token
+
+        Returns:
+            False when it expired, was revoked or was since acquired by another
+            job; the caller should stop its job
+        """
+        if token is None:
+            return False
+        if self.client is None:
+            with self._local_lock:
+                return self._local_token == token
+        return bool(self._renew(keys=[self.key], args=[token, self.ttl_ms]))
+
+    def keep_alive(self, token: str):
+        """Renew the lease every third of its TTL in a daemon thread until it is released or lost"""
+        def heartbeat():
+            while True:
+                time.sleep(self.ttl_ms / 3000)
+                if not self.renew(token):
+                    break
+
+        threading.Thread(target=heartbeat, name=f"lease-{self.name}", daemon=True).start()
+
+    def release(self, token: Optional[str]):
+        """Give the lease up if token still holds it"""
+        if token is None:
+            return
+        if self.client is None:
+            with self._local_lock:
+                if self._local_token == token:
+                    self._local_token = None
+        else:
+            self._release(keys=[self.key], args=[token])
+
+    def revoke(self) -> bool:
+        """
+        Ask whichever worker holds the lease to stop
+
+        Returns:
+            True when a lease was held
+        """
+        if self.client is None:
+            with self._local_lock:
+                held = self._local_token is not None
+                self._local_token = None
+            return held
+        return bool(self.client.delete(self.key))
+
+    def is_active(self) -> bool:
+        """Whether any worker holds the lease"""
+        if self.client is None:
+            return self._local_token is not None
+        return bool(self.client.exists(self.key))
+
+    def holder(self) -> Optional[str]:
+        """Worker holding the lease (host:pid), None when free"""
+        token = self._local_token if self.client is None else self.client.get(self.key)
+        return token.rsplit(':', 1)[0] if token else None
+
+class SharedStatus:
+    """
+    Status dict shared by every worker
+
+    Scalar fields are JSON values in one Redis hash; list fields are capped
+    Redis lists so concurrent appends never overwrite each other.
+    """
+
+    def __init__(self, client, name: str, defaults: Dict[str, Any], list_fields: List[str] = (),
+                 max_list_items: int = 100):
+        self.client = client
+        self.key = f"{STATE_PREFIX}status:{name}"
+        self.defaults = dict(defaults)
+        self.list_fields = set(list_fields)
+        self.max_list_items = max_list_items
+        self._local = json.loads(json.dumps(self.defaults))
+        self._local_lock = threading.Lock()
+
+    def _list_key(self, field: str) -> str:
+        return f"{self.key}:{field}"
+
+    def get(self) -> Dict[str, Any]:
+        """Current status with defaults for fields never set"""
+        if self.client is None:
+            with self._local_lock:
+                return json.loads(json.dumps(self._local))
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self.key)
+        for field in sorted(self.list_fields):
+            pipe.lrange(self._list_key(field), 0, -1)
+        replies = pipe.execute()
+
+        status = dict(self.defaults)
+        for field, value in replies[0].items():
+            status[field] = json.loads(value)
+        for field, items in zip(sorted(self.list_fields), replies[1:]):
+            status[field] = items
+        return status
+
+    def update(self, **fields):
+        """Set fields; a list field set to [] is cleared"""
+        if self.client is None:
+            with self._local_lock:
+                for field, value in fields.items():
+                    self._local[field] = list(value) if field in self.list_fields else value
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        scalars = {field: json.dumps(value) for field, value in fields.items() if field not in self.list_fields}
+        if scalars:
+            pipe.hset(self.key, mapping=scalars)
+        for field in self.list_fields & set(fields):
+            pipe.delete(self._list_key(field))
+            if fields[field]:
+                pipe.rpush(self._list_key(field), *fields[field])
+        pipe.execute()
+
+    def incr(self, field: str, amount: int = 1) -> int:
+        """Atomically add to an integer field"""
+        if self.client is None:
+            with self._local_lock:
+                self._local[field] = self._local.get(field, 0) + amount
+                return self._local[field]
+        return self.client.hincrby(self.key, field, amount)
+
+    def append(self, field: str, value: str):
+        """Append to a list field, keeping the newest max_list_items"""
+        if self.client is None:
+            with self._local_lock:
+                items = self._local.setdefault(field, [])
+                items.append(value)
+                del items[:-self.max_list_items]
+            return
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(self._list_key(field), value)
+        pipe.ltrim(self._list_key(field), -self.max_list_items, -1)
+        pipe.execute()
@@ -0,0 +1,35 @@
+"""
+WSGI entry point for running a dashboard as several worker processes
+
+Each process serves one eventlet worker; run as many as there are cores behind
+a load balancer with sticky sessions (Socket.IO long-polling needs them), all
+pointing at the same Redis message queue:
+
+    export SOCKETIO_MESSAGE_QUEUE=redis://:password@redis-host:6379/0
+    DASHBOARD_APP=unified gunicorn -k eventlet -w 1 --bind 0.0.0.0:9001 dashboard_wsgi:app
+    DASHBOARD_APP=unified gunicorn -k eventlet -w 1 --bind 0.0.0.0:9002 dashboard_wsgi:app
+
+Each dashboard module patches eventlet in before it opens any connection (see
+dashboard_io), so Postgres and Redis calls yield instead of blocking the worker;
+set DASHBOARD_ASYNC_MODE=threading to run without eventlet.
+
+Shared state (fetch/demo status) lives in Redis and jobs that must run once
+across the fleet are guarded by leases (see dashboard_state).
+"""
+
+import os
+import importlib
+
+DASHBOARD_APPS = {
+    'unified': 'unified_stock_dashboard',
+    'redis': 'redis_stock_dashboard',
+    'polygon': 'polygon_web_ui'
+}
+
+dashboard_name = os.getenv('DASHBOARD_APP', 'unified')
+if dashboard_name not in DASHBOARD_APPS:
+    raise ValueError(f"DASHBOARD_APP must be one of: {', '.join(DASHBOARD_APPS)}")
+
+dashboard = importlib.import_module(DASHBOARD_APPS[dashboard_name])
+dashboard.start_background_services()
+app = dashboard.app
@@ -0,0 +1,76 @@
+"""
+JSON serialization for the dashboard APIs
+Uses orjson when it is installed (serializes dicts, floats, dates and numpy
+values natively in C and returns bytes) and the standard library otherwise.
+Database rows are made JSON-ready while psycopg2 parses them, by typecasters
+registered on the cursor, instead of checking and converting every Decimal
+and date value in Python afterwards.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any
+from flask.json.provider import JSONProvider
+import psycopg2.extensions
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NUMERIC -> float and DATE -> the ISO text Postgres sent, applied during parsing
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, 'JSON_NUMERIC', lambda value, cur: float(value) if value is not None else None)
+DATE_AS_TEXT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DATE.values, 'JSON_DATE', lambda value, cur: value)
+
+def register_json_typecasters(scope):
+    """Have a cursor (or connection) return NUMERIC as float and DATE as ISO text"""
+    psycopg2.extensions.register_type(NUMERIC_AS_FLOAT, scope)
+    psycopg2.extensions.register_type(DATE_AS_TEXT, scope)
+
+def json_default(value: Any) -> Any:
+    """Serialize values neither backend handles natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy scalars under the stdlib backend
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes with the fastest backend available"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option)
+    if indent:
+        return json.dumps(obj, default=json_default, indent=2).encode()
+    return json.dumps(obj, default=json_default, separators=(',', ':')).encode()
+
+def loads(data: Any) -> Any:
+    """Parse JSON text or bytes"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by dumps_bytes (set app.json = FastJSONProvider(app))
+
+    Keys keep their insertion order rather than being sorted, and Decimal
+    values become numbers.
+    """
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps_bytes(obj, indent=self._app.debug) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
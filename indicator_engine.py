@@ -0,0 +1,320 @@
+"""
+Incremental technical indicators per ticker, stored in Redis
+SMA, EMA, RSI, Bollinger bands and rolling volatility of daily closes are
+computed with NumPy over a ticker's whole daily_aggregates history once, then
+carried forward in O(1) per new bar from running sums and smoothed averages
+kept in Redis. The newest bar is held apart from the folded history so that
+rewriting it (today's bar is updated many times a day) replaces it instead of
+counting it twice; a bar older than the newest one triggers a rebuild.
+
+Keys per ticker:
+    indicators:{ticker}        Hash of current values read by the dashboards
+    indicators:state:{ticker}  JSON state needed to apply the next bar
+"""
+
+import json
+import math
+import time
+import logging
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple, Any
+import psycopg2.extensions
+import redis
+from fast_json import register_json_typecasters
+from redis_stock_store import register_keys, registered_keys, registry_key
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_PREFIX = 'indicators:'
+INDICATOR_STATE_PREFIX = 'indicators:state:'
+
+# Indicator periods in bars (trading days)
+SMA_PERIODS = (20, 50)
+EMA_PERIODS = (12, 26)
+RSI_PERIOD = 14
+BOLLINGER_PERIOD = 20
+BOLLINGER_STDDEV = 2.0
+VOLATILITY_PERIOD = 20
+TRADING_DAYS_PER_YEAR = 252
+
+# Closes kept for the rolling windows (the newest bar is held separately)
+WINDOW_CLOSES = max(SMA_PERIODS + (BOLLINGER_PERIOD,)) - 1
+WINDOW_RETURNS = VOLATILITY_PERIOD - 1
+
+def indicator_key(ticker: str) -> str:
+    """Get the hash of a ticker's indicator values, e.g. indicators:AAPL"""
+    return f"{INDICATOR_PREFIX}{ticker}"
+
+def state_key(ticker: str) -> str:
+    """Get the key of a ticker's indicator state"""
+    return f"{INDICATOR_STATE_PREFIX}{ticker}"
+
+def ewm_last(values: np.ndarray, alpha: float) -> float:
+    """
+    Final value of the recursion s[0] = v[0], s[t] = alpha * v[t] + (1 - alpha) * s[t-1],
+    as one dot product instead of a Python loop over history
+    """
+    weights = (1 - alpha) ** np.arange(len(values) - 1, -1, -1, dtype=np.float64)
+    weights[1:] *= alpha
+    return float(np.dot(weights, values))
+
+def build_state(dates: List[str], closes: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Compute the state for a close history in date order
+
+    Every bar but the last is folded into running sums and smoothed averages;
+    the last is kept as the current bar.
+    """
+    if not len(closes):
+        return None
+    history = np.asarray(closes[:-1], dtype=np.float64)
+    window = history[-WINDOW_CLOSES:]
+    returns = np.diff(np.log(history))
+    changes = np.diff(history)
+
+    state = {
+        'date': dates[-1],
+        'close': float(closes[-1]),
+        'bars': len(history),
+        'closes': window.tolist(),
+        'sums': {str(period): float(window[-(period - 1):].sum()) for period in SMA_PERIODS + (BOLLINGER_PERIOD,)},
+        'sumsq': float(np.square(window[-(BOLLINGER_PERIOD - 1):]).sum()),
+        'returns': returns[-WINDOW_RETURNS:].tolist(),
+        'ema': {str(period): ewm_last(history, 2 / (period + 1)) if len(history) else None
+                for period in EMA_PERIODS},
+        'avg_gain': ewm_last(np.maximum(changes, 0), 1 / RSI_PERIOD) if len(changes) else None,
+        'avg_loss': ewm_last(np.maximum(-changes, 0), 1 / RSI_PERIOD) if len(changes) else None
+    }
+    state['ret_sum'] = float(sum(state['returns']))
+    state['ret_sumsq'] = float(sum(r * r for r in state['returns']))
+    return state
+
+def fold_current(state: Dict[str, Any]):
+    """Move the current bar into the folded history in O(1), ahead of a newer bar"""
+    close = state['close']
+    closes = state['closes']
+    if closes:
+        change = close - closes[-1]
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if state['avg_gain'] is None:
+            state['avg_gain'], state['avg_loss'] = gain, loss
+        else:
+            state['avg_gain'] += (gain - state['avg_gain']) / RSI_PERIOD
+            state['avg_loss'] += (loss - state['avg_loss']) / RSI_PERIOD
+
+        log_return = math.log(close / closes[-1])
+        state['returns'].append(log_return)
+        state['ret_sum'] += log_return
+        state['ret_sumsq'] += log_return * log_return
+        if len(state['returns']) > WINDOW_RETURNS:
+            dropped = state['returns'].pop(0)
+            state['ret_sum'] -= dropped
+            state['ret_sumsq'] -= dropped * dropped
+
+    for period, ema in state['ema'].items():
+        alpha = 2 / (int(period) + 1)
+        state['ema'][period] = close if ema is None else alpha * close + (1 - alpha) * ema
+
+    closes.append(close)
+    for period in state['sums']:
+        if len(closes) >= int(period):
+            state['sums'][period] += close - closes[-int(period)]
+        else:
+            state['sums'][period] += close
+    state['sumsq'] += close * close
+    if len(closes) >= BOLLINGER_PERIOD:
+        state['sumsq'] -= closes[-BOLLINGER_PERIOD] ** 2
+    del closes[:-WINDOW_CLOSES]
+    state['bars'] += 1
+
+def apply_bar(state: Optional[Dict[str, Any]], bar_date: str, close: float) -> Optional[Dict[str, Any]]:
+    """
+    Apply a bar to the state in O(1)
+
+    Returns:
+        The updated state, or None when the bar is older than the current one
+        and the state has to be rebuilt from history
+    """
+    if state is None:
+        return build_state([bar_date], np.array([close]))
+    if bar_date < state['date']:
+        return None
+    if bar_date > state['date']:
+        fold_current(state)
+    state['date'] = bar_date
+    state['close'] = float(close)
+    return state
+
+def indicator_values(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Indicator values including the current bar; an indicator is None until it has enough bars"""
+    close = state['close']
+    closes = state['closes']
+    bars = state['bars'] + 1
+    values = {'date': state['date'], 'close': close, 'bars': bars}
+
+    for period in SMA_PERIODS:
+        values[f'sma_{period}'] = (state['sums'][str(period)] + close) / period if bars >= period else None
+
+    for period in EMA_PERIODS:
+        ema = state['ema'][str(period)]
+        alpha = 2 / (period + 1)
+        values[f'ema_{period}'] = (alpha * close + (1 - alpha) * ema if ema is not None else close) \
+            if bars >= period else None
+
+    values[f'rsi_{RSI_PERIOD}'] = None
+    if bars > RSI_PERIOD:
+        change = close - closes[-1]
+        avg_gain = state['avg_gain'] + (max(change, 0.0) - state['avg_gain']) / RSI_PERIOD
+        avg_loss = state['avg_loss'] + (max(-change, 0.0) - state['avg_loss']) / RSI_PERIOD
+        if avg_loss > 0:
+            values[f'rsi_{RSI_PERIOD}'] = 100 - 100 / (1 + avg_gain / avg_loss)
+        else:
+            values[f'rsi_{RSI_PERIOD}'] = 100.0 if avg_gain > 0 else 50.0
+
+    values['bb_middle'] = values['bb_upper'] = values['bb_lower'] = None
+    if bars >= BOLLINGER_PERIOD:
+        mean = (state['sums'][str(BOLLINGER_PERIOD)] + close) / BOLLINGER_PERIOD
+        variance = max((state['sumsq'] + close * close) / BOLLINGER_PERIOD - mean * mean, 0.0)
+        band = BOLLINGER_STDDEV * math.sqrt(variance)
+        values.update({'bb_middle': mean, 'bb_upper': mean + band, 'bb_lower': mean - band})
+
+    values[f'volatility_{VOLATILITY_PERIOD}'] = None
+    if bars > VOLATILITY_PERIOD:
+        log_return = math.log(close / closes[-1])
+        count = len(state['returns']) + 1
+        mean = (state['ret_sum'] + log_return) / count
+        variance = max(((state['ret_sumsq'] + log_return * log_return) - count * mean * mean) / (count - 1), 0.0)
+        # Annualized standard deviation of daily log returns
+        values[f'volatility_{VOLATILITY_PERIOD}'] = math.sqrt(variance * TRADING_DAYS_PER_YEAR)
+    return values
+
+def load_close_history(conn, ticker: str) -> Tuple[List[str], np.ndarray]:
+    """Read a ticker's daily (date, close) history in date order as ISO dates and a float array"""
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        register_json_typecasters(cur)
+        cur.execute("""
+            SELECT date, close FROM daily_aggregates
+            WHERE ticker = %s AND close IS NOT NULL
+            ORDER BY date
+        """, (ticker,))
+        rows = cur.fetchall()
+    return [row[0] for row in rows], np.array([row[1] for row in rows], dtype=np.float64)
+
+class IndicatorEngine:
+    """
+    Keeps every ticker's indicators in Redis current as bars arrive
+
+    update() is safe to call from several workers for the same bar: state
+    changes are applied under WATCH and reapplying a bar only replaces the
+    current bar with itself.
+    """
+
+    def __init__(self, client, connection: Callable):
+        """
+        Args:
+            client: Redis client
+            connection: Returns a PostgreSQL connection context manager for
+                history rebuilds, e.g. DatabasePool.connection
+        """
+        self.client = client
+        self.connection = connection
+
+    def _load_state(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Compute a ticker's state from its full daily history"""
+        with self.connection() as conn:
+            dates, closes = load_close_history(conn, ticker)
+        return build_state(dates, closes)
+
+    def _store(self, pipe, ticker: str, state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Queue the state and values writes (or their removal when the ticker has no history)"""
+        if state is None:
+            pipe.delete(state_key(ticker), indicator_key(ticker))
+            pipe.zrem(registry_key('indicators'), indicator_key(ticker))
+            return None
+        values = indicator_values(state)
+        values['updated_at'] = time.time()
+        pipe.set(state_key(ticker), json.dumps(state))
+        pipe.delete(indicator_key(ticker))
+        pipe.hset(indicator_key(ticker), mapping={field: '' if value is None else value
+                                                  for field, value in values.items()})
+        register_keys(pipe, 'indicators', [indicator_key(ticker)])
+        return values
+
+    def update(self, ticker: str, bar_date: str, close: float) -> Optional[Dict[str, Any]]:
+        """
+        Apply a new or revised daily bar
+
+        Args:
+            ticker: Ticker symbol
+            bar_date: Bar date as YYYY-MM-DD
+            close: Bar close
+
+        Returns:
+            The ticker's indicator values after the bar
+        """
+        with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    pipe.watch(state_key(ticker))
+                    raw = pipe.get(state_key(ticker))
+                    state = apply_bar(json.loads(raw) if raw else None, bar_date, float(close))
+                    if state is None or raw is None:
+                        # Backfilled bar, or first sight of the ticker: compute from the stored history
+                        state = self._load_state(ticker) or state
+                    pipe.multi()
+                    values = self._store(pipe, ticker, state)
+                    pipe.execute()
+                    return values
+                except redis.WatchError:
+                    continue
+
+    def rebuild(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Recompute a ticker's indicators from its full history (after deletes or missed bars)"""
+        state = self._load_state(ticker)
+        pipe = self.client.pipeline(transaction=True)
+        values = self._store(pipe, ticker, state)
+        pipe.execute()
+        return values
+
+    def apply_changes(self, changes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply daily_aggregates change notifications (see pg_change_feed)
+
+        Returns:
+            Indicator values per changed ticker
+        """
+        if any(change['op'] == 'TRUNCATE' for change in changes):
+            return self.rebuild_all()
+
+        updated = {}
+        rebuild = set()
+        for change in sorted(changes, key=lambda change: (change.get('ticker') or '', change.get('date') or '')):
+            ticker = change.get('ticker')
+            if not ticker:
+                continue
+            if change['op'] == 'DELETE' or change.get('close') is None:
+                rebuild.add(ticker)
+            elif ticker not in rebuild:
+                updated[ticker] = self.update(ticker, change['date'], change['close'])
+        for ticker in rebuild:
+            updated[ticker] = self.rebuild(ticker)
+        return updated
+
+    def rebuild_all(self) -> Dict[str, Dict[str, Any]]:
+        """Rebuild every ticker that has indicators (after a TRUNCATE or missed notifications)"""
+        tickers = [key[len(INDICATOR_PREFIX):] for key in registered_keys(self.client, 'indicators')]
+        return {ticker: self.rebuild(ticker) for ticker in tickers}
+
+    def read(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Get a ticker's indicator values, computing them from history on first request"""
+        data = self.client.hgetall(indicator_key(ticker))
+        if not data:
+            return self.rebuild(ticker)
+        values = {}
+        for field, value in data.items():
+            if field == 'date':
+                values[field] = value
+            else:
+                values[field] = float(value) if value != '' else None
+        values['bars'] = int(values['bars'])
+        return values
@@ -0,0 +1,149 @@
+"""
+Streaming anomaly detection over stock ticks
+Each ticker keeps a few exponentially weighted statistics: the mean and
+variance of its log returns and of its log volume. Every tick is scored
+against them in O(1) before being folded in, and a market_event alert is
+raised when the return or the volume is an outlier (|z| above a threshold).
+Memory is constant per ticker, so one core keeps up with thousands of tickers.
+"""
+
+import math
+import time
+from typing import Dict, List, Optional, Any
+from polygon_config import config
+
+class TickerStats:
+    """Exponentially weighted return/volume statistics for one ticker"""
+
+    __slots__ = ('close', 'volume', 'count', 'return_mean', 'return_var', 'volume_mean', 'volume_var',
+                 'last_alert_at')
+
+    def __init__(self, close: float, volume: float):
+        self.close = close
+        self.volume = volume
+        self.count = 0
+        self.return_mean = 0.0
+        self.return_var = 0.0
+        self.volume_mean = math.log1p(volume)
+        self.volume_var = 0.0
+        self.last_alert_at = float('-inf')
+
+def ew_update(mean: float, var: float, value: float, alpha: float):
+    """One step of an exponentially weighted mean and variance"""
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (var + diff * increment)
+
+def zscore(value: float, mean: float, var: float, weight: float) -> float:
+    """
+    Standard score against an exponentially weighted variance, 0 when there is no spread yet
+
+    The variance starts at zero and only reaches its full weight after many
+    observations, so it is divided by the weight accumulated so far.
+    """
+    var /= weight
+    return (value - mean) / math.sqrt(var) if var > 0 else 0.0
+
+class AnomalyDetector:
+    """Scores ticks against each ticker's recent behaviour and reports outliers"""
+
+    def __init__(self, return_zscore: Optional[float] = None, volume_zscore: Optional[float] = None,
+                 halflife_ticks: Optional[int] = None, warmup_ticks: Optional[int] = None,
+                 cooldown_seconds: Optional[int] = None):
+        """
+        Args:
+            return_zscore: |z| of a log return that raises a CRASH/SURGE alert
+            volume_zscore: z of log volume that raises a volume alert
+            halflife_ticks: Ticks after which an observation's weight has halved
+            warmup_ticks: Returns a ticker needs before it can alert
+            cooldown_seconds: Minimum time between alerts for one ticker
+            (all default from config)
+        """
+        self.return_zscore = return_zscore or config.anomaly_return_zscore
+        self.volume_zscore = volume_zscore or config.anomaly_volume_zscore
+        halflife_ticks = halflife_ticks or config.anomaly_halflife_ticks
+        self.decay = 0.5 ** (1 / halflife_ticks)
+        self.alpha = 1 - self.decay
+        self.warmup_ticks = warmup_ticks or config.anomaly_warmup_ticks
+        self.cooldown_seconds = config.anomaly_cooldown_seconds if cooldown_seconds is None else cooldown_seconds
+        self.stats: Dict[str, TickerStats] = {}
+
+    def observe(self, ticker: str, close: float, volume: float = 0.0,
+                now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Score one tick and fold it into the ticker's statistics
+
+        Returns:
+            A market_event payload when the tick is an outlier, else None
+        """
+        stats = self.stats.get(ticker)
+        if stats is None:
+            self.stats[ticker] = TickerStats(close, volume)
+            return None
+        # The same hash read twice (e.g. after a resync) is not a new tick
+        if close == stats.close and volume == stats.volume:
+            return None
+        if close <= 0 or stats.close <= 0:
+            stats.close, stats.volume = close, volume
+            return None
+
+        log_return = math.log(close / stats.close)
+        log_volume = math.log1p(max(volume, 0.0))
+        weight = 1 - self.decay ** stats.count if stats.count else 1.0
+        return_z = zscore(log_return, stats.return_mean, stats.return_var, weight)
+        volume_z = zscore(log_volume, stats.volume_mean, stats.volume_var, weight)
+
+        alert = None
+        now = time.time() if now is None else now
+        if stats.count >= self.warmup_ticks and now - stats.last_alert_at >= self.cooldown_seconds:
+            if abs(return_z) >= self.return_zscore or volume_z >= self.volume_zscore:
+                stats.last_alert_at = now
+                alert = self._alert(ticker, close, volume, log_return, return_z, volume_z, now)
+
+        stats.return_mean, stats.return_var = ew_update(stats.return_mean, stats.return_var, log_return, self.alpha)
+        stats.volume_mean, stats.volume_var = ew_update(stats.volume_mean, stats.volume_var, log_volume, self.alpha)
+        stats.close, stats.volume = close, volume
+        stats.count += 1
+        return alert
+
+    def _alert(self, ticker: str, close: float, volume: float, log_return: float,
+               return_z: float, volume_z: float, now: float) -> Dict[str, Any]:
+        """Build a market_event payload in the shape the dashboards already render"""
+        change_percent = math.expm1(log_return) * 100
+        event_type = 'CRASH' if log_return < 0 else 'SURGE'
+        if abs(return_z) >= self.return_zscore:
+            reason = 'return'
+            icon = '🔴' if event_type == 'CRASH' else '🚀'
+            message = (f"{icon} {ticker} {'dropped' if event_type == 'CRASH' else 'jumped'} "
+                       f"{abs(change_percent):.2f}% in one tick ({return_z:+.1f}σ)")
+        else:
+            reason = 'volume'
+            message = f"📊 {ticker} volume surge: {volume:,.0f} ({volume_z:+.1f}σ), price {change_percent:+.2f}%"
+        return {
+            'type': event_type,
+            'reason': reason,
+            'ticker': ticker,
+            'tickers': [ticker],
+            'close': close,
+            'volume': volume,
+            'change_percent': round(change_percent, 2),
+            'return_zscore': round(return_z, 2),
+            'volume_zscore': round(volume_z, 2),
+            'detected_at': now,
+            'message': message
+        }
+
+    def observe_stocks(self, stocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score a change-feed batch of latest:* hashes"""
+        alerts = []
+        for data in stocks:
+            ticker = data.get('ticker') or data.get('redis_key', '').split(':')[-1]
+            try:
+                close = float(data['close'])
+                volume = float(data.get('volume') or 0)
+            except (KeyError, TypeError, ValueError):
+                continue
+            alert = self.observe(ticker, close, volume)
+            if alert is not None:
+                alerts.append(alert)
+        return alerts
@@ -0,0 +1,108 @@
+-- Convert data_fetch_log to a daily range-partitioned table
+-- Retention then drops whole partitions instead of running large DELETEs.
+-- Rows inside the retention window are copied over; older rows are discarded.
+-- Run once: psql -U postgres -d chinook -f partition_data_fetch_log.sql
+
+\echo 'Converting data_fetch_log to a partitioned table...'
+
+BEGIN;
+
+ALTER TABLE "data_fetch_log" RENAME TO "data_fetch_log_unpartitioned";
+
+CREATE TABLE "data_fetch_log" (
+  "id" SERIAL,
+  "fetch_type" VARCHAR(50) NOT NULL,
+  "ticker" VARCHAR(20),
+  "start_date" DATE,
+  "end_date" DATE,
+  "records_fetched" INTEGER DEFAULT 0,
+  "status" VARCHAR(20) DEFAULT 'started',
+  "error_message" TEXT,
+  "fetch_duration_seconds" NUMERIC(10, 2),
+  "created_at" TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  "completed_at" TIMESTAMP,
+  PRIMARY KEY ("id", "created_at")
+) PARTITION BY RANGE ("created_at");
+\echo 'Partitioned data_fetch_log table created.'
+
+-- Rows outside every daily partition (e.g. if partition pre-creation fell behind)
+-- land here instead of failing the insert
+CREATE TABLE "data_fetch_log_default" PARTITION OF "data_fetch_log" DEFAULT;
+
+-- Create one partition per day in [start_day, end_day], skipping existing ones.
+-- A day that already has rows in the default partition gets them moved into its new partition.
+\echo 'Creating partition maintenance function...'
+CREATE OR REPLACE FUNCTION create_data_fetch_log_partitions(start_day DATE, end_day DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    current_day DATE := start_day;
+    partition_name TEXT;
+    has_default_rows BOOLEAN;
+    created_count INTEGER := 0;
+BEGIN
+    WHILE current_day <= end_day LOOP
+        partition_name := 'data_fetch_log_p' || to_char(current_day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            has_default_rows := FALSE;
+            IF to_regclass('data_fetch_log_default') IS NOT NULL THEN
+                EXECUTE format(
+                    'SELECT EXISTS (SELECT 1 FROM "data_fetch_log_default" WHERE "created_at" >= %L AND "created_at" < %L)',
+                    current_day, current_day + 1
+                ) INTO has_default_rows;
+            END IF;
+
+            IF has_default_rows THEN
+                EXECUTE format('CREATE TABLE %I (LIKE "data_fetch_log" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                               partition_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM "data_fetch_log_default" WHERE "created_at" >= %L AND "created_at" < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    current_day, current_day + 1, partition_name
+                );
+                EXECUTE format(
+                    'ALTER TABLE "data_fetch_log" ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, current_day, current_day + 1
+                );
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF "data_fetch_log" FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, current_day, current_day + 1
+                );
+            END IF;
+            created_count := created_count + 1;
+        END IF;
+        current_day := current_day + 1;
+    END LOOP;
+    RETURN created_count;
+END;
+$$ language 'plpgsql';
+
+-- Partitions for the 30-day retention window plus a week ahead
+SELECT create_data_fetch_log_partitions(CURRENT_DATE - 30, CURRENT_DATE + 7);
+
+\echo 'Copying recent fetch log rows...'
+INSERT INTO "data_fetch_log" (
+  "id", "fetch_type", "ticker", "start_date", "end_date", "records_fetched", "status",
+  "error_message", "fetch_duration_seconds", "created_at", "completed_at"
+)
+SELECT
+  "id", "fetch_type", "ticker", "start_date", "end_date", "records_fetched", "status",
+  "error_message", "fetch_duration_seconds", "created_at", "completed_at"
+FROM "data_fetch_log_unpartitioned"
+WHERE "created_at" >= CURRENT_DATE - 30;
+
+SELECT setval(
+  pg_get_serial_sequence('"data_fetch_log"', 'id'),
+  (SELECT COALESCE(MAX("id"), 0) + 1 FROM "data_fetch_log_unpartitioned"),
+  false
+);
+
+DROP TABLE "data_fetch_log_unpartitioned";
+
+CREATE INDEX IF NOT EXISTS "idx_data_fetch_log_created_at" ON "data_fetch_log"("created_at");
+CREATE INDEX IF NOT EXISTS "idx_data_fetch_log_ticker_type" ON "data_fetch_log"("ticker", "fetch_type");
+
+COMMIT;
+
+\echo 'data_fetch_log is now partitioned by day on created_at.'
+\echo 'PolygonMonitor creates future partitions daily and drops expired ones on cleanup.'
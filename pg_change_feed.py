@@ -0,0 +1,261 @@
+"""
+Postgres change feed for daily_aggregates
+A row-level trigger NOTIFYs every insert, update and delete on daily_aggregates
+(and a statement-level one every TRUNCATE) as JSON on the
+daily_aggregates_changes channel, whichever process wrote it. Each dashboard
+worker LISTENs on one dedicated connection, batches notifications for a short
+debounce window and hands them to a callback that invalidates cached responses
+and tells clients to refresh, so nothing has to poll the table.
+"""
+
+import json
+import time
+import select
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Any
+import psycopg2
+from polygon_config import config
+
+CHANGE_CHANNEL = 'daily_aggregates_changes'
+TRIGGER_NAME = 'daily_aggregates_notify'
+TRUNCATE_TRIGGER_NAME = 'daily_aggregates_notify_truncate'
+
+# How often a listener without NOTIFY triggers checks whether they were installed since
+TRIGGER_CHECK_SECONDS = 60
+
+# Keeps payloads far below NOTIFY's 8000 byte limit: only the columns dashboards show
+NOTIFY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_daily_aggregates_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_data RECORD;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('{CHANGE_CHANNEL}', json_build_object('op', TG_OP)::text);
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        row_data := OLD;
+    ELSE
+        row_data := NEW;
+    END IF;
+
+    PERFORM pg_notify('{CHANGE_CHANNEL}', json_build_object(
+        'op', TG_OP,
+        'ticker', row_data.ticker,
+        'date', row_data.date,
+        'open', row_data.open,
+        'high', row_data.high,
+        'low', row_data.low,
+        'close', row_data.close,
+        'volume', row_data.volume
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGERS_SQL = f"""
+CREATE TRIGGER {TRIGGER_NAME} AFTER INSERT OR UPDATE OR DELETE ON "daily_aggregates"
+    FOR EACH ROW EXECUTE FUNCTION notify_daily_aggregates_change();
+CREATE TRIGGER {TRUNCATE_TRIGGER_NAME} AFTER TRUNCATE ON "daily_aggregates"
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_daily_aggregates_change();
+"""
+
+def notify_triggers_installed(cur) -> bool:
+    """Whether both NOTIFY triggers exist on daily_aggregates"""
+    cur.execute("""
+        SELECT COUNT(*) AS count FROM pg_trigger
+        WHERE tgrelid = to_regclass('daily_aggregates') AND tgname IN (%s, %s)
+    """, (TRIGGER_NAME, TRUNCATE_TRIGGER_NAME))
+    row = cur.fetchone()
+    return (row['count'] if isinstance(row, dict) else row[0]) == 2
+
+def install_notify_trigger(conn, logger: logging.Logger = None) -> bool:
+    """
+    Create the NOTIFY triggers on daily_aggregates unless they already exist
+
+    Returns:
+        True when the triggers were created by this call
+    """
+    logger = logger or logging.getLogger(__name__)
+    with conn.cursor() as cur:
+        if notify_triggers_installed(cur):
+            return False
+
+        cur.execute(NOTIFY_FUNCTION_SQL)
+        cur.execute(f'DROP TRIGGER IF EXISTS {TRIGGER_NAME} ON "daily_aggregates"')
+        cur.execute(f'DROP TRIGGER IF EXISTS {TRUNCATE_TRIGGER_NAME} ON "daily_aggregates"')
+        cur.execute(CREATE_TRIGGERS_SQL)
+    conn.commit()
+    logger.info(f"Installed {CHANGE_CHANNEL} NOTIFY triggers on daily_aggregates")
+    return True
+
+class PostgresChangeFeed:
+    """
+    Background LISTEN loop forwarding batches of daily_aggregates row changes
+
+    is_live() tells whether changes are actually being announced (listening,
+    with the triggers installed); dashboards keep polling while it is not.
+    """
+
+    def __init__(self, on_change: Callable[[List[Dict[str, Any]]], None],
+                 on_resync: Optional[Callable[[], None]] = None, channel: str = CHANGE_CHANNEL,
+                 debounce_ms: Optional[int] = None, max_batch: int = 500,
+                 connect_kwargs: Optional[Dict[str, Any]] = None, logger: logging.Logger = None):
+        """
+        Args:
+            on_change: Called with the changes of one debounce window, oldest first
+                ({'op', 'ticker', 'date', 'open', ...}, or just {'op': 'TRUNCATE'})
+            on_resync: Called after reconnecting, or instead of on_change when a
+                window overflowed max_batch, since changes were then missed
+            channel: NOTIFY channel to LISTEN on
+            debounce_ms: How long to collect changes before forwarding them (default from config)
+            max_batch: Changes kept per batch; bulk loads keep only the newest
+            connect_kwargs: psycopg2.connect arguments (default the configured database)
+        """
+        self.on_change = on_change
+        self.on_resync = on_resync
+        self.channel = channel
+        self.debounce_seconds = (config.change_feed_debounce_ms if debounce_ms is None else debounce_ms) / 1000
+        self.max_batch = max_batch
+        self.connect_kwargs = connect_kwargs or {
+            'host': config.db_host,
+            'port': config.db_port,
+            'database': config.db_name,
+            'user': config.db_user,
+            'password': config.db_password
+        }
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.listening = False
+        self.triggers_installed: Optional[bool] = None
+
+    def _connect(self):
+        """Open the dedicated LISTEN connection"""
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {self.channel}")
+        return conn
+
+    def _check_triggers(self, conn):
+        """Record whether the NOTIFY triggers exist (their install may have failed)"""
+        with conn.cursor() as cur:
+            installed = notify_triggers_installed(cur)
+        if not installed and self.triggers_installed is not False:
+            self.logger.warning("daily_aggregates NOTIFY triggers are missing; dashboards keep polling")
+        self.triggers_installed = installed
+
+    def is_live(self) -> bool:
+        """Whether this worker is receiving daily_aggregates changes right now"""
+        return (self.thread is not None and self.thread.is_alive() and self.listening
+                and self.triggers_installed)
+
+    def _drain(self, conn, pending: List[Dict[str, Any]]) -> int:
+        """
+        Move received notifications into the pending batch
+
+        Returns:
+            Number of older changes dropped to keep the batch within max_batch
+        """
+        conn.poll()
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                pending.append(json.loads(notify.payload))
+            except ValueError:
+                self.logger.warning(f"Ignoring malformed {self.channel} payload: {notify.payload!r}")
+        dropped = max(len(pending) - self.max_batch, 0)
+        del pending[:dropped]
+        return dropped
+
+    def _flush(self, batch: List[Dict[str, Any]], dropped: int):
+        """Forward one debounce window, as a resync when changes were dropped from it"""
+        try:
+            if dropped and self.on_resync is not None:
+                self.logger.info(f"{dropped + len(batch)} changes in one window exceed max_batch "
+                                 f"({self.max_batch}), resyncing")
+                self.on_resync()
+            else:
+                if dropped:
+                    self.logger.warning(f"Dropped {dropped} older changes over max_batch ({self.max_batch})")
+                self.on_change(batch)
+        except Exception as e:
+            self.logger.error(f"Postgres change feed callback failed: {e}")
+
+    def _listen(self, conn):
+        """Wait for notifications and flush them once per debounce window"""
+        pending: List[Dict[str, Any]] = []
+        dropped = 0
+        flush_at = None
+        checked_at = time.monotonic()
+        while not self.stop_event.is_set():
+            if not self.triggers_installed and time.monotonic() - checked_at >= TRIGGER_CHECK_SECONDS:
+                self._check_triggers(conn)
+                checked_at = time.monotonic()
+
+            timeout = max(flush_at - time.monotonic(), 0) if flush_at is not None else 1.0
+            readable, _, _ = select.select([conn], [], [], timeout)
+            if readable:
+                dropped += self._drain(conn, pending)
+                if pending and flush_at is None:
+                    flush_at = time.monotonic() + self.debounce_seconds
+
+            if flush_at is not None and time.monotonic() >= flush_at:
+                batch, pending, flush_at = pending, [], None
+                self._flush(batch, dropped)
+                dropped = 0
+
+    def _loop(self):
+        """Connect and listen, reconnecting with backoff after connection loss"""
+        backoff = 1
+        connected_before = False
+        while not self.stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self._check_triggers(conn)
+                self.listening = True
+                backoff = 1
+
+                # Rows written while we were disconnected were never announced
+                if connected_before and self.on_resync is not None:
+                    self.on_resync()
+                connected_before = True
+
+                self._listen(conn)
+            except psycopg2.OperationalError as e:
+                self.logger.warning(f"Postgres change feed disconnected ({e}), reconnecting in {backoff}s")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                self.logger.error(f"Postgres change feed error: {e}")
+                self.stop_event.wait(backoff)
+            finally:
+                self.listening = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        """Start listening in a daemon thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='pg-change-feed', daemon=True)
+        self.thread.start()
+        self.logger.info(f"Postgres change feed listening on {self.channel} "
+                         f"(debounce {self.debounce_seconds * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop listening"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
@@ -26,6 +26,53 @@ class PolygonConfig:
         self.db_user = os.getenv('DB_USER', 'postgres')
         self.db_password = os.getenv('DB_PASSWORD', 'postgres')
         
+        # Redis Configuration (optional, used for health probes)
+        self.redis_host = os.getenv('REDIS_HOST', '')
+        self.redis_port = int(os.getenv('REDIS_PORT', '6379'))
+        self.redis_user = os.getenv('REDIS_USER', 'default')
+        self.redis_password = os.getenv('REDIS_PASSWORD', '')
+        
+        # Dashboard Change Feed Configuration
+        # Keyspace notifications also catch writers that do not publish (e.g. RDI jobs)
+        self.redis_keyspace_notifications = os.getenv('REDIS_KEYSPACE_NOTIFICATIONS', 'false').lower() == 'true'
+        self.change_feed_debounce_ms = int(os.getenv('CHANGE_FEED_DEBOUNCE_MS', '100'))
+        self.stock_snapshot_interval_seconds = int(os.getenv('STOCK_SNAPSHOT_INTERVAL_SECONDS', '60'))  # 0 disables
+        # LISTEN for daily_aggregates NOTIFY triggers (installed on startup when missing)
+        self.pg_change_feed_enabled = os.getenv('PG_CHANGE_FEED_ENABLED', 'true').lower() == 'true'
+        
+        # Market Anomaly Detection Configuration
+        # One worker watches every latest:* write and emits market_event when a tick is an outlier
+        self.anomaly_detection_enabled = os.getenv('ANOMALY_DETECTION_ENABLED', 'true').lower() == 'true'
+        self.anomaly_return_zscore = float(os.getenv('ANOMALY_RETURN_ZSCORE', '4.0'))
+        self.anomaly_volume_zscore = float(os.getenv('ANOMALY_VOLUME_ZSCORE', '4.0'))
+        self.anomaly_halflife_ticks = int(os.getenv('ANOMALY_HALFLIFE_TICKS', '100'))
+        self.anomaly_warmup_ticks = int(os.getenv('ANOMALY_WARMUP_TICKS', '30'))
+        self.anomaly_cooldown_seconds = int(os.getenv('ANOMALY_COOLDOWN_SECONDS', '300'))
+        
+        # Multi-Worker Dashboard Configuration
+        # Redis URL for cross-worker Socket.IO emits, e.g. redis://:password@host:6379/0 (empty: single worker)
+        self.socketio_message_queue = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+        self.dashboard_lease_ttl_seconds = int(os.getenv('DASHBOARD_LEASE_TTL_SECONDS', '60'))
+        
+        # Dashboard Connection Pool Configuration
+        # Requests beyond the pool size wait for a free connection rather than opening more
+        self.db_pool_max_connections = int(os.getenv('DB_POOL_MAX_CONNECTIONS', '10'))
+        self.db_pool_timeout_seconds = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '10'))
+        self.redis_pool_max_connections = int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', '50'))
+        self.redis_pool_timeout_seconds = float(os.getenv('REDIS_POOL_TIMEOUT_SECONDS', '5'))
+        
+        # API Response Cache Configuration
+        # Entries are invalidated when daily_aggregates changes; the TTL is a backstop (0 disables it)
+        self.response_cache_max_entries = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+        self.response_cache_max_mb = int(os.getenv('RESPONSE_CACHE_MAX_MB', '32'))
+        self.response_cache_ttl_seconds = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))
+        # Rows per server-side cursor round trip in streaming exports
+        self.export_batch_size = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+        # Each export holds a pooled connection for the whole download, so cap how many stream at once
+        self.export_max_concurrent = int(os.getenv('EXPORT_MAX_CONCURRENT', '2'))
+        # How often each worker checks stock_tickers for changes to its search index
+        self.ticker_search_refresh_seconds = int(os.getenv('TICKER_SEARCH_REFRESH_SECONDS', '30'))
+        
         # Data Fetching Configuration
         self.default_tickers = self._parse_tickers(os.getenv('DEFAULT_TICKERS', 'AAPL,GOOGL,MSFT,TSLA,AMZN'))
         self.fetch_interval_minutes = int(os.getenv('FETCH_INTERVAL_MINUTES', '60'))
@@ -49,6 +96,34 @@ class PolygonConfig:
         self.requests_per_minute = int(os.getenv('REQUESTS_PER_MINUTE', '5'))  # Free tier limit
         self.batch_size = int(os.getenv('BATCH_SIZE', '100'))
         
+        # Job Execution Configuration
+        self.job_workers = int(os.getenv('JOB_WORKERS', '4'))
+        self.job_timeout_seconds = int(os.getenv('JOB_TIMEOUT_SECONDS', '3600'))
+        self.job_lag_warn_seconds = int(os.getenv('JOB_LAG_WARN_SECONDS', '120'))
+        self.scheduler_tick_seconds = int(os.getenv('SCHEDULER_TICK_SECONDS', '5'))
+        
+        # Health Monitoring Configuration
+        self.health_probe_interval_seconds = int(os.getenv('HEALTH_PROBE_INTERVAL_SECONDS', '30'))
+        self.health_api_probe_interval_seconds = int(os.getenv('HEALTH_API_PROBE_INTERVAL_SECONDS', '300'))
+        self.health_db_latency_slo_ms = float(os.getenv('HEALTH_DB_LATENCY_SLO_MS', '100'))
+        self.health_redis_latency_slo_ms = float(os.getenv('HEALTH_REDIS_LATENCY_SLO_MS', '250'))
+        self.health_api_latency_slo_ms = float(os.getenv('HEALTH_API_LATENCY_SLO_MS', '2000'))
+        self.health_max_bar_age_hours = int(os.getenv('HEALTH_MAX_BAR_AGE_HOURS', '72'))
+        self.health_port = int(os.getenv('HEALTH_PORT', '0'))  # 0 disables the monitor's /healthz server
+        
+        # Replica Sharding Configuration
+        self.sharding_enabled = os.getenv('SHARDING_ENABLED', 'false').lower() == 'true'
+        self.shard_max_replicas = int(os.getenv('SHARD_MAX_REPLICAS', '16'))
+        self.shard_vnodes = int(os.getenv('SHARD_VNODES', '64'))
+        self.shard_refresh_seconds = int(os.getenv('SHARD_REFRESH_SECONDS', '30'))
+        
+        # Fetch Log Retention Configuration
+        self.log_retention_days = int(os.getenv('LOG_RETENTION_DAYS', '30'))
+        self.log_retention_mode = os.getenv('LOG_RETENTION_MODE', 'auto').lower()  # auto, partition or batched
+        self.log_partition_premake_days = int(os.getenv('LOG_PARTITION_PREMAKE_DAYS', '7'))
+        self.log_delete_batch_size = int(os.getenv('LOG_DELETE_BATCH_SIZE', '5000'))
+        self.log_delete_batch_sleep_seconds = float(os.getenv('LOG_DELETE_BATCH_SLEEP_SECONDS', '0.5'))
+        
         # Validate configuration
         self._validate_config()
     
@@ -71,12 +146,70 @@ class PolygonConfig:
         
         if self.requests_per_minute < 1:
             raise ValueError("REQUESTS_PER_MINUTE must be at least 1")
+        
+        if self.job_workers < 1:
+            raise ValueError("JOB_WORKERS must be at least 1")
+        
+        if self.scheduler_tick_seconds < 1:
+            raise ValueError("SCHEDULER_TICK_SECONDS must be at least 1")
+        
+        if self.log_retention_mode not in ('auto', 'partition', 'batched'):
+            raise ValueError("LOG_RETENTION_MODE must be one of: auto, partition, batched")
+        
+        if self.log_retention_days < 1:
+            raise ValueError("LOG_RETENTION_DAYS must be at least 1")
+        
+        if self.log_delete_batch_size < 1:
+            raise ValueError("LOG_DELETE_BATCH_SIZE must be at least 1")
+        
+        if self.shard_max_replicas < 1:
+            raise ValueError("SHARD_MAX_REPLICAS must be at least 1")
+        
+        if self.dashboard_lease_ttl_seconds < 10:
+            raise ValueError("DASHBOARD_LEASE_TTL_SECONDS must be at least 10")
+        
+        if self.db_pool_max_connections < 1:
+            raise ValueError("DB_POOL_MAX_CONNECTIONS must be at least 1")
+        
+        if self.redis_pool_max_connections < 2:
+            raise ValueError("REDIS_POOL_MAX_CONNECTIONS must be at least 2")
+        
+        if self.response_cache_max_entries < 1 or self.response_cache_max_mb < 1:
+            raise ValueError("RESPONSE_CACHE_MAX_ENTRIES and RESPONSE_CACHE_MAX_MB must be at least 1")
+        
+        if self.export_batch_size < 1:
+            raise ValueError("EXPORT_BATCH_SIZE must be at least 1")
+        
+        if not 1 <= self.export_max_concurrent < max(self.db_pool_max_connections, 2):
+            raise ValueError("EXPORT_MAX_CONCURRENT must be at least 1 and below DB_POOL_MAX_CONNECTIONS")
+        
+        if self.ticker_search_refresh_seconds < 1:
+            raise ValueError("TICKER_SEARCH_REFRESH_SECONDS must be at least 1")
+        
+        if self.anomaly_return_zscore <= 0 or self.anomaly_volume_zscore <= 0:
+            raise ValueError("ANOMALY_RETURN_ZSCORE and ANOMALY_VOLUME_ZSCORE must be positive")
+        
+        if self.anomaly_halflife_ticks < 1 or self.anomaly_warmup_ticks < 2:
+            raise ValueError("ANOMALY_HALFLIFE_TICKS must be at least 1 and ANOMALY_WARMUP_TICKS at least 2")
+        
+        if self.change_feed_debounce_ms < 0:
+            raise ValueError("CHANGE_FEED_DEBOUNCE_MS must not be negative")
+        
+        if self.health_probe_interval_seconds < 1:
+            raise ValueError("HEALTH_PROBE_INTERVAL_SECONDS must be at least 1")
     
     @property
     def database_url(self) -> str:
         """Get PostgreSQL connection URL"""
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
     
+    @property
+    def redis_url(self) -> Optional[str]:
+        """Get Redis connection URL, or None when Redis is not configured"""
+        if not self.redis_host:
+            return None
+        return f"redis://{self.redis_user}:{self.redis_password}@{self.redis_host}:{self.redis_port}/0"
+    
     @property
     def sqlalchemy_url(self) -> str:
         """Get SQLAlchemy connection URL"""
@@ -120,6 +253,22 @@ class PolygonConfig:
             'db_port': self.db_port,
             'db_name': self.db_name,
             'db_user': self.db_user,
+            'redis_host': self.redis_host,
+            'redis_port': self.redis_port,
+            'redis_keyspace_notifications': self.redis_keyspace_notifications,
+            'change_feed_debounce_ms': self.change_feed_debounce_ms,
+            'stock_snapshot_interval_seconds': self.stock_snapshot_interval_seconds,
+            'pg_change_feed_enabled': self.pg_change_feed_enabled,
+            'anomaly_detection_enabled': self.anomaly_detection_enabled,
+            'anomaly_return_zscore': self.anomaly_return_zscore,
+            'anomaly_volume_zscore': self.anomaly_volume_zscore,
+            'socketio_message_queue_set': bool(self.socketio_message_queue),
+            'dashboard_lease_ttl_seconds': self.dashboard_lease_ttl_seconds,
+            'db_pool_max_connections': self.db_pool_max_connections,
+            'redis_pool_max_connections': self.redis_pool_max_connections,
+            'response_cache_max_entries': self.response_cache_max_entries,
+            'response_cache_max_mb': self.response_cache_max_mb,
+            'export_max_concurrent': self.export_max_concurrent,
             'default_tickers': self.default_tickers,
             'fetch_interval_minutes': self.fetch_interval_minutes,
             'days_back_initial': self.days_back_initial,
@@ -130,7 +279,16 @@ class PolygonConfig:
             'enable_quotes': self.enable_quotes,
             'log_level': self.log_level,
             'requests_per_minute': self.requests_per_minute,
-            'batch_size': self.batch_size
+            'batch_size': self.batch_size,
+            'job_workers': self.job_workers,
+            'job_timeout_seconds': self.job_timeout_seconds,
+            'scheduler_tick_seconds': self.scheduler_tick_seconds,
+            'log_retention_days': self.log_retention_days,
+            'log_retention_mode': self.log_retention_mode,
+            'health_probe_interval_seconds': self.health_probe_interval_seconds,
+            'health_port': self.health_port,
+            'sharding_enabled': self.sharding_enabled,
+            'shard_max_replicas': self.shard_max_replicas
         }
 
 # Global configuration instance
@@ -12,6 +12,10 @@ from psycopg2.extras import RealDictCursor
 from sqlalchemy import create_engine, text
 from polygon import RESTClient
 from polygon_config import config
+from polygon_utils import RateLimiter
+
+# Shared by every fetcher and job in this process so their calls stay within REQUESTS_PER_MINUTE together
+api_rate_limiter = RateLimiter()
 
 class PolygonDataFetcher:
     """Main class for fetching and storing Polygon.io data"""
@@ -112,6 +116,7 @@ class PolygonDataFetcher:
         """Fetch ticker details from Polygon API"""
         try:
             self.logger.info(f"Fetching ticker details for {ticker}")
+            api_rate_limiter.acquire()
             ticker_details = self.polygon_client.get_ticker_details(ticker)
             
             if ticker_details and hasattr(ticker_details, 'results'):
@@ -145,6 +150,7 @@ class PolygonDataFetcher:
             self.logger.info(f"Fetching daily aggregates for {ticker} from {start_date} to {end_date}")
             
             # Fetch data from Polygon API
+            api_rate_limiter.acquire()
             aggs = self.polygon_client.list_aggs(
                 ticker=ticker,
                 multiplier=1,
@@ -204,6 +210,7 @@ class PolygonDataFetcher:
         """Fetch current market status"""
         try:
             self.logger.info("Fetching market status")
+            api_rate_limiter.acquire()
             status = self.polygon_client.get_market_status()
             
             if status and hasattr(status, 'results'):
@@ -258,9 +265,6 @@ class PolygonDataFetcher:
                     self.upsert_ticker(minimal_ticker)
                     self.logger.warning(f"Created minimal ticker entry for: {ticker}")
                 
-                # Rate limiting
-                time.sleep(60 / config.requests_per_minute)
-                
             except Exception as e:
                 self.logger.error(f"Failed to initialize ticker {ticker}: {e}")
     
@@ -277,9 +281,6 @@ class PolygonDataFetcher:
                 if config.enable_daily_aggregates:
                     self.fetch_daily_aggregates(ticker, str(start_date), str(end_date))
                 
-                # Rate limiting between tickers
-                time.sleep(60 / config.requests_per_minute)
-                
             except Exception as e:
                 self.logger.error(f"Failed to fetch historical data for {ticker}: {e}")
                 continue
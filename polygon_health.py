@@ -0,0 +1,285 @@
+"""
+Health monitoring for the Polygon.io pipeline
+Probes PostgreSQL, Redis and the Polygon.io API on a background cadence using
+pooled connections and serves the cached results, so health requests never
+trigger fresh queries
+"""
+
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Callable
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor
+from polygon_config import config
+
+STATUS_OK = 'ok'
+STATUS_DEGRADED = 'degraded'
+STATUS_DOWN = 'down'
+
+class HealthMonitor:
+    """Background prober that keeps a cached health snapshot per dependency"""
+
+    def __init__(self, redis_client=None, polygon_client=None, check_postgres: bool = True,
+                 logger: logging.Logger = None):
+        self.logger = logger or logging.getLogger('polygon_fetcher')
+        self.redis_client = redis_client
+        self.polygon_client = polygon_client
+        self.check_postgres = check_postgres
+        self.db_pool: Optional[ThreadedConnectionPool] = None
+
+        self.probe_interval = config.health_probe_interval_seconds
+        self.api_probe_interval = config.health_api_probe_interval_seconds
+        self.slos_ms = {
+            'postgres': config.health_db_latency_slo_ms,
+            'redis': config.health_redis_latency_slo_ms,
+            'polygon_api': config.health_api_latency_slo_ms
+        }
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.last_api_probe = 0.0
+
+        # Cached results, replaced wholesale after each probe round
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.freshness: Dict[str, Any] = {}
+        self.snapshot_cache: Dict[str, Any] = {
+            'status': STATUS_DOWN,
+            'checked_at': None,
+            'dependencies': {},
+            'freshness': {},
+            'message': 'Health probes have not run yet'
+        }
+
+    def get_db_pool(self) -> ThreadedConnectionPool:
+        """Create the probe connection pool on first use"""
+        if self.db_pool is None:
+            self.db_pool = ThreadedConnectionPool(
+                minconn=1,
+                maxconn=2,
+                host=config.db_host,
+                port=config.db_port,
+                database=config.db_name,
+                user=config.db_user,
+                password=config.db_password,
+                cursor_factory=RealDictCursor,
+                connect_timeout=5
+            )
+        return self.db_pool
+
+    def _timed_probe(self, name: str, probe: Callable[[], Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run a probe and wrap its outcome with latency and SLO information"""
+        slo_ms = self.slos_ms.get(name)
+        start_time = time.perf_counter()
+        try:
+            details = probe() or {}
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            within_slo = slo_ms is None or latency_ms <= slo_ms
+            result = {
+                'status': STATUS_OK if within_slo else STATUS_DEGRADED,
+                'latency_ms': round(latency_ms, 2),
+                'slo_ms': slo_ms,
+                'within_slo': within_slo,
+                'error': None
+            }
+            result.update(details)
+        except Exception as e:
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            self.logger.error(f"Health probe {name} failed: {e}")
+            result = {
+                'status': STATUS_DOWN,
+                'latency_ms': round(latency_ms, 2),
+                'slo_ms': slo_ms,
+                'within_slo': False,
+                'error': str(e)
+            }
+        result['checked_at'] = datetime.now().isoformat()
+        return result
+
+    def _probe_postgres(self) -> Dict[str, Any]:
+        """Check connectivity and collect ingestion freshness in one round trip"""
+        pool = self.get_db_pool()
+        conn = pool.getconn()
+        broken = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        latest.date AS latest_bar_date,
+                        latest.updated_at AS latest_ingested_at,
+                        (SELECT COUNT(*) FROM data_fetch_log
+                         WHERE created_at > NOW() - INTERVAL '24 hours'
+                         AND status = 'completed') AS recent_fetches
+                    FROM (SELECT 1) AS probe
+                    LEFT JOIN LATERAL (
+                        SELECT date, updated_at
+                        FROM daily_aggregates
+                        WHERE updated_at IS NOT NULL
+                        ORDER BY updated_at DESC
+                        LIMIT 1
+                    ) AS latest ON TRUE
+                """)
+                row = cur.fetchone()
+            conn.rollback()
+        except Exception:
+            broken = True
+            raise
+        finally:
+            pool.putconn(conn, close=broken)
+
+        latest_ingested_at = row['latest_ingested_at']
+        age_seconds = None
+        if latest_ingested_at is not None:
+            age_seconds = round((datetime.now() - latest_ingested_at).total_seconds(), 1)
+
+        max_age_seconds = config.health_max_bar_age_hours * 3600
+        self.freshness = {
+            'latest_bar_date': row['latest_bar_date'].isoformat() if row['latest_bar_date'] else None,
+            'latest_ingested_at': latest_ingested_at.isoformat() if latest_ingested_at else None,
+            'age_seconds': age_seconds,
+            'max_age_seconds': max_age_seconds,
+            'within_slo': age_seconds is not None and age_seconds <= max_age_seconds,
+            'recent_completed_fetches_24h': row['recent_fetches']
+        }
+        return {}
+
+    def _probe_redis(self) -> Dict[str, Any]:
+        """Ping Redis through the client's connection pool"""
+        self.redis_client.ping()
+        return {}
+
+    def _probe_api(self) -> Dict[str, Any]:
+        """Ask the Polygon.io API for the market status"""
+        status = self.polygon_client.get_market_status()
+        market = getattr(status, 'market', None)
+        return {'market': market}
+
+    def probe_all(self):
+        """Run every configured probe once and refresh the cached snapshot"""
+        results = dict(self.results)
+
+        if self.check_postgres:
+            results['postgres'] = self._timed_probe('postgres', self._probe_postgres)
+
+        if self.redis_client is not None:
+            results['redis'] = self._timed_probe('redis', self._probe_redis)
+
+        # The API probe spends rate-limited quota, so it runs on a slower cadence and
+        # only when the fetchers' shared bucket has a token to spare; otherwise the
+        # previous result stands and the probe is retried on the next cycle
+        now = time.time()
+        if self.polygon_client is not None and now - self.last_api_probe >= self.api_probe_interval:
+            from polygon_fetcher import api_rate_limiter
+            if api_rate_limiter.try_acquire():
+                results['polygon_api'] = self._timed_probe('polygon_api', self._probe_api)
+                self.last_api_probe = now
+            else:
+                self.logger.debug("Skipping Polygon.io API health probe: rate limit has no token available")
+
+        self._publish(results)
+
+    def _publish(self, results: Dict[str, Dict[str, Any]]):
+        """Build the snapshot served to health requests"""
+        statuses = [result['status'] for result in results.values()]
+        if STATUS_DOWN in statuses:
+            overall = STATUS_DOWN
+        elif STATUS_DEGRADED in statuses or (self.freshness and not self.freshness['within_slo']):
+            overall = STATUS_DEGRADED
+        else:
+            overall = STATUS_OK
+
+        snapshot = {
+            'status': overall,
+            'checked_at': datetime.now().isoformat(),
+            'probe_interval_seconds': self.probe_interval,
+            'dependencies': results,
+            'freshness': dict(self.freshness)
+        }
+
+        with self.lock:
+            self.results = results
+            self.snapshot_cache = snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the latest cached health snapshot without touching any dependency"""
+        with self.lock:
+            return self.snapshot_cache
+
+    def _loop(self):
+        """Background probe loop"""
+        while not self.stop_event.wait(self.probe_interval):
+            try:
+                self.probe_all()
+            except Exception as e:
+                self.logger.error(f"Health probe round failed: {e}")
+
+    def start(self):
+        """Run a first probe round, then keep probing in a daemon thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        try:
+            self.probe_all()
+        except Exception as e:
+            self.logger.error(f"Initial health probe round failed: {e}")
+        self.thread = threading.Thread(target=self._loop, name='health-monitor', daemon=True)
+        self.thread.start()
+        self.logger.info(f"Health monitor started (probe interval {self.probe_interval}s)")
+
+    def stop(self):
+        """Stop probing and release pooled connections"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        if self.db_pool is not None:
+            self.db_pool.closeall()
+            self.db_pool = None
+
+def health_http_status(snapshot: Dict[str, Any]) -> int:
+    """HTTP status for a snapshot: 503 only when a dependency is down"""
+    return 503 if snapshot['status'] == STATUS_DOWN else 200
+
+def register_health_endpoint(app, health_monitor: HealthMonitor):
+    """Add a /healthz route to a Flask app that serves the cached snapshot"""
+    from flask import jsonify
+
+    @app.route('/healthz')
+    def healthz():
+        """Cached health status with per-dependency latency and data freshness"""
+        snapshot = health_monitor.snapshot()
+        return jsonify(snapshot), health_http_status(snapshot)
+
+    return healthz
+
+def serve_health_http(health_monitor: HealthMonitor, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """
+    Serve /healthz from a background HTTP server for processes without Flask
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+    class HealthRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/healthz':
+                self.send_error(404)
+                return
+            snapshot = health_monitor.snapshot()
+            body = json.dumps(snapshot, default=str).encode('utf-8')
+            self.send_response(health_http_status(snapshot))
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), HealthRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name='health-http', daemon=True)
+    thread.start()
+    health_monitor.logger.info(f"Health endpoint listening on http://{host}:{port}/healthz")
+    return server
@@ -0,0 +1,239 @@
+"""
+Scheduled job execution for the Polygon.io monitor
+Dispatches scheduled jobs to a worker pool with per-job concurrency limits,
+overlap prevention, timeouts and lag/duration metrics
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional
+from polygon_config import config
+
+# Thread-local holding the cancel event of the job running on the current worker
+_job_context = threading.local()
+
+def job_should_stop() -> bool:
+    """
+    Check whether the job running on the current worker thread should stop
+
+    Long-running jobs call this between units of work (e.g. between tickers)
+    so that timeouts and shutdown can interrupt them cooperatively.
+
+    Returns:
+        True if the job has timed out or the runner is shutting down
+    """
+    cancel_event = getattr(_job_context, 'cancel_event', None)
+    return cancel_event is not None and cancel_event.is_set()
+
+class JobSpec:
+    """Registered job definition and its runtime metrics"""
+
+    def __init__(self, name: str, func: Callable, max_concurrency: int = 1,
+                 timeout_seconds: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.schedule_job = None
+
+        # Runtime state
+        self.active_runs: Dict[int, Dict[str, Any]] = {}
+        self.run_counter = 0
+
+        # Metrics
+        self.metrics = {
+            'dispatched': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'skipped_overlap': 0,
+            'last_lag_seconds': None,
+            'max_lag_seconds': 0.0,
+            'last_duration_seconds': None,
+            'max_duration_seconds': 0.0,
+            'total_duration_seconds': 0.0,
+            'last_started_at': None,
+            'last_finished_at': None,
+            'last_error': None
+        }
+
+class JobRunner:
+    """Worker pool that runs scheduled jobs off the main monitoring loop"""
+
+    def __init__(self, max_workers: int = None, logger: logging.Logger = None):
+        self.max_workers = max_workers or config.job_workers
+        self.logger = logger or logging.getLogger('polygon_fetcher')
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix='polygon-job')
+        self.jobs: Dict[str, JobSpec] = {}
+        self.lock = threading.Lock()
+
+    def register(self, name: str, func: Callable, max_concurrency: int = 1,
+                 timeout_seconds: Optional[float] = None) -> JobSpec:
+        """Register a job function under a unique name"""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} is already registered")
+
+        if timeout_seconds is None:
+            timeout_seconds = config.job_timeout_seconds
+
+        spec = JobSpec(name, func, max_concurrency, timeout_seconds)
+        self.jobs[name] = spec
+        return spec
+
+    def attach(self, name: str, schedule_job):
+        """
+        Bind a registered job to a `schedule` job so each trigger is dispatched
+        to the worker pool instead of running inline
+
+        Args:
+            name: Registered job name
+            schedule_job: Unfinished job from schedule.every(...)
+        """
+        spec = self.jobs[name]
+        spec.schedule_job = schedule_job
+        return schedule_job.do(self.dispatch, name)
+
+    def dispatch(self, name: str) -> bool:
+        """
+        Submit a job run to the worker pool
+
+        Returns:
+            True if the run was submitted, False if skipped due to overlap
+        """
+        spec = self.jobs[name]
+        dispatched_at = time.time()
+
+        # schedule keeps next_run at the planned time until the trigger returns
+        lag = 0.0
+        if spec.schedule_job is not None and spec.schedule_job.next_run is not None:
+            lag = max(0.0, (datetime.now() - spec.schedule_job.next_run).total_seconds())
+
+        with self.lock:
+            if len(spec.active_runs) >= spec.max_concurrency:
+                spec.metrics['skipped_overlap'] += 1
+                self.logger.warning(
+                    f"Skipping job {name}: {len(spec.active_runs)} run(s) still active "
+                    f"(limit {spec.max_concurrency})"
+                )
+                return False
+
+            spec.run_counter += 1
+            run_id = spec.run_counter
+            cancel_event = threading.Event()
+            spec.active_runs[run_id] = {
+                'dispatched_at': dispatched_at,
+                'started_at': None,
+                'cancel_event': cancel_event
+            }
+            spec.metrics['dispatched'] += 1
+
+        self.executor.submit(self._run, spec, run_id, dispatched_at, lag, cancel_event)
+        return True
+
+    def _run(self, spec: JobSpec, run_id: int, dispatched_at: float, schedule_lag: float,
+             cancel_event: threading.Event):
+        """Execute a job run on a worker thread and record its metrics"""
+        started_at = time.time()
+        # Total lag = time past the planned trigger + time spent waiting for a free worker
+        lag = schedule_lag + (started_at - dispatched_at)
+
+        with self.lock:
+            spec.active_runs[run_id]['started_at'] = started_at
+            spec.metrics['last_lag_seconds'] = round(lag, 3)
+            spec.metrics['max_lag_seconds'] = round(max(spec.metrics['max_lag_seconds'], lag), 3)
+            spec.metrics['last_started_at'] = datetime.fromtimestamp(started_at).isoformat()
+
+        if lag > config.job_lag_warn_seconds:
+            self.logger.warning(f"Job {spec.name} started {lag:.1f}s behind schedule")
+
+        _job_context.cancel_event = cancel_event
+        error = None
+        try:
+            spec.func()
+        except Exception as e:
+            error = e
+            self.logger.error(f"Job {spec.name} failed: {e}")
+        finally:
+            _job_context.cancel_event = None
+            duration = time.time() - started_at
+            timed_out = spec.timeout_seconds is not None and duration > spec.timeout_seconds
+
+            with self.lock:
+                spec.active_runs.pop(run_id, None)
+                metrics = spec.metrics
+                metrics['last_duration_seconds'] = round(duration, 3)
+                metrics['max_duration_seconds'] = round(max(metrics['max_duration_seconds'], duration), 3)
+                metrics['total_duration_seconds'] += duration
+                metrics['last_finished_at'] = datetime.now().isoformat()
+                if timed_out:
+                    metrics['timed_out'] += 1
+                if error is not None:
+                    metrics['failed'] += 1
+                    metrics['last_error'] = str(error)
+                else:
+                    metrics['completed'] += 1
+
+            self.logger.info(f"Job {spec.name} finished in {duration:.2f} seconds (lag {lag:.2f}s)")
+
+    def enforce_timeouts(self):
+        """
+        Signal cancellation to job runs that exceeded their timeout
+
+        Python threads cannot be killed, so timed-out runs are asked to stop via
+        job_should_stop() and keep their concurrency slot until they return.
+        """
+        now = time.time()
+        with self.lock:
+            for spec in self.jobs.values():
+                if spec.timeout_seconds is None:
+                    continue
+                for run_id, run in spec.active_runs.items():
+                    started_at = run['started_at']
+                    if started_at is None or run['cancel_event'].is_set():
+                        continue
+                    if now - started_at > spec.timeout_seconds:
+                        run['cancel_event'].set()
+                        self.logger.error(
+                            f"Job {spec.name} run {run_id} exceeded timeout of "
+                            f"{spec.timeout_seconds}s, requesting cancellation"
+                        )
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Get a snapshot of per-job metrics"""
+        with self.lock:
+            snapshot = {}
+            for name, spec in self.jobs.items():
+                metrics = dict(spec.metrics)
+                finished = metrics['completed'] + metrics['failed']
+                metrics['avg_duration_seconds'] = (
+                    round(metrics['total_duration_seconds'] / finished, 3) if finished else None
+                )
+                metrics['total_duration_seconds'] = round(metrics['total_duration_seconds'], 3)
+                metrics['active_runs'] = len(spec.active_runs)
+                metrics['max_concurrency'] = spec.max_concurrency
+                metrics['timeout_seconds'] = spec.timeout_seconds
+                snapshot[name] = metrics
+            return snapshot
+
+    def log_metrics(self):
+        """Log a summary line per job"""
+        for name, metrics in self.get_metrics().items():
+            self.logger.info(
+                f"Job {name}: dispatched={metrics['dispatched']} completed={metrics['completed']} "
+                f"failed={metrics['failed']} timed_out={metrics['timed_out']} "
+                f"skipped={metrics['skipped_overlap']} active={metrics['active_runs']} "
+                f"last_lag={metrics['last_lag_seconds']}s max_lag={metrics['max_lag_seconds']}s "
+                f"avg_duration={metrics['avg_duration_seconds']}s"
+            )
+
+    def shutdown(self, wait: bool = True):
+        """Cancel active runs and stop the worker pool"""
+        with self.lock:
+            for spec in self.jobs.values():
+                for run in spec.active_runs.values():
+                    run['cancel_event'].set()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -8,9 +8,13 @@ import schedule
 import signal
 import sys
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List
 from polygon_fetcher import PolygonDataFetcher
 from polygon_config import config
+from polygon_jobs import JobRunner, job_should_stop
+from polygon_retention import FetchLogRetention
+from polygon_health import HealthMonitor, serve_health_http, STATUS_OK
+from polygon_sharding import ReplicaCoordinator
 
 class PolygonMonitor:
     """Continuous monitoring service for Polygon.io data"""
@@ -18,9 +22,25 @@ class PolygonMonitor:
     def __init__(self):
         self.fetcher = PolygonDataFetcher()
         self.logger = self.fetcher.logger
+        self.jobs = JobRunner(logger=self.logger)
+        self.retention = FetchLogRetention(self.fetcher, self.logger)
+        self.health = HealthMonitor(
+            redis_client=self.create_redis_client(),
+            polygon_client=self.fetcher.polygon_client,
+            logger=self.logger
+        )
+        self.health_server = None
+        self.sharding = ReplicaCoordinator(logger=self.logger) if config.sharding_enabled else None
         self.running = True
         self.setup_signal_handlers()
         
+    def create_redis_client(self):
+        """Create a Redis client for health probes if Redis is configured"""
+        if not config.redis_url:
+            return None
+        import redis
+        return redis.Redis.from_url(config.redis_url, decode_responses=True, socket_timeout=5)
+    
     def setup_signal_handlers(self):
         """Setup signal handlers for graceful shutdown"""
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -31,6 +51,25 @@ class PolygonMonitor:
         self.logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
     
+    def refresh_shards(self):
+        """Refresh replica membership so shards follow replicas joining or dying"""
+        if self.sharding is None:
+            return
+        try:
+            self.sharding.refresh()
+        except Exception as e:
+            self.logger.error(f"Failed to refresh replica shards: {e}")
+    
+    def get_assigned_tickers(self) -> List[str]:
+        """Get the tickers this replica is responsible for"""
+        if self.sharding is None:
+            return config.default_tickers
+        
+        self.refresh_shards()
+        tickers = self.sharding.assigned_tickers(config.default_tickers)
+        self.logger.debug(f"Replica slot {self.sharding.slot} owns {len(tickers)} tickers: {', '.join(tickers)}")
+        return tickers
+    
     def is_market_hours(self) -> bool:
         """Check if current time is during market hours (9:30 AM - 4:00 PM ET)"""
         try:
@@ -61,14 +100,15 @@ class PolygonMonitor:
             yesterday = (datetime.now() - timedelta(days=1)).date()
             date_str = str(yesterday)
             
-            for ticker in config.default_tickers:
+            for ticker in self.get_assigned_tickers():
+                if job_should_stop():
+                    self.logger.warning("Daily data fetch cancelled before completing all tickers")
+                    break
+                
                 try:
                     if config.enable_daily_aggregates:
                         self.fetcher.fetch_daily_aggregates(ticker, date_str, date_str)
                     
-                    # Rate limiting
-                    time.sleep(60 / config.requests_per_minute)
-                    
                 except Exception as e:
                     self.logger.error(f"Failed to fetch daily data for {ticker}: {e}")
                     continue
@@ -96,15 +136,15 @@ class PolygonMonitor:
                 today = datetime.now().date()
                 date_str = str(today)
                 
-                for ticker in config.default_tickers:
+                for ticker in self.get_assigned_tickers():
+                    if job_should_stop():
+                        break
+                    
                     try:
                         # Note: Minute aggregates require a paid plan
                         # This is a placeholder for when you upgrade
                         self.logger.info(f"Would fetch minute data for {ticker} (requires paid plan)")
                         
-                        # Rate limiting
-                        time.sleep(60 / config.requests_per_minute)
-                        
                     except Exception as e:
                         self.logger.error(f"Failed to fetch current data for {ticker}: {e}")
                         continue
@@ -117,16 +157,17 @@ class PolygonMonitor:
         self.logger.info("Updating ticker information")
         
         try:
-            for ticker in config.default_tickers:
+            for ticker in self.get_assigned_tickers():
+                if job_should_stop():
+                    self.logger.warning("Ticker information update cancelled before completing all tickers")
+                    break
+                
                 try:
                     ticker_data = self.fetcher.fetch_ticker_details(ticker)
                     if ticker_data:
                         self.fetcher.upsert_ticker(ticker_data)
                         self.logger.debug(f"Updated ticker info for {ticker}")
                     
-                    # Rate limiting
-                    time.sleep(60 / config.requests_per_minute)
-                    
                 except Exception as e:
                     self.logger.error(f"Failed to update ticker info for {ticker}: {e}")
                     continue
@@ -140,49 +181,39 @@ class PolygonMonitor:
         """Clean up old fetch logs to prevent database bloat"""
         try:
             self.logger.info("Cleaning up old fetch logs")
-            
-            with self.fetcher.connect_db() as conn:
-                with conn.cursor() as cur:
-                    # Delete logs older than 30 days
-                    cur.execute("""
-                        DELETE FROM data_fetch_log 
-                        WHERE created_at < NOW() - INTERVAL '30 days'
-                    """)
-                    deleted_count = cur.rowcount
-                    conn.commit()
-                    
-                    self.logger.info(f"Cleaned up {deleted_count} old fetch log entries")
-                    
+            self.retention.cleanup()
         except Exception as e:
             self.logger.error(f"Failed to cleanup old logs: {e}")
     
+    def maintain_log_partitions(self):
+        """Pre-create upcoming data_fetch_log partitions (no-op when unpartitioned)"""
+        try:
+            self.retention.ensure_partitions()
+        except Exception as e:
+            self.logger.error(f"Failed to maintain fetch log partitions: {e}")
+    
     def health_check(self):
-        """Perform health check on the system"""
+        """Log the cached health status gathered by the background health monitor"""
         try:
             self.logger.debug("Performing health check")
+            snapshot = self.health.snapshot()
             
-            # Check database connection
-            with self.fetcher.connect_db() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("SELECT 1")
-                    cur.fetchone()
+            for name, result in snapshot['dependencies'].items():
+                if result['status'] != STATUS_OK:
+                    self.logger.warning(
+                        f"Health check: {name} is {result['status']} "
+                        f"(latency {result['latency_ms']}ms, SLO {result['slo_ms']}ms, error: {result['error']})"
+                    )
             
-            # Check recent fetch activity
-            with self.fetcher.connect_db() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT COUNT(*) as recent_fetches
-                        FROM data_fetch_log 
-                        WHERE created_at > NOW() - INTERVAL '24 hours'
-                        AND status = 'completed'
-                    """)
-                    result = cur.fetchone()
-                    recent_fetches = result['recent_fetches'] if result else 0
-                    
-                    if recent_fetches == 0:
-                        self.logger.warning("No successful fetches in the last 24 hours")
-                    else:
-                        self.logger.debug(f"Health check passed: {recent_fetches} successful fetches in last 24h")
+            freshness = snapshot.get('freshness') or {}
+            recent_fetches = freshness.get('recent_completed_fetches_24h', 0)
+            if recent_fetches == 0:
+                self.logger.warning("No successful fetches in the last 24 hours")
+            else:
+                self.logger.debug(f"Health check passed: {recent_fetches} successful fetches in last 24h")
+            
+            if freshness and not freshness['within_slo']:
+                self.logger.warning(f"Latest ingested bar is stale: {freshness['latest_ingested_at']}")
             
         except Exception as e:
             self.logger.error(f"Health check failed: {e}")
@@ -191,21 +222,39 @@ class PolygonMonitor:
         """Setup the monitoring schedule"""
         self.logger.info("Setting up monitoring schedule")
         
+        # Jobs run on the worker pool; each allows one run at a time so slow runs never pile up
+        self.jobs.register('fetch_latest_daily_data', self.fetch_latest_daily_data)
+        self.jobs.register('update_ticker_info', self.update_ticker_info)
+        self.jobs.register('cleanup_old_logs', self.cleanup_old_logs)
+        self.jobs.register('maintain_log_partitions', self.maintain_log_partitions, timeout_seconds=300)
+        self.jobs.register('health_check', self.health_check, timeout_seconds=300)
+        self.jobs.register('fetch_current_market_data', self.fetch_current_market_data, timeout_seconds=15 * 60)
+        
         # Daily data fetch - run after market close (5 PM ET)
-        schedule.every().day.at("22:00").do(self.fetch_latest_daily_data)  # 5 PM ET = 10 PM UTC (approximate)
+        self.jobs.attach('fetch_latest_daily_data', schedule.every().day.at("22:00"))  # 5 PM ET = 10 PM UTC (approximate)
         
         # Update ticker info - weekly on Sunday
-        schedule.every().sunday.at("06:00").do(self.update_ticker_info)
+        self.jobs.attach('update_ticker_info', schedule.every().sunday.at("06:00"))
         
         # Cleanup old logs - monthly
-        schedule.every().monday.at("02:00").do(self.cleanup_old_logs)
+        self.jobs.attach('cleanup_old_logs', schedule.every().monday.at("02:00"))
+        
+        # Fetch log partitions - daily, well before the next day's partition is needed
+        self.jobs.attach('maintain_log_partitions', schedule.every().day.at("00:30"))
         
         # Health check - every 6 hours
-        schedule.every(6).hours.do(self.health_check)
+        self.jobs.attach('health_check', schedule.every(6).hours)
         
         # Current market data - every 15 minutes during market hours
         if config.enable_realtime:
-            schedule.every(15).minutes.do(self.fetch_current_market_data)
+            self.jobs.attach('fetch_current_market_data', schedule.every(15).minutes)
+        
+        # Replica membership - keeps ticker shards balanced across live replicas
+        if self.sharding is not None:
+            schedule.every(config.shard_refresh_seconds).seconds.do(self.refresh_shards)
+        
+        # Job metrics summary - hourly, runs inline since it only reads counters
+        schedule.every().hour.do(self.jobs.log_metrics)
         
         self.logger.info("Monitoring schedule configured")
         self.logger.info("Scheduled jobs:")
@@ -217,17 +266,29 @@ class PolygonMonitor:
         self.logger.info("Starting Polygon.io data monitor")
         self.logger.info(f"Monitoring {len(config.default_tickers)} tickers: {', '.join(config.default_tickers)}")
         
+        # Claim a replica slot so the ticker universe is split across replicas
+        if self.sharding is not None:
+            self.sharding.join()
+            self.refresh_shards()
+        
         # Setup schedule
         self.setup_schedule()
         
-        # Run initial health check
+        # Make sure today's fetch log partitions exist before any job logs a fetch
+        self.maintain_log_partitions()
+        
+        # Start background health probes and run initial health check
+        self.health.start()
+        if config.health_port:
+            self.health_server = serve_health_http(self.health, config.health_port)
         self.health_check()
         
         # Main monitoring loop
         while self.running:
             try:
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                self.jobs.enforce_timeouts()
+                time.sleep(config.scheduler_tick_seconds)
                 
             except KeyboardInterrupt:
                 self.logger.info("Received keyboard interrupt")
@@ -236,6 +297,14 @@ class PolygonMonitor:
                 self.logger.error(f"Error in monitoring loop: {e}")
                 time.sleep(60)  # Wait before retrying
         
+        self.logger.info("Waiting for running jobs to stop...")
+        self.jobs.shutdown()
+        self.jobs.log_metrics()
+        if self.health_server is not None:
+            self.health_server.shutdown()
+        self.health.stop()
+        if self.sharding is not None:
+            self.sharding.leave()
         self.logger.info("Polygon.io data monitor stopped")
 
 def main():
@@ -0,0 +1,254 @@
+"""
+Retention management for the data_fetch_log table
+Drops whole daily partitions when the table is partitioned (see
+partition_data_fetch_log.sql), otherwise deletes expired rows in small,
+throttled batches
+"""
+
+import time
+import logging
+from datetime import datetime, timedelta, date
+from typing import List, Optional, Tuple
+from polygon_config import config
+from polygon_jobs import job_should_stop
+
+PARTITION_PREFIX = 'data_fetch_log_p'
+DEFAULT_PARTITION = 'data_fetch_log_default'
+
+class FetchLogRetention:
+    """Keeps data_fetch_log within its retention window without long-running deletes"""
+
+    def __init__(self, fetcher, logger: logging.Logger = None):
+        self.fetcher = fetcher
+        self.logger = logger or logging.getLogger('polygon_fetcher')
+
+    def is_partitioned(self) -> bool:
+        """Check whether data_fetch_log is a partitioned table"""
+        with self.fetcher.connect_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT COUNT(*) AS partitioned
+                    FROM pg_partitioned_table
+                    WHERE partrelid = to_regclass('data_fetch_log')
+                """)
+                result = cur.fetchone()
+                return bool(result and result['partitioned'])
+
+    def resolve_mode(self) -> str:
+        """Resolve the configured retention mode ('auto' picks based on the table layout)"""
+        mode = config.log_retention_mode
+        if mode == 'auto':
+            return 'partition' if self.is_partitioned() else 'batched'
+        return mode
+
+    def ensure_partitions(self, days_ahead: Optional[int] = None) -> int:
+        """
+        Create daily partitions from today through days_ahead, plus the default
+        partition catching rows no daily partition covers
+
+        Returns:
+            Number of partitions created (0 if the table is not partitioned)
+        """
+        if days_ahead is None:
+            days_ahead = config.log_partition_premake_days
+
+        if not self.is_partitioned():
+            self.logger.debug("data_fetch_log is not partitioned, skipping partition creation")
+            return 0
+
+        with self.fetcher.connect_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "data_fetch_log" DEFAULT')
+                cur.execute("""
+                    SELECT create_data_fetch_log_partitions(CURRENT_DATE, CURRENT_DATE + %s) AS created
+                """, (days_ahead,))
+                created = cur.fetchone()['created']
+                conn.commit()
+
+        if created:
+            self.logger.info(f"Created {created} new data_fetch_log partition(s)")
+        return created
+
+    def list_partitions(self) -> List[Tuple[str, date]]:
+        """List (partition name, partition day) pairs ordered oldest first"""
+        with self.fetcher.connect_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT c.relname AS partition_name
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = to_regclass('data_fetch_log')
+                """)
+                rows = cur.fetchall()
+
+        partitions = []
+        for row in rows:
+            name = row['partition_name']
+            if not name.startswith(PARTITION_PREFIX):
+                continue
+            try:
+                day = datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d').date()
+            except ValueError:
+                self.logger.warning(f"Ignoring partition with unexpected name: {name}")
+                continue
+            partitions.append((name, day))
+
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    def _detach_partition(self, cur, name: str, concurrently: bool = True):
+        """
+        Detach a partition, without blocking writers to data_fetch_log when possible
+
+        DETACH ... CONCURRENTLY is not allowed while a default partition exists,
+        and one interrupted partway leaves the partition pending detach, which
+        only DETACH ... FINALIZE completes.
+        """
+        cur.execute("""
+            SELECT i.inhdetachpending AS pending,
+                   EXISTS (SELECT 1 FROM pg_partitioned_table p
+                           WHERE p.partrelid = i.inhparent AND p.partdefid <> 0) AS has_default
+            FROM pg_inherits i
+            WHERE i.inhrelid = to_regclass(%s) AND i.inhparent = to_regclass('data_fetch_log')
+        """, (name,))
+        row = cur.fetchone()
+        if row is None:  # Already detached, e.g. by a run that failed before dropping it
+            return
+        if row['pending']:
+            self.logger.info(f"Finalizing interrupted detach of {name}")
+            cur.execute(f'ALTER TABLE "data_fetch_log" DETACH PARTITION "{name}" FINALIZE')
+            return
+        if row['has_default'] or not concurrently:
+            cur.execute(f'ALTER TABLE "data_fetch_log" DETACH PARTITION "{name}"')
+            return
+        try:
+            cur.execute(f'ALTER TABLE "data_fetch_log" DETACH PARTITION "{name}" CONCURRENTLY')
+        except Exception as e:
+            # A failure in its second transaction leaves the detach pending
+            self.logger.warning(f"Concurrent detach of {name} failed ({e}), finishing it without CONCURRENTLY")
+            self._detach_partition(cur, name, concurrently=False)
+
+    def delete_expired_default_rows(self, retention_days: int) -> int:
+        """Delete expired rows that landed in the default partition (normally none)"""
+        with self.fetcher.connect_db() as conn:
+            with conn.cursor() as cur:
+                if not self._table_exists(cur, DEFAULT_PARTITION):
+                    return 0
+                cur.execute(f"""
+                    DELETE FROM "{DEFAULT_PARTITION}"
+                    WHERE created_at < CURRENT_DATE - make_interval(days => %s)
+                """, (retention_days,))
+                deleted = cur.rowcount
+                conn.commit()
+        if deleted:
+            self.logger.info(f"Deleted {deleted} expired rows from {DEFAULT_PARTITION}")
+        return deleted
+
+    @staticmethod
+    def _table_exists(cur, name: str) -> bool:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL AS exists", (name,))
+        return cur.fetchone()['exists']
+
+    def drop_expired_partitions(self, retention_days: Optional[int] = None) -> int:
+        """
+        Detach and drop partitions whose whole day range is older than the retention
+        window, and delete expired rows from the default partition
+
+        Returns:
+            Number of partitions dropped
+        """
+        if retention_days is None:
+            retention_days = config.log_retention_days
+
+        cutoff = datetime.now().date() - timedelta(days=retention_days)
+        dropped = 0
+
+        try:
+            self.delete_expired_default_rows(retention_days)
+        except Exception as e:
+            self.logger.error(f"Failed to clean up {DEFAULT_PARTITION}: {e}")
+
+        for name, day in self.list_partitions():
+            # A partition covers [day, day + 1); keep it while any of it is inside the window
+            if day + timedelta(days=1) > cutoff:
+                break
+            if job_should_stop():
+                self.logger.warning("Partition retention cancelled before dropping all expired partitions")
+                break
+
+            conn = self.fetcher.connect_db()
+            try:
+                # DETACH ... CONCURRENTLY cannot run inside a transaction block
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    self._detach_partition(cur, name)
+                    cur.execute(f'DROP TABLE "{name}"')
+                dropped += 1
+                self.logger.info(f"Dropped expired data_fetch_log partition {name}")
+            except Exception as e:
+                self.logger.error(f"Failed to drop partition {name}: {e}")
+            finally:
+                conn.close()
+
+        return dropped
+
+    def batched_delete(self, retention_days: Optional[int] = None, batch_size: Optional[int] = None,
+                       batch_sleep_seconds: Optional[float] = None) -> int:
+        """
+        Delete expired rows in short transactions, pausing between batches
+
+        Each batch holds its locks only briefly and gives autovacuum room to
+        keep up, unlike a single unbounded DELETE.
+
+        Returns:
+            Total number of rows deleted
+        """
+        if retention_days is None:
+            retention_days = config.log_retention_days
+        if batch_size is None:
+            batch_size = config.log_delete_batch_size
+        if batch_sleep_seconds is None:
+            batch_sleep_seconds = config.log_delete_batch_sleep_seconds
+
+        total_deleted = 0
+
+        with self.fetcher.connect_db() as conn:
+            with conn.cursor() as cur:
+                while not job_should_stop():
+                    cur.execute("""
+                        DELETE FROM data_fetch_log
+                        WHERE id IN (
+                            SELECT id FROM data_fetch_log
+                            WHERE created_at < NOW() - make_interval(days => %s)
+                            ORDER BY created_at
+                            LIMIT %s
+                        )
+                    """, (retention_days, batch_size))
+                    deleted = cur.rowcount
+                    conn.commit()
+                    total_deleted += deleted
+
+                    if deleted < batch_size:
+                        break
+
+                    self.logger.debug(f"Deleted batch of {deleted} fetch log entries, {total_deleted} so far")
+                    time.sleep(batch_sleep_seconds)
+
+        return total_deleted
+
+    def cleanup(self) -> int:
+        """
+        Apply retention using the configured mode
+
+        Returns:
+            Partitions dropped (partition mode) or rows deleted (batched mode)
+        """
+        mode = self.resolve_mode()
+
+        if mode == 'partition':
+            dropped = self.drop_expired_partitions()
+            self.logger.info(f"Retention dropped {dropped} expired fetch log partition(s)")
+            return dropped
+
+        deleted = self.batched_delete()
+        self.logger.info(f"Cleaned up {deleted} old fetch log entries")
+        return deleted
@@ -0,0 +1,167 @@
+"""
+Ticker-universe sharding across PolygonMonitor replicas
+Each replica claims a slot by holding a session-level PostgreSQL advisory lock.
+Live replicas are read back from pg_locks and tickers are split between them
+with a consistent hash ring, so shards rebalance as soon as a replica joins or
+its session dies
+"""
+
+import bisect
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Dict
+import psycopg2
+from polygon_config import config
+
+# First key of the two-int advisory lock; the second key is the replica slot
+SHARD_LOCK_NAMESPACE = 0x504F4C59  # 'POLY'
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes: List[str], vnodes: int = 64):
+        self.vnodes = vnodes
+        self.ring: List[int] = []
+        self.owners: Dict[int, str] = {}
+        for node in nodes:
+            for i in range(vnodes):
+                position = self._hash(f"{node}#{i}")
+                self.owners[position] = node
+                self.ring.append(position)
+        self.ring.sort()
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def get_node(self, key: str) -> Optional[str]:
+        """Get the node owning a key"""
+        if not self.ring:
+            return None
+        index = bisect.bisect(self.ring, self._hash(key)) % len(self.ring)
+        return self.owners[self.ring[index]]
+
+class ReplicaCoordinator:
+    """Claims a replica slot and computes this replica's share of the ticker universe"""
+
+    def __init__(self, max_replicas: int = None, logger: logging.Logger = None):
+        self.max_replicas = max_replicas or config.shard_max_replicas
+        self.logger = logger or logging.getLogger('polygon_fetcher')
+        self.conn = None
+        self.slot: Optional[int] = None
+        self.live_slots: List[int] = []
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        """Open the session that holds the advisory lock for this replica's lifetime"""
+        conn = psycopg2.connect(
+            host=config.db_host,
+            port=config.db_port,
+            database=config.db_name,
+            user=config.db_user,
+            password=config.db_password,
+            application_name='polygon_monitor',
+            # Client-side keepalives: this replica notices a dead server or network path and
+            # reconnects. A replica that dies silently (host crash, partition) is only noticed
+            # by the server through its own tcp_keepalives_* settings or idle_session_timeout,
+            # which end the session and release its advisory lock
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3
+        )
+        conn.autocommit = True
+        return conn
+
+    def join(self) -> int:
+        """
+        Claim the lowest free replica slot
+
+        Returns:
+            The slot number held by this replica
+        """
+        with self.lock:
+            if self.conn is None or self.conn.closed:
+                self.conn = self._connect()
+                self.slot = None
+
+            if self.slot is not None:
+                return self.slot
+
+            with self.conn.cursor() as cur:
+                for slot in range(self.max_replicas):
+                    cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (SHARD_LOCK_NAMESPACE, slot))
+                    if cur.fetchone()[0]:
+                        self.slot = slot
+                        self.logger.info(f"Joined ticker sharding as replica slot {slot}")
+                        return slot
+
+            raise RuntimeError(f"All {self.max_replicas} replica slots are taken (SHARD_MAX_REPLICAS)")
+
+    def leave(self):
+        """Release the replica slot so the remaining replicas take over its tickers"""
+        with self.lock:
+            if self.conn is None:
+                return
+            try:
+                if not self.conn.closed and self.slot is not None:
+                    with self.conn.cursor() as cur:
+                        cur.execute("SELECT pg_advisory_unlock(%s, %s)", (SHARD_LOCK_NAMESPACE, self.slot))
+                self.conn.close()
+            except Exception as e:
+                self.logger.warning(f"Failed to release replica slot cleanly: {e}")
+            finally:
+                self.logger.info(f"Left ticker sharding (slot {self.slot})")
+                self.conn = None
+                self.slot = None
+
+    def refresh(self) -> List[int]:
+        """
+        Re-read live replica slots from pg_locks, rejoining if our session was lost
+
+        Returns:
+            Sorted list of live replica slots
+        """
+        try:
+            self.join()
+            with self.lock:
+                with self.conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT objid
+                        FROM pg_locks
+                        WHERE locktype = 'advisory'
+                        AND classid = %s
+                        AND objsubid = 2
+                        AND granted
+                        AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+                        ORDER BY objid
+                    """, (SHARD_LOCK_NAMESPACE,))
+                    live_slots = [row[0] for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            # Our session may be gone (and with it the lock); rejoin on the next refresh
+            self.logger.error(f"Replica membership refresh failed: {e}")
+            with self.lock:
+                if self.conn is not None and self.conn.closed:
+                    self.conn = None
+                    self.slot = None
+            return self.live_slots
+
+        if live_slots != self.live_slots:
+            self.logger.info(f"Replica membership changed: {self.live_slots} -> {live_slots}, rebalancing shards")
+            self.live_slots = live_slots
+        return live_slots
+
+    def assigned_tickers(self, tickers: List[str]) -> List[str]:
+        """
+        Get the tickers owned by this replica
+
+        Falls back to the whole universe while membership is unknown, so a
+        replica never silently stops fetching.
+        """
+        if self.slot is None or not self.live_slots or self.slot not in self.live_slots:
+            return list(tickers)
+
+        ring = HashRing([f"replica-{slot}" for slot in self.live_slots], vnodes=config.shard_vnodes)
+        me = f"replica-{self.slot}"
+        return [ticker for ticker in tickers if ring.get_node(ticker) == me]
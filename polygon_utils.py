@@ -6,6 +6,7 @@ Includes retry logic, error handling, and helper functions
 import time
 import logging
 import functools
+import threading
 from typing import Callable, Any, Optional, Dict
 from datetime import datetime, timezone
 import psycopg2
@@ -81,6 +82,63 @@ def rate_limit(requests_per_minute: int = None):
         return wrapper
     return decorator
 
+class RateLimiter:
+    """
+    Thread-safe token bucket for API calls
+
+    One instance is shared by every thread calling the same API key: each
+    request reserves a token and sleeps until it is due, so concurrent jobs
+    stay within requests_per_minute together instead of each pacing itself.
+    """
+
+    def __init__(self, requests_per_minute: int = None, burst: int = 1):
+        """
+        Args:
+            requests_per_minute: Sustained request rate (default from config)
+            burst: Requests allowed back to back after an idle period
+        """
+        if requests_per_minute is None:
+            requests_per_minute = config.requests_per_minute
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait until a request may be sent
+
+        Returns:
+            Seconds waited
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # A negative balance is a queue of reserved tokens, served in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is available now, without queueing
+
+        Returns:
+            True if a request may be sent immediately
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
 def safe_database_operation(func: Callable) -> Callable:
     """
     Decorator for safe database operations with automatic connection handling
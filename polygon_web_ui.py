@@ -3,18 +3,30 @@ Polygon.io Data Fetcher Web UI
 Real-time monitoring and configuration interface for stock data fetching
 """
 
+# Make socket, threading and psycopg2 I/O cooperative before anything else uses them
+from dashboard_io import patch_for_eventlet, DatabasePool, create_redis_client
+ASYNC_MODE = patch_for_eventlet()
+
 import os
 import json
 import threading
 import time
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, stream_with_context
 from flask_socketio import SocketIO, emit
-import psycopg2
-from psycopg2.extras import RealDictCursor
 from polygon_config import config
 from polygon_fetcher import PolygonDataFetcher
 from polygon_utils import get_database_stats
+from polygon_health import HealthMonitor, register_health_endpoint
+from dashboard_state import FleetLease, SharedStatus
+from response_cache import ResponseCache
+from fast_json import FastJSONProvider, dumps_bytes
+from columnar_format import negotiate_format, encode_columnar, JSON_MIMETYPE
+from daily_aggregates_query import parse_filters, filters_key, fetch_page
+from daily_aggregates_export import ExportLimiter, stream_export, export_format, EXPORT_MIMETYPES
+from pg_change_feed import PostgresChangeFeed, install_notify_trigger
+from ticker_search import TickerSearch
+from polygon import RESTClient
 import logging
 
 # Configure logging
@@ -23,10 +35,18 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'polygon_data_fetcher_secret_key'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# orjson-backed JSON (Decimal as numbers, dates as ISO strings) with a stdlib fallback
+app.json = FastJSONProvider(app)
+# With a message queue, emits from any worker reach clients connected to every worker
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    message_queue=config.socketio_message_queue or None, channel='polygon-web-ui')
+
+# Fetching status is shared by every worker through Redis when REDIS_HOST is set
+state_redis = create_redis_client(config.redis_url) if config.redis_url else None
+if config.socketio_message_queue and state_redis is None:
+    logger.warning("SOCKETIO_MESSAGE_QUEUE is set but REDIS_HOST is not; fetch status stays per worker")
 
-# Global variables for tracking fetching status
-fetching_status = {
+fetching_status = SharedStatus(state_redis, 'polygon_web_ui:fetch', {
     'is_running': False,
     'current_ticker': None,
     'progress': 0,
@@ -35,14 +55,21 @@ fetching_status = {
     'errors': [],
     'success_count': 0,
     'error_count': 0
-}
+}, list_fields=['errors'])
+
+# Held by the worker running the fetch; stop requests on any worker revoke it
+fetch_lease = FleetLease(state_redis, 'polygon_web_ui:fetch', ttl_seconds=config.dashboard_lease_ttl_seconds)
 
 fetcher_thread = None
 fetcher_instance = None
 
+# Cached dependency health served at /healthz
+health_monitor = HealthMonitor(polygon_client=RESTClient(api_key=config.polygon_api_key), logger=logger)
+register_health_endpoint(app, health_monitor)
+
 def emit_status_update():
     """Emit current status to all connected clients"""
-    socketio.emit('status_update', fetching_status)
+    socketio.emit('status_update', fetching_status.get())
 
 def emit_log_message(level, message):
     """Emit log message to all connected clients"""
@@ -63,26 +90,32 @@ class WebUILogHandler(logging.Handler):
         }
         socketio.emit('log_message', log_entry)
 
+# PostgreSQL connections shared by the data API routes
+db_pool = DatabasePool()
+
+# Streaming exports hold a pooled connection each; the rest stay free for the API
+export_limiter = ExportLimiter()
+
+# /api/data/daily_aggregates responses; the fetch loop invalidates it as it writes
+daily_aggregates_cache = ResponseCache('daily_aggregates')
+
+# Symbol/company-name autocomplete for /api/data/tickers?q=, rebuilt when stock_tickers changes
+ticker_search = TickerSearch(db_pool.connection, logger=logger)
+
 def get_database_connection():
-    """Get database connection using current config"""
-    return psycopg2.connect(
-        host=config.db_host,
-        port=config.db_port,
-        database=config.db_name,
-        user=config.db_user,
-        password=config.db_password,
-        cursor_factory=RealDictCursor
-    )
+    """Borrow a pooled database connection (use as a context manager)"""
+    return db_pool.connection()
 
 @app.route('/')
 def index():
     """Main dashboard page"""
-    return render_template('index.html')
+    # Without a live change feed the page falls back to polling PostgreSQL
+    return render_template('index.html', pg_change_feed_live=pg_change_feed.is_live())
 
 @app.route('/api/status')
 def api_status():
     """Get current fetching status"""
-    return jsonify(fetching_status)
+    return jsonify(fetching_status.get())
 
 @app.route('/api/config')
 def api_config():
@@ -168,7 +201,23 @@ def api_update_config():
 
 @app.route('/api/data/tickers')
 def api_data_tickers():
-    """Get ticker data from database"""
+    """
+    Get ticker data from database
+
+    With q, answer from the in-memory search index instead: up to limit
+    (default 10) tickers whose symbol or company name matches q by prefix, or
+    within one typo unless fuzzy=false.
+    """
+    query = request.args.get('q')
+    if query is not None:
+        try:
+            results = ticker_search.search(query, limit=request.args.get('limit', 10, type=int),
+                                           fuzzy=request.args.get('fuzzy', 'true').lower() != 'false')
+            return jsonify(results)
+        except Exception as e:
+            logger.error(f"Ticker search failed: {e}")
+            return jsonify({'error': str(e)}), 500
+
     try:
         with get_database_connection() as conn:
             with conn.cursor() as cur:
@@ -185,36 +234,74 @@ def api_data_tickers():
         logger.error(f"Failed to fetch ticker data: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Columns served by /api/data/daily_aggregates
+DAILY_AGGREGATE_COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume',
+                           'vwap', 'transactions', 'created_at']
+
+def query_daily_aggregates(filters, fmt):
+    """Query one page of daily aggregates and serialize it in the negotiated format"""
+    with get_database_connection() as conn:
+        aggregates, next_cursor = fetch_page(conn, DAILY_AGGREGATE_COLUMNS, filters)
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+    if fmt == 'json':
+        body = dumps_bytes(aggregates)
+        headers['Content-Type'] = JSON_MIMETYPE
+    else:
+        body, headers['Content-Type'] = encode_columnar(aggregates, DAILY_AGGREGATE_COLUMNS, fmt,
+                                                        {'next_cursor': next_cursor})
+    return body, headers
+
 @app.route('/api/data/daily_aggregates')
 def api_data_daily_aggregates():
-    """Get daily aggregates data from database"""
+    """
+    Get daily aggregates data from database, newest first (cached until the table changes)
+
+    Query parameters: limit, ticker (comma-separated), start_date, end_date
+    (YYYY-MM-DD, inclusive) and cursor; the next page's cursor is returned in
+    the X-Next-Cursor header. Accept: application/x-msgpack or
+    application/vnd.apache.arrow.stream returns columns instead of JSON rows.
+    """
     try:
-        limit = request.args.get('limit', 100, type=int)
-        ticker = request.args.get('ticker', '')
-        
-        with get_database_connection() as conn:
-            with conn.cursor() as cur:
-                query = """
-                    SELECT ticker, date, open, high, low, close, volume, 
-                           vwap, transactions, created_at
-                    FROM daily_aggregates 
-                """
-                params = []
-                
-                if ticker:
-                    query += " WHERE ticker = %s"
-                    params.append(ticker)
-                
-                query += " ORDER BY date DESC, ticker LIMIT %s"
-                params.append(limit)
-                
-                cur.execute(query, params)
-                aggregates = cur.fetchall()
-                return jsonify([dict(row) for row in aggregates])
+        filters = parse_filters(request.args, default_limit=100)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    fmt = negotiate_format(request.accept_mimetypes)
+
+    try:
+        body, headers, hit = daily_aggregates_cache.get_or_compute(filters_key(filters) + (fmt,),
+                                                                   lambda: query_daily_aggregates(filters, fmt))
+        response = app.response_class(body, headers=headers)
+        response.vary.add('Accept')
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
     except Exception as e:
         logger.error(f"Failed to fetch daily aggregates: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/data/daily_aggregates/export')
+def export_daily_aggregates():
+    """
+    Stream daily aggregates as NDJSON or CSV (format=ndjson|csv), newest first
+
+    Takes the same ticker, start_date, end_date and cursor filters as
+    /api/data/daily_aggregates; limit is optional and unbounded.
+    """
+    try:
+        filters = parse_filters(request.args, default_limit=None, max_limit=None)
+        fmt = export_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not export_limiter.try_acquire():
+        return jsonify({'error': 'Too many exports in progress, try again shortly'}), 503
+
+    rows = stream_export(get_database_connection, DAILY_AGGREGATE_COLUMNS, filters, fmt)
+    response = app.response_class(stream_with_context(rows), mimetype=EXPORT_MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename=daily_aggregates.{fmt}'
+    })
+    response.call_on_close(export_limiter.release)
+    return response
+
 @app.route('/api/data/fetch_log')
 def api_data_fetch_log():
     """Get fetch log data from database"""
@@ -246,15 +333,12 @@ def api_stats():
         logger.error(f"Failed to fetch stats: {e}")
         return jsonify({'error': str(e)}), 500
 
-def run_data_fetch():
-    """Run data fetching in background thread"""
-    global fetching_status, fetcher_instance
+def run_data_fetch(lease_token):
+    """Run data fetching in background thread (caller acquired fetch_lease as lease_token)"""
+    global fetcher_instance
     
     try:
-        fetching_status['is_running'] = True
-        fetching_status['errors'] = []
-        fetching_status['success_count'] = 0
-        fetching_status['error_count'] = 0
+        fetching_status.update(is_running=True, errors=[], success_count=0, error_count=0)
         emit_status_update()
         
         # Initialize fetcher
@@ -271,17 +355,20 @@ def run_data_fetch():
         # Initialize tickers first
         emit_log_message('INFO', 'Initializing ticker information...')
         fetcher_instance.initialize_tickers()
+        try:
+            ticker_search.refresh()
+        except Exception as e:
+            logger.warning(f"Could not refresh ticker search index: {e}")
         
         # Fetch daily aggregates for each ticker
         tickers = config.default_tickers
-        fetching_status['total_tickers'] = len(tickers)
+        fetching_status.update(total_tickers=len(tickers))
         
         for i, ticker in enumerate(tickers):
-            if not fetching_status['is_running']:  # Check if stopped
+            if not fetch_lease.renew(lease_token):  # Stopped by a user on any worker
                 break
                 
-            fetching_status['current_ticker'] = ticker
-            fetching_status['progress'] = i
+            fetching_status.update(current_ticker=ticker, progress=i)
             emit_status_update()
             
             try:
@@ -292,28 +379,28 @@ def run_data_fetch():
                 start_date = (datetime.now() - timedelta(days=config.days_back_initial)).strftime('%Y-%m-%d')
                 
                 records = fetcher_instance.fetch_daily_aggregates(ticker, start_date, end_date)
+                daily_aggregates_cache.invalidate()
                 
-                fetching_status['success_count'] += 1
+                fetching_status.incr('success_count')
                 emit_log_message('INFO', f'Successfully fetched {records} records for {ticker}')
                 
             except Exception as e:
-                fetching_status['error_count'] += 1
+                fetching_status.incr('error_count')
                 error_msg = f'Failed to fetch data for {ticker}: {str(e)}'
-                fetching_status['errors'].append(error_msg)
+                fetching_status.append('errors', error_msg)
                 emit_log_message('ERROR', error_msg)
         
-        fetching_status['progress'] = len(tickers)
-        fetching_status['last_fetch_time'] = datetime.now().isoformat()
+        fetching_status.update(progress=len(tickers), last_fetch_time=datetime.now().isoformat())
         emit_log_message('INFO', 'Data fetch process completed')
         
     except Exception as e:
         error_msg = f'Data fetch process failed: {str(e)}'
-        fetching_status['errors'].append(error_msg)
+        fetching_status.append('errors', error_msg)
         emit_log_message('ERROR', error_msg)
     
     finally:
-        fetching_status['is_running'] = False
-        fetching_status['current_ticker'] = None
+        fetch_lease.release(lease_token)
+        fetching_status.update(is_running=False, current_ticker=None)
         emit_status_update()
 
 @socketio.on('start_fetch')
@@ -321,8 +408,10 @@ def handle_start_fetch():
     """Handle start fetch request from client"""
     global fetcher_thread
     
-    if not fetching_status['is_running']:
-        fetcher_thread = threading.Thread(target=run_data_fetch)
+    lease_token = fetch_lease.acquire()
+    if lease_token:
+        fetch_lease.keep_alive(lease_token)
+        fetcher_thread = threading.Thread(target=run_data_fetch, args=(lease_token,))
         fetcher_thread.daemon = True
         fetcher_thread.start()
         emit_log_message('INFO', 'Data fetch started by user')
@@ -332,8 +421,8 @@ def handle_start_fetch():
 @socketio.on('stop_fetch')
 def handle_stop_fetch():
     """Handle stop fetch request from client"""
-    if fetching_status['is_running']:
-        fetching_status['is_running'] = False
+    if fetch_lease.revoke():
+        fetching_status.update(is_running=False)
         emit_log_message('INFO', 'Data fetch stopped by user')
         emit_status_update()
 
@@ -343,13 +432,47 @@ def handle_connect():
     emit_status_update()
     emit_log_message('INFO', 'Client connected to monitoring interface')
 
-if __name__ == '__main__':
+# Every worker LISTENs itself and emits to its own clients only (ignore_queue)
+def emit_daily_aggregate_changes(changes):
+    """Invalidate cached responses and tell clients to refresh their data tables"""
+    daily_aggregates_cache.invalidate()
+    tickers = sorted({change['ticker'] for change in changes if change.get('ticker')})
+    socketio.emit('daily_aggregates_update', {'changes': changes, 'tickers': tickers}, ignore_queue=True)
+
+def emit_daily_aggregates_resync():
+    """Invalidate cached responses after notifications may have been missed"""
+    emit_daily_aggregate_changes([])
+
+# Row changes written to daily_aggregates by any process, replacing polling
+pg_change_feed = PostgresChangeFeed(emit_daily_aggregate_changes, on_resync=emit_daily_aggregates_resync,
+                                    logger=logger)
+
+def start_background_services():
+    """Start this worker's background work (called once per worker process)"""
     # Install the web UI log handler for the polygon_fetcher logger
     web_handler = WebUILogHandler()
     web_handler.setLevel(logging.INFO)
     polygon_logger = logging.getLogger('polygon_fetcher')
     polygon_logger.addHandler(web_handler)
     
+    # Start background health probes for /healthz
+    health_monitor.start()
+    
+    # Keep the ticker search index in step with stock_tickers
+    ticker_search.start()
+    
+    # Refresh clients and the response cache whenever daily_aggregates changes
+    if config.pg_change_feed_enabled:
+        try:
+            with get_database_connection() as conn:
+                install_notify_trigger(conn, logger)
+        except Exception as e:
+            logger.warning(f"Could not install daily_aggregates NOTIFY triggers: {e}")
+        pg_change_feed.start()
+
+if __name__ == '__main__':
+    start_background_services()
+    
     print("Starting Polygon.io Data Fetcher Web UI...")
     print("Access the interface at: http://localhost:9997")
 
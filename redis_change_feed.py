@@ -0,0 +1,190 @@
+"""
+Push-based change feed for the stock dashboards
+Producers publish the keys they write on the changes:stocks channel; optionally
+Redis keyspace notifications catch writers that do not publish (RDI jobs).
+The subscriber batches changed keys for a short debounce window, reads only
+those hashes and hands them to a callback, so an idle dashboard reads nothing
+"""
+
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Any
+import redis
+from polygon_config import config
+from redis_stock_store import CHANGE_CHANNEL, fetch_hashes
+
+# Keyspace events needed: K (keyspace channel), h (hash writes), g (DEL etc.), x (expiry)
+KEYSPACE_EVENT_FLAGS = 'Khgx'
+
+# Keyspace events that mean the key is gone
+REMOVAL_EVENTS = {'del', 'expired', 'evicted', 'unlink'}
+
+def enable_keyspace_notifications(client, logger: logging.Logger = None) -> bool:
+    """
+    Turn on the keyspace events the change feed needs, keeping any already set
+
+    Managed Redis services often reject CONFIG SET; enable the events in the
+    database settings there instead.
+
+    Returns:
+        True when notifications are enabled
+    """
+    logger = logger or logging.getLogger(__name__)
+    try:
+        current = client.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+        # 'A' is shorthand for every event class
+        missing = '' if 'A' in current else ''.join(flag for flag in KEYSPACE_EVENT_FLAGS if flag not in current)
+        if missing:
+            client.config_set('notify-keyspace-events', current + missing)
+        return True
+    except redis.ResponseError as e:
+        logger.warning(f"Could not enable keyspace notifications ({e}); "
+                       f"set notify-keyspace-events={KEYSPACE_EVENT_FLAGS} on the server")
+        return False
+
+class ChangeFeedSubscriber:
+    """Background subscriber that reads and forwards only the keys that changed"""
+
+    def __init__(self, client, on_change: Callable[[List[Dict[str, Any]], List[str]], None],
+                 on_resync: Optional[Callable[[], None]] = None, prefixes: List[str] = None,
+                 key_filter: Optional[Callable[[str], bool]] = None,
+                 keyspace_notifications: Optional[bool] = None, debounce_ms: Optional[int] = None,
+                 logger: logging.Logger = None):
+        """
+        Args:
+            client: Redis client (decode_responses=True)
+            on_change: Called with the changed hashes (tagged with redis_key and
+                key_type) and the keys that were removed
+            on_resync: Called after reconnecting, when messages may have been missed
+            prefixes: Only forward keys with these prefixes (default: latest:)
+            key_filter: Only read and forward keys it accepts, e.g. keys some client watches
+            keyspace_notifications: Also listen to keyspace events (default from config)
+            debounce_ms: How long to collect changes before reading them (default from config)
+        """
+        self.client = client
+        self.on_change = on_change
+        self.on_resync = on_resync
+        self.prefixes = tuple(prefixes or ['latest:'])
+        self.key_filter = key_filter
+        self.keyspace_notifications = (config.redis_keyspace_notifications
+                                       if keyspace_notifications is None else keyspace_notifications)
+        self.debounce_seconds = (config.change_feed_debounce_ms if debounce_ms is None else debounce_ms) / 1000
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def _keyspace_patterns(self) -> List[str]:
+        """Keyspace channels for the watched prefixes"""
+        db = self.client.connection_pool.connection_kwargs.get('db', 0)
+        return [f"__keyspace@{db}__:{prefix}*" for prefix in self.prefixes]
+
+    def _collect(self, message: Dict[str, Any], pending: Dict[str, bool]):
+        """Record the keys named by one message (True marks a removal)"""
+        if message['type'] == 'pmessage':
+            # Keyspace channel is __keyspace@<db>__:<key>, data is the event name
+            key = message['channel'].split(':', 1)[1]
+            if key.startswith(self.prefixes):
+                pending[key] = message['data'] in REMOVAL_EVENTS
+            return
+
+        try:
+            keys = json.loads(message['data'])
+        except (TypeError, ValueError):
+            self.logger.warning(f"Ignoring malformed change message: {message['data']!r}")
+            return
+        for key in keys:
+            if key.startswith(self.prefixes):
+                pending[key] = False
+
+    def _flush(self, pending: Dict[str, bool]):
+        """Read the changed hashes in one pipeline and forward them"""
+        if self.key_filter is not None:
+            pending = {key: is_removed for key, is_removed in pending.items() if self.key_filter(key)}
+            if not pending:
+                return
+        removed = [key for key, is_removed in pending.items() if is_removed]
+        changed = [key for key, is_removed in pending.items() if not is_removed]
+
+        stocks = []
+        for key, data in zip(changed, fetch_hashes(self.client, changed)):
+            if not data:
+                removed.append(key)
+                continue
+            data['redis_key'] = key
+            data['key_type'] = key.split(':')[0]
+            stocks.append(data)
+
+        self.on_change(stocks, removed)
+
+    def _listen(self, pubsub):
+        """Collect messages and flush them once per debounce window"""
+        pending: Dict[str, bool] = {}
+        flush_at = None
+        while not self.stop_event.is_set():
+            timeout = max(flush_at - time.monotonic(), 0) if flush_at is not None else 1.0
+            message = pubsub.get_message(timeout=timeout)
+            if message is not None:
+                self._collect(message, pending)
+                if pending and flush_at is None:
+                    flush_at = time.monotonic() + self.debounce_seconds
+
+            if flush_at is not None and time.monotonic() >= flush_at:
+                batch, pending, flush_at = pending, {}, None
+                try:
+                    self._flush(batch)
+                except redis.ConnectionError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Change feed callback failed: {e}")
+
+    def _loop(self):
+        """Subscribe and listen, reconnecting with backoff after connection loss"""
+        backoff = 1
+        connected_before = False
+        while not self.stop_event.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CHANGE_CHANNEL)
+                if self.keyspace_notifications:
+                    pubsub.psubscribe(*self._keyspace_patterns())
+                backoff = 1
+
+                # Changes made while we were disconnected were never delivered
+                if connected_before and self.on_resync is not None:
+                    self.on_resync()
+                connected_before = True
+
+                self._listen(pubsub)
+            except redis.ConnectionError as e:
+                self.logger.warning(f"Change feed disconnected ({e}), reconnecting in {backoff}s")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                self.logger.error(f"Change feed error: {e}")
+                self.stop_event.wait(backoff)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def start(self):
+        """Start listening in a daemon thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        if self.keyspace_notifications:
+            enable_keyspace_notifications(self.client, self.logger)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='change-feed', daemon=True)
+        self.thread.start()
+        sources = f"{CHANGE_CHANNEL}" + (" + keyspace notifications" if self.keyspace_notifications else "")
+        self.logger.info(f"Change feed subscribed to {sources} (debounce {self.debounce_seconds * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop listening"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
@@ -8,17 +8,29 @@ Features:
 - Live charts and alerts
 """
 
+# Make socket and threading I/O cooperative before anything else uses them
+from dashboard_io import patch_for_eventlet, create_redis_client
+ASYNC_MODE = patch_for_eventlet()
+
 import os
 import json
-import redis
 import random
-import time
 from datetime import datetime, timedelta
 from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO, emit
-import threading
 import logging
-from polygon_config import PolygonConfig
+from polygon_config import PolygonConfig, config
+from polygon_health import HealthMonitor, register_health_endpoint
+from redis_stock_store import (read_key_families, ensure_registries,
+                               KEY_FAMILY_PATTERNS, apply_market_event)
+from redis_change_feed import ChangeFeedSubscriber
+from dashboard_state import FleetLease
+from fast_json import FastJSONProvider
+from stock_subscriptions import (StockSubscriptions, register_subscription_handlers, set_client_rooms,
+                                 subscriber_rooms, MARKET_ROOM)
+from redis_tick_stream import read_tick_range, read_tick_tail, read_ticks_after
+from redis_timeseries import PriceTimeSeries
+from daily_aggregates_query import TICKER_PATTERN
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,10 +38,14 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'redis-stock-dashboard-secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# orjson-backed JSON with a stdlib fallback
+app.json = FastJSONProvider(app)
+# With a message queue, emits from any worker reach clients connected to every worker
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    message_queue=config.socketio_message_queue or None, channel='redis-dashboard')
 
-# Redis connection - using the connection info from startup
-redis_client = redis.Redis(
+# Redis connection - using the connection info from startup (bounded pool)
+redis_client = create_redis_client(
     host='redis-17173.c14.us-east-1-2.ec2.redns.redis-cloud.com',
     port=17173,
     username='default',
@@ -37,6 +53,21 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# Close/volume series with 1m/1h/1d downsampling for charts
+price_series = PriceTimeSeries(redis_client)
+
+# Key families listed by /api/redis/stocks, in page order
+REDIS_STOCK_FAMILIES = [
+    ('stock', 'stock:*'),
+    ('latest', 'latest:*'),
+    ('crash', 'live:crash:*'),
+    ('surge', 'live:surge:*')
+]
+
+# Cached Redis health served at /healthz (this dashboard does not use PostgreSQL)
+health_monitor = HealthMonitor(redis_client=redis_client, check_postgres=False, logger=logger)
+register_health_endpoint(app, health_monitor)
+
 # Global variables for simulation
 simulation_active = False
 simulation_thread = None
@@ -56,6 +87,7 @@ class StockSimulator:
         """Simulate a stock market crash"""
         logger.info(f"🔴 SIMULATING MARKET CRASH - Intensity: {intensity}")
         
+        crash_rows = {}
         for ticker in self.tickers:
             # Crash: 15-50% drop
             drop_percent = random.uniform(0.15, intensity)
@@ -77,20 +109,18 @@ class StockSimulator:
                 'volatility': 'EXTREME'
             }
             
-            # Store in Redis
-            key = f"live:crash:{ticker}"
-            redis_client.hset(key, mapping=crash_data)
-            redis_client.expire(key, 3600)  # Expire in 1 hour
-            
-            # Also update latest price
-            redis_client.hset(f"latest:{ticker}", mapping=crash_data)
+            crash_rows[ticker] = crash_data
             
             logger.info(f"💥 {ticker} CRASHED: {self.base_prices[ticker]:.2f} → {new_price:.2f} ({-drop_percent*100:.1f}%)")
+        
+        # Apply the whole event atomically in a single round trip
+        apply_market_event(redis_client, 'crash', crash_rows, timeseries=price_series)
     
     def simulate_upturn(self, intensity=0.4):
         """Simulate a dramatic stock upturn"""
         logger.info(f"🚀 SIMULATING MARKET SURGE - Intensity: {intensity}")
         
+        surge_rows = {}
         for ticker in self.tickers:
             # Surge: 20-60% gain
             gain_percent = random.uniform(0.20, intensity)
@@ -112,15 +142,12 @@ class StockSimulator:
                 'volatility': 'EXTREME'
             }
             
-            # Store in Redis
-            key = f"live:surge:{ticker}"
-            redis_client.hset(key, mapping=surge_data)
-            redis_client.expire(key, 3600)  # Expire in 1 hour
-            
-            # Also update latest price
-            redis_client.hset(f"latest:{ticker}", mapping=surge_data)
+            surge_rows[ticker] = surge_data
             
             logger.info(f"🚀 {ticker} SURGED: {self.base_prices[ticker]:.2f} → {new_price:.2f} (+{gain_percent*100:.1f}%)")
+        
+        # Apply the whole event atomically in a single round trip
+        apply_market_event(redis_client, 'surge', surge_rows, timeseries=price_series)
 
 simulator = StockSimulator()
 
@@ -130,39 +157,89 @@ def dashboard():
 
 @app.route('/api/redis/stocks')
 def get_redis_stocks():
-    """Get all stock data from Redis"""
+    """Get all stock data from Redis (optionally paginated with cursor/page_size)"""
     try:
-        stocks = []
+        cursor = request.args.get('cursor')
+        page_size = request.args.get('page_size', type=int)
         
-        # Get all stock keys
-        stock_keys = redis_client.keys('stock:*')
-        latest_keys = redis_client.keys('latest:*')
-        crash_keys = redis_client.keys('live:crash:*')
-        surge_keys = redis_client.keys('live:surge:*')
+        page = read_key_families(redis_client, REDIS_STOCK_FAMILIES, cursor=cursor, page_size=page_size)
         
-        all_keys = stock_keys + latest_keys + crash_keys + surge_keys
-        
-        for key in all_keys:
-            data = redis_client.hgetall(key)
-            if data:
-                data['redis_key'] = key
-                data['key_type'] = key.split(':')[0]
-                stocks.append(data)
+        stocks = []
+        for family, key, data in page['items']:
+            data['redis_key'] = key
+            data['key_type'] = key.split(':')[0]
+            stocks.append(data)
         
+        counts = page['counts']
         return jsonify({
             'success': True,
             'stocks': stocks,
-            'total_keys': len(all_keys),
-            'stock_keys': len(stock_keys),
-            'latest_keys': len(latest_keys),
-            'crash_keys': len(crash_keys),
-            'surge_keys': len(surge_keys)
+            'total_keys': sum(counts.values()),
+            'stock_keys': counts['stock'],
+            'latest_keys': counts['latest'],
+            'crash_keys': counts['crash'],
+            'surge_keys': counts['surge'],
+            'next_cursor': page['next_cursor']
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching Redis stocks: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/redis/ticks/<ticker>')
+def get_redis_ticks(ticker):
+    """Get tick history for a ticker from its Redis stream"""
+    # after=<id> catches up from a stream ID, start/end reads a range oldest-first,
+    # otherwise the latest ticks are returned (page further back with before)
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            return jsonify({'success': False, 'error': f"Invalid ticker: {ticker}"}), 400
+        count = request.args.get('count', 100, type=int)
+        after = request.args.get('after')
+
+        if after is not None:
+            ticks = read_ticks_after(redis_client, {ticker: after}, count=count).get(ticker, [])
+            return jsonify({'success': True, 'ticker': ticker, 'ticks': ticks,
+                            'last_id': ticks[-1]['id'] if ticks else after})
+
+        if 'start' in request.args or 'end' in request.args:
+            page = read_tick_range(redis_client, ticker, start=request.args.get('start', '-'),
+                                   end=request.args.get('end', '+'), count=count)
+        else:
+            page = read_tick_tail(redis_client, ticker, count=count, before=request.args.get('before', '+'))
+
+        page.update({'success': True, 'ticker': ticker})
+        return jsonify(page)
+
+    except Exception as e:
+        logger.error(f"Error fetching ticks for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/redis/timeseries/<ticker>')
+def get_redis_timeseries(ticker):
+    """Get a downsampled close/volume series for charting in one Redis call"""
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            return jsonify({'success': False, 'error': f"Invalid ticker: {ticker}"}), 400
+        series = price_series.range(
+            ticker,
+            field=request.args.get('field', 'close'),
+            from_ms=request.args.get('from', type=int),
+            to_ms=request.args.get('to', type=int),
+            resolution=request.args.get('resolution', 'auto'),
+            max_points=request.args.get('max_points', 500, type=int)
+        )
+        series['success'] = True
+        return jsonify(series)
+
+    except Exception as e:
+        logger.error(f"Error fetching time series for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/simulate/crash', methods=['POST'])
 def simulate_crash():
     """Trigger stock market crash simulation"""
@@ -171,11 +248,12 @@ def simulate_crash():
         simulator.simulate_crash(intensity)
         
         # Emit real-time update
-        socketio.emit('market_event', {
+        emit_to_subscribers('market_event', {
             'type': 'CRASH',
             'intensity': intensity,
+            'tickers': simulator.tickers,
             'message': f'🔴 MARKET CRASH SIMULATED! Average drop: {intensity*100:.0f}%'
-        })
+        }, simulator.tickers)
         
         return jsonify({'success': True, 'message': 'Market crash simulated!'})
     
@@ -191,11 +269,12 @@ def simulate_upturn():
         simulator.simulate_upturn(intensity)
         
         # Emit real-time update
-        socketio.emit('market_event', {
+        emit_to_subscribers('market_event', {
             'type': 'SURGE',
             'intensity': intensity,
+            'tickers': simulator.tickers,
             'message': f'🚀 MARKET SURGE SIMULATED! Average gain: {intensity*100:.0f}%'
-        })
+        }, simulator.tickers)
         
         return jsonify({'success': True, 'message': 'Market surge simulated!'})
     
@@ -310,6 +389,49 @@ def get_rdi_jobs():
                 ]
             }
         },
+        'key_registry': {
+            'name': 'Key Registry Convention',
+            'description': 'Records written keys in registry:{family} sorted sets so dashboards never scan the keyspace',
+            'config': {
+                'name': 'latest-prices-registry',
+                'source': {'table': 'daily_aggregates'},
+                'transform': [
+                    {
+                        'uses': 'add_field',
+                        'with': {
+                            'field': 'registry_member',
+                            'expression': "concat('latest:', ticker)",
+                            'language': 'sql'
+                        }
+                    },
+                    {
+                        'uses': 'add_field',
+                        'with': {
+                            'field': 'registry_score',
+                            'expression': '9999999999',
+                            'language': 'sql'
+                        }
+                    }
+                ],
+                'output': [
+                    {
+                        'uses': 'redis.write',
+                        'with': {
+                            'connection': 'target',
+                            'data_type': 'sorted_set',
+                            'key': {
+                                'expression': "'registry:latest'",
+                                'language': 'sql'
+                            },
+                            'args': {
+                                'score': 'registry_score',
+                                'member': 'registry_member'
+                            }
+                        }
+                    }
+                ]
+            }
+        },
         'high_volume_alerts': {
             'name': 'High Volume Trading Alerts',
             'description': 'Filters and syncs stocks with unusually high trading volume',
@@ -404,40 +526,60 @@ def get_rdi_jobs():
 
     return jsonify(jobs)
 
-def background_monitor():
-    """Background thread to monitor Redis and emit updates"""
-    while True:
-        try:
-            # Get latest stock data
-            stocks = []
-            latest_keys = redis_client.keys('latest:*')
-            
-            for key in latest_keys:
-                data = redis_client.hgetall(key)
-                if data:
-                    data['redis_key'] = key
-                    stocks.append(data)
-            
-            if stocks:
-                socketio.emit('stock_update', {'stocks': stocks})
-            
-            time.sleep(2)  # Update every 2 seconds
-            
-        except Exception as e:
-            logger.error(f"Background monitor error: {e}")
-            time.sleep(5)
+# Socket.IO room membership (market or ticker:{T}) and per-room stock_update deltas
+subscriptions = StockSubscriptions(redis_client, logger=logger)
+register_subscription_handlers(socketio, subscriptions)
+
+# Every worker runs its own change feed and versions deltas for its own clients,
+# so stock_update skips the message queue (ignore_queue) to avoid duplicates
+def emit_stock_changes(stocks, removed_keys):
+    """Push only the fields that changed to the rooms watching them"""
+    for room, payload in subscriptions.encode(stocks, removed_keys):
+        socketio.emit('stock_update', payload, to=room, ignore_queue=True)
+
+def emit_stock_resync():
+    """Re-read watched rooms and broadcast full snapshots after the change feed may have missed messages"""
+    for room, snapshot in subscriptions.reseed():
+        socketio.emit('stock_update', snapshot, to=room, ignore_queue=True)
+
+def emit_to_subscribers(event, payload, tickers):
+    """Emit an event once to each client (on any worker) watching the market or any of the tickers"""
+    socketio.emit(event, payload, to=subscriber_rooms(tickers))
+
+# Change feed replacing the periodic re-read of every latest:* key
+change_feed = ChangeFeedSubscriber(redis_client, emit_stock_changes, on_resync=emit_stock_resync,
+                                   key_filter=subscriptions.is_watched, logger=logger)
 
 @socketio.on('connect')
 def handle_connect():
     logger.info('Client connected to Redis dashboard')
     emit('status', {'message': 'Connected to Redis Stock Dashboard'})
+    # Every client watches the whole market until it subscribes to specific tickers
+    set_client_rooms(subscriptions, [MARKET_ROOM])
+
+# Held while one worker runs the one-off startup maintenance so workers starting with it skip it
+maintenance_lease = FleetLease(redis_client, 'redis_dashboard:startup_maintenance', ttl_seconds=600)
+
+def start_background_services():
+    """Start this worker's background work (called once per worker process)"""
+    # Start background health probes for /healthz
+    health_monitor.start()
+    
+    maintenance_token = maintenance_lease.acquire()
+    if maintenance_token:
+        try:
+            # Bootstrap key registries once for keys written before writers maintained them
+            ensure_registries(redis_client, list(KEY_FAMILY_PATTERNS))
+        finally:
+            maintenance_lease.release(maintenance_token)
+    
+    # Push Redis changes to dashboards as producers publish them
+    change_feed.start()
 
 if __name__ == '__main__':
     logger.info("Starting Redis Stock Dashboard...")
     logger.info("Access the dashboard at: http://localhost:5002")
     
-    # Start background monitoring
-    monitor_thread = threading.Thread(target=background_monitor, daemon=True)
-    monitor_thread.start()
+    start_background_services()
     
     socketio.run(app, host='0.0.0.0', port=9998, debug=True)
@@ -0,0 +1,384 @@
+"""
+Redis access layer for the stock dashboards
+Lists keys from per-family registry sorted sets maintained by the writers,
+falls back to incremental SCAN (never KEYS) for unregistered families, and
+reads hashes in pipelined batches with cursor-based pagination
+"""
+
+import json
+import time
+import logging
+from typing import Dict, List, Iterator, Optional, Tuple, Any
+from redis_tick_stream import append_tick
+from stock_leaderboard import record_movers
+
+logger = logging.getLogger(__name__)
+
+# Keys requested per SCAN call and commands sent per pipeline round trip
+DEFAULT_SCAN_COUNT = 1000
+DEFAULT_PIPELINE_BATCH = 500
+
+# Registry sorted sets: registry:{family} holds the family's key names scored by
+# expiry time (epoch seconds), or +inf for keys that never expire. RDI jobs follow
+# the same convention in separate *_registry_job_config.txt jobs scored 9999999999.
+# Only families whose every writer maintains a registry belong here; the rest
+# (e.g. stock_tickers:ticker:*, written by RDI's default table ingestion) are scanned.
+REGISTRY_PREFIX = 'registry:'
+NO_EXPIRY = '+inf'
+KEY_FAMILY_PATTERNS = {
+    'latest': 'latest:*',
+    'crash': 'live:crash:*',
+    'surge': 'live:surge:*',
+    'stock': 'stock:*'
+}
+
+def registry_key(family: str) -> str:
+    """Get the registry sorted set name for a key family"""
+    return f"{REGISTRY_PREFIX}{family}"
+
+def register_keys(client, family: str, keys: List[str], ttl: Optional[int] = None):
+    """
+    Record keys in their family registry
+
+    Args:
+        client: Redis client or pipeline
+        family: Key family name (see KEY_FAMILY_PATTERNS)
+        keys: Key names written by the caller
+        ttl: TTL in seconds the caller set on the keys, None if they do not expire
+    """
+    if not keys:
+        return
+    score = time.time() + ttl if ttl else NO_EXPIRY
+    client.zadd(registry_key(family), {key: score for key in keys})
+
+def registered_keys(client, family: str) -> List[str]:
+    """Get every live (unexpired) key of a family from its registry"""
+    return client.zrangebyscore(registry_key(family), f"({time.time()}", NO_EXPIRY)
+
+# One page of live registry members after a (score, member) position. Members are
+# ordered by score, then by member within a score, so the page resumes exactly after
+# the last member returned even if it or earlier members have expired or been removed.
+# KEYS: registry sorted set
+# ARGV: now (epoch seconds), count (0 for all), score and member to resume after ('' to start)
+REGISTRY_PAGE_SCRIPT = """
+local key = KEYS[1]
+local count = tonumber(ARGV[2])
+-- Members scored at or before now have expired and sort first
+local start = redis.call('ZCOUNT', key, '-inf', ARGV[1])
+if ARGV[3] ~= '' then
+    local score, member = ARGV[3], ARGV[4]
+    -- Binary search the first member after (score, member) among those tied on score
+    local lo = redis.call('ZCOUNT', key, '-inf', '(' .. score)
+    local hi = lo + redis.call('ZCOUNT', key, score, score)
+    while lo < hi do
+        local mid = math.floor((lo + hi) / 2)
+        if redis.call('ZRANGE', key, mid, mid)[1] <= member then
+            lo = mid + 1
+        else
+            hi = mid
+        end
+    end
+    if lo > start then
+        start = lo
+    end
+end
+local stop = -1
+if count > 0 then
+    stop = start + count - 1
+end
+return redis.call('ZRANGE', key, start, stop, 'WITHSCORES')
+"""
+
+def registry_page(client, family: str, after: Optional[Tuple[str, str]] = None,
+                  count: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Get one page of live keys from a family registry, in (score, key) order
+
+    Args:
+        after: (score, key) of the last entry of the previous page, None for the first page
+        count: Keys wanted, None for all remaining
+
+    Returns:
+        (key, score) pairs with scores as Redis formats them
+    """
+    score, member = after or ('', '')
+    reply = client.register_script(REGISTRY_PAGE_SCRIPT)(
+        keys=[registry_key(family)], args=[time.time(), count or 0, score, member])
+    return list(zip(reply[::2], reply[1::2]))
+
+def prune_registry(client, family: str) -> int:
+    """Remove expired members from a family registry"""
+    return client.zremrangebyscore(registry_key(family), '-inf', f"({time.time()}")
+
+def rebuild_registry(client, family: str, scan_count: int = DEFAULT_SCAN_COUNT) -> int:
+    """
+    Populate a family registry from the keyspace with a one-off SCAN
+
+    Used to bootstrap registries for keys written before the writers kept
+    them up to date.
+
+    Returns:
+        Number of keys registered
+    """
+    keys = list(dict.fromkeys(scan_keys(client, KEY_FAMILY_PATTERNS[family], scan_count)))
+    now = time.time()
+    registered = 0
+    for start in range(0, len(keys), DEFAULT_PIPELINE_BATCH):
+        batch = keys[start:start + DEFAULT_PIPELINE_BATCH]
+        pipe = client.pipeline(transaction=False)
+        for key in batch:
+            pipe.ttl(key)
+        ttls = pipe.execute()
+
+        members = {}
+        for key, ttl in zip(batch, ttls):
+            if ttl == -2:  # Key vanished since the scan
+                continue
+            members[key] = now + ttl if ttl >= 0 else NO_EXPIRY
+        if members:
+            client.zadd(registry_key(family), members)
+            registered += len(members)
+    return registered
+
+def ensure_registries(client, families: List[str]):
+    """Bootstrap any family registry that does not exist yet"""
+    for family in families:
+        if not client.exists(registry_key(family)):
+            registered = rebuild_registry(client, family)
+            logger.info(f"Bootstrapped {registry_key(family)} with {registered} keys")
+
+# Pub/sub channel carrying a JSON list of hash keys after each producer write
+CHANGE_CHANNEL = 'changes:stocks'
+
+def publish_changes(client, keys: List[str]):
+    """
+    Announce changed keys to change-feed subscribers
+
+    Queue it on the producer's MULTI pipeline so the message goes out with the
+    write it describes.
+    """
+    if keys:
+        client.publish(CHANGE_CHANNEL, json.dumps(keys))
+
+# Market event hashes (live:{family}:{ticker}) expire after an hour
+MARKET_EVENT_TTL = 3600
+
+def market_event_key(family: str, ticker: str) -> str:
+    """Get the hash key for a ticker's market event, e.g. live:crash:AAPL"""
+    return f"live:{family}:{ticker}"
+
+def apply_market_event(client, family: str, rows: Dict[str, Dict[str, Any]],
+                       ttl: int = MARKET_EVENT_TTL, timeseries=None) -> int:
+    """
+    Apply a market event (crash, surge or any other shock type) to many tickers
+    atomically in a single round trip
+
+    Every event hash, its TTL, the latest:{ticker} update, the tick stream
+    entry, the leaderboard scores, the registry entries and the change-feed
+    message go out in one MULTI/EXEC pipeline, so readers never observe a
+    half-applied event.
+
+    Args:
+        client: Redis client
+        family: Event family, used in live:{family}:{ticker} and registry:{family}
+        rows: Event hash fields per ticker
+        ttl: Expiry of the event hashes in seconds
+        timeseries: Optional PriceTimeSeries that also records each ticker's close/volume
+
+    Returns:
+        Number of tickers written
+    """
+    if not rows:
+        return 0
+
+    event_keys = []
+    latest_keys = []
+    pipe = client.pipeline(transaction=True)
+    for ticker, data in rows.items():
+        event_key = market_event_key(family, ticker)
+        pipe.hset(event_key, mapping=data)
+        pipe.expire(event_key, ttl)
+        pipe.hset(f"latest:{ticker}", mapping=data)
+        append_tick(pipe, ticker, data)
+        if timeseries is not None:
+            timeseries.add(ticker, data, pipe=pipe)
+        event_keys.append(event_key)
+        latest_keys.append(f"latest:{ticker}")
+
+    record_movers(pipe, rows)
+    register_keys(pipe, family, event_keys, ttl=ttl)
+    register_keys(pipe, 'latest', latest_keys)
+    publish_changes(pipe, latest_keys + event_keys)
+    pipe.execute()
+    return len(rows)
+
+def is_pattern(pattern: str) -> bool:
+    """Check whether a key family is a glob pattern rather than an exact key name"""
+    return any(char in pattern for char in '*?[')
+
+def scan_keys(client, pattern: str, count: int = DEFAULT_SCAN_COUNT) -> Iterator[str]:
+    """
+    Iterate over keys matching a pattern without blocking Redis
+
+    Args:
+        client: Redis client
+        pattern: Glob pattern, e.g. 'latest:*'
+        count: SCAN COUNT hint per call
+
+    Yields:
+        Matching key names (SCAN may yield a key more than once)
+    """
+    return client.scan_iter(match=pattern, count=count)
+
+def fetch_hashes(client, keys: List[str], batch_size: int = DEFAULT_PIPELINE_BATCH) -> List[Dict[str, Any]]:
+    """
+    Read many hashes with one round trip per batch instead of one per key
+
+    Args:
+        client: Redis client
+        keys: Key names to read
+        batch_size: Number of HGETALL commands per pipeline
+
+    Returns:
+        One dict per key in the same order (empty for missing or non-hash keys)
+    """
+    results = []
+    for start in range(0, len(keys), batch_size):
+        pipe = client.pipeline(transaction=False)
+        for key in keys[start:start + batch_size]:
+            pipe.hgetall(key)
+        for reply in pipe.execute(raise_on_error=False):
+            # Non-hash keys come back as WRONGTYPE errors; treat them as empty
+            results.append(reply if isinstance(reply, dict) else {})
+    return results
+
+def parse_cursor(cursor: Optional[str]) -> Tuple[int, str]:
+    """
+    Parse a '<family index>:<position>' page cursor
+
+    The position is a SCAN cursor for scanned families and '<score>:<key>' of
+    the last key read for registered ones ('0' at the start of a family).
+    """
+    if not cursor:
+        return 0, '0'
+    try:
+        family_index, position = cursor.split(':', 1)
+        return int(family_index), position
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_registry_position(position: str) -> Optional[Tuple[str, str]]:
+    """Split a registered family's cursor position into (score, key), None at the start"""
+    if position == '0':
+        return None
+    score, separator, key = position.partition(':')
+    if not separator or not key:
+        raise ValueError(f"Invalid cursor position: {position}")
+    return score, key
+
+def read_key_families(client, families: List[Tuple[str, str]], cursor: Optional[str] = None,
+                      page_size: Optional[int] = None, use_registry: bool = True,
+                      scan_count: int = DEFAULT_SCAN_COUNT,
+                      batch_size: int = DEFAULT_PIPELINE_BATCH) -> Dict[str, Any]:
+    """
+    Read hashes for several key families, optionally one page at a time
+
+    Families are walked in order. Each is an exact key name, a registered
+    family (listed from its registry sorted set), or any other glob pattern
+    (enumerated with SCAN). A page holds at least page_size keys unless the
+    families are exhausted, and may overshoot by up to one SCAN batch.
+
+    Args:
+        client: Redis client
+        families: Ordered (family name, pattern or key) pairs
+        cursor: Cursor returned by the previous page, None for the first page
+        page_size: Keys per page, None to read everything
+        use_registry: List registered families from their registry instead of SCAN
+        scan_count: SCAN COUNT hint
+        batch_size: HGETALL commands per pipeline
+
+    Returns:
+        Dict with 'items' [(family, key, data)], 'counts' {family: keys seen}
+        and 'next_cursor' (None when there are no more pages)
+
+    Raises:
+        ValueError: If page_size is below 1 or the cursor is malformed
+    """
+    if page_size is not None and page_size < 1:
+        raise ValueError("page_size must be a positive integer")
+    family_index, position = parse_cursor(cursor)
+    found: List[Tuple[str, str]] = []
+    seen = set()
+    registered = set()
+
+    def add(name: str, keys: List[str]):
+        for key in keys:
+            if key not in seen:
+                seen.add(key)
+                found.append((name, key))
+
+    while family_index < len(families) and (page_size is None or len(found) < page_size):
+        name, pattern = families[family_index]
+
+        if not is_pattern(pattern):
+            add(name, [pattern])
+            family_index += 1
+            position = '0'
+            continue
+
+        if use_registry and KEY_FAMILY_PATTERNS.get(name) == pattern:
+            if position == '0':
+                # Drop members that expired since the last walk so the registry stays bounded
+                prune_registry(client, name)
+            remaining = None if page_size is None else page_size - len(found)
+            entries = registry_page(client, name, after=parse_registry_position(position), count=remaining)
+            keys = [key for key, _ in entries]
+            registered.update(keys)
+            add(name, keys)
+            if remaining is None or len(entries) < remaining:
+                family_index += 1
+                position = '0'
+            else:
+                # Resume after the last key read, however many keys expire meanwhile
+                key, score = entries[-1]
+                position = f"{score}:{key}"
+            continue
+
+        scan_position, keys = client.scan(cursor=int(position), match=pattern, count=scan_count)
+        add(name, keys)
+        position = str(scan_position)
+        if scan_position == 0:
+            family_index += 1
+
+    hashes = fetch_hashes(client, [key for _, key in found], batch_size)
+
+    items = []
+    counts = {name: 0 for name, _ in families}
+    stale: Dict[str, List[str]] = {}
+    for (name, key), data in zip(found, hashes):
+        if not data:
+            if key in registered:
+                stale.setdefault(name, []).append(key)
+            continue
+        counts[name] += 1
+        items.append((name, key, data))
+
+    # Drop registry members whose keys were deleted rather than expired
+    for name, keys in stale.items():
+        client.zrem(registry_key(name), *keys)
+
+    next_cursor = None
+    if family_index < len(families):
+        next_cursor = f"{family_index}:{position}"
+
+    return {'items': items, 'counts': counts, 'next_cursor': next_cursor}
+
+def read_latest_stocks(client) -> List[Dict[str, Any]]:
+    """Read every latest:{ticker} hash, tagged with its redis_key"""
+    keys = registered_keys(client, 'latest')
+    stocks = []
+    for key, data in zip(keys, fetch_hashes(client, keys)):
+        if data:
+            data['redis_key'] = key
+            stocks.append(data)
+    return stocks
@@ -0,0 +1,137 @@
+"""
+Bounded tick history in Redis Streams
+Each ticker gets one capped stream (ticks:{ticker}) trimmed by length or age,
+with range, tail and catch-up reads for the dashboards
+"""
+
+import time
+import logging
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+TICK_STREAM_PREFIX = 'ticks:'
+
+# Approximate cap per stream; '~' trimming lets Redis drop whole macro nodes cheaply
+TICK_STREAM_MAXLEN = 10000
+
+# Upper bound on entries returned by one read
+MAX_READ_COUNT = 1000
+
+def tick_stream_key(ticker: str) -> str:
+    """Get the stream key holding a ticker's tick history"""
+    return f"{TICK_STREAM_PREFIX}{ticker}"
+
+def append_tick(client, ticker: str, data: Dict[str, Any], maxlen: Optional[int] = TICK_STREAM_MAXLEN,
+                max_age_seconds: Optional[int] = None):
+    """
+    Append a tick to the ticker's stream, trimming it in the same command
+
+    Args:
+        client: Redis client or pipeline
+        ticker: Ticker symbol
+        data: Tick fields (values are stored as strings)
+        maxlen: Keep about this many entries (XADD MAXLEN ~), None to disable
+        max_age_seconds: Keep entries newer than this instead (XADD MINID ~)
+
+    Returns:
+        The new entry ID, or the pipeline when called on a pipeline
+    """
+    fields = {field: value for field, value in data.items() if value is not None}
+    if max_age_seconds is not None:
+        min_id = f"{int((time.time() - max_age_seconds) * 1000)}-0"
+        return client.xadd(tick_stream_key(ticker), fields, minid=min_id, approximate=True)
+    return client.xadd(tick_stream_key(ticker), fields, maxlen=maxlen, approximate=True)
+
+def _entries(raw: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, Any]]:
+    """Flatten (id, fields) stream entries into dicts carrying their stream ID"""
+    entries = []
+    for entry_id, fields in raw:
+        entry = dict(fields)
+        entry['id'] = entry_id
+        entries.append(entry)
+    return entries
+
+def read_tick_range(client, ticker: str, start: str = '-', end: str = '+',
+                    count: int = 100) -> Dict[str, Any]:
+    """
+    Read ticks oldest-first between two stream IDs
+
+    Args:
+        start: First ID (inclusive), '-' for the beginning; pass the previous
+            page's next_start to continue
+        end: Last ID (inclusive), '+' for the end
+        count: Maximum entries to return
+
+    Returns:
+        Dict with 'ticks' and 'next_start' (None when the range is exhausted)
+    """
+    count = max(1, min(count, MAX_READ_COUNT))
+    ticks = _entries(client.xrange(tick_stream_key(ticker), min=start, max=end, count=count))
+    next_start = None
+    if len(ticks) == count:
+        # Exclusive range start continues right after the last entry returned
+        next_start = f"({ticks[-1]['id']}"
+    return {'ticks': ticks, 'next_start': next_start}
+
+def read_tick_tail(client, ticker: str, count: int = 100, before: str = '+') -> Dict[str, Any]:
+    """
+    Read the most recent ticks, returned oldest-first
+
+    Args:
+        count: Maximum entries to return
+        before: Read entries up to this ID; pass the previous page's
+            next_before to page further back
+
+    Returns:
+        Dict with 'ticks' and 'next_before' (None when history is exhausted)
+    """
+    count = max(1, min(count, MAX_READ_COUNT))
+    raw = client.xrevrange(tick_stream_key(ticker), max=before, min='-', count=count)
+    ticks = _entries(list(reversed(raw)))
+    next_before = None
+    if len(ticks) == count:
+        next_before = f"({ticks[0]['id']}"
+    return {'ticks': ticks, 'next_before': next_before}
+
+def read_ticks_after(client, last_ids: Dict[str, str], count: int = 100,
+                     block_ms: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Catch up on several tickers from the last stream ID each subscriber has seen
+
+    Args:
+        last_ids: Last seen stream ID per ticker ('0' for full history, '$' for new only)
+        count: Maximum entries per ticker
+        block_ms: Block up to this long waiting for new entries, None to return immediately
+
+    Returns:
+        New ticks per ticker (tickers without new entries are omitted)
+    """
+    streams = {tick_stream_key(ticker): last_id for ticker, last_id in last_ids.items()}
+    count = max(1, min(count, MAX_READ_COUNT))
+    replies = client.xread(streams, count=count, block=block_ms) or []
+
+    result = {}
+    for stream_key, raw in replies:
+        ticker = stream_key[len(TICK_STREAM_PREFIX):]
+        result[ticker] = _entries(raw)
+    return result
+
+def purge_legacy_tick_keys(client, pattern: str = 'live:demo:*') -> int:
+    """
+    Delete per-tick hashes written before tick history moved to streams
+
+    Returns:
+        Number of keys removed
+    """
+    removed = 0
+    pipe = client.pipeline(transaction=False)
+    for key in client.scan_iter(match=pattern, count=1000):
+        pipe.unlink(key)
+        removed += 1
+        if removed % 1000 == 0:
+            pipe.execute()
+    pipe.execute()
+    if removed:
+        logger.info(f"Removed {removed} legacy tick keys matching {pattern}")
+    return removed
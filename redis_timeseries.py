@@ -0,0 +1,224 @@
+"""
+Price time series in Redis
+Stores close/volume series per ticker with 1m, 1h and 1d downsampling, using
+RedisTimeSeries compaction rules when the module is loaded and Lua-maintained
+sorted sets otherwise. Any chart range is answered with a single call.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_PREFIX = 'ts:'
+
+# Series stored per ticker and how ticks fold into a bucket. Tick volume is the
+# day's cumulative volume, so a bucket keeps its last value rather than a sum.
+SERIES_AGGREGATION = {
+    'close': 'last',
+    'volume': 'last'
+}
+
+# Resolutions from finest to coarsest: bucket size and retention in milliseconds
+RESOLUTIONS = {
+    'raw': {'bucket_ms': None, 'retention_ms': 24 * 3600 * 1000},
+    '1m': {'bucket_ms': 60 * 1000, 'retention_ms': 7 * 24 * 3600 * 1000},
+    '1h': {'bucket_ms': 3600 * 1000, 'retention_ms': 180 * 24 * 3600 * 1000},
+    '1d': {'bucket_ms': 24 * 3600 * 1000, 'retention_ms': 0}  # 0 keeps daily buckets forever
+}
+
+# Fallback: append the raw point, make it the last value of each bucketed sorted set
+# and trim retention (every series aggregates with 'last', see SERIES_AGGREGATION)
+# KEYS: raw, 1m, 1h, 1d sorted sets
+# ARGV: timestamp ms, value, then (bucket ms, retention ms) per KEY
+ZSET_ADD_SCRIPT = """
+local ts = tonumber(ARGV[1])
+local value = tonumber(ARGV[2])
+for i, key in ipairs(KEYS) do
+    local bucket_ms = tonumber(ARGV[1 + i * 2])
+    local retention_ms = tonumber(ARGV[2 + i * 2])
+    local bucket = ts
+    if bucket_ms > 0 then
+        bucket = ts - (ts % bucket_ms)
+    end
+    redis.call('ZREMRANGEBYSCORE', key, bucket, bucket)
+    redis.call('ZADD', key, bucket, string.format('%d', bucket) .. ':' .. value)
+    if retention_ms > 0 then
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', '(' .. string.format('%d', ts - retention_ms))
+    end
+end
+return 1
+"""
+
+def series_key(ticker: str, field: str, resolution: str) -> str:
+    """Get the key of one series, e.g. ts:AAPL:close:1h"""
+    return f"{TIMESERIES_PREFIX}{ticker}:{field}:{resolution}"
+
+class PriceTimeSeries:
+    """Close/volume time series per ticker with automatic downsampling"""
+
+    def __init__(self, client, use_module: Optional[bool] = None):
+        self.client = client
+        self._use_module = use_module
+        self._created = set()
+        self._lock = threading.Lock()
+        self._zset_add = client.register_script(ZSET_ADD_SCRIPT)
+
+    @property
+    def use_module(self) -> bool:
+        """Whether RedisTimeSeries is available (probed once)"""
+        if self._use_module is None:
+            try:
+                self.client.execute_command('TS.INFO', f"{TIMESERIES_PREFIX}__probe__")
+                self._use_module = True
+            except Exception as e:
+                # A missing key means the command exists; an unknown command means no module
+                message = str(e).lower()
+                if 'unknown command' in message:
+                    self._use_module = False
+                elif 'does not exist' in message or 'tsdb' in message:
+                    self._use_module = True
+                else:
+                    raise
+            logger.info(f"Time series backend: {'RedisTimeSeries' if self._use_module else 'sorted sets'}")
+        return self._use_module
+
+    def _ensure_series(self, ticker: str):
+        """Create RedisTimeSeries keys and compaction rules for a ticker once"""
+        if ticker in self._created:
+            return
+        with self._lock:
+            if ticker in self._created:
+                return
+            for field, aggregation in SERIES_AGGREGATION.items():
+                raw_key = series_key(ticker, field, 'raw')
+                for resolution, spec in RESOLUTIONS.items():
+                    key = series_key(ticker, field, resolution)
+                    try:
+                        self.client.execute_command(
+                            'TS.CREATE', key, 'RETENTION', spec['retention_ms'],
+                            'DUPLICATE_POLICY', 'LAST',
+                            'LABELS', 'ticker', ticker, 'field', field, 'resolution', resolution
+                        )
+                    except Exception as e:
+                        if 'already exists' not in str(e).lower():
+                            raise
+                    # Compactions chain from the raw series (rules cannot source a compacted key)
+                    if spec['bucket_ms'] is None:
+                        continue
+                    try:
+                        self.client.execute_command('TS.CREATERULE', raw_key, key, 'AGGREGATION',
+                                                    aggregation, spec['bucket_ms'])
+                    except Exception as e:
+                        if 'already' not in str(e).lower():
+                            raise
+            self._created.add(ticker)
+
+    def add(self, ticker: str, data: Dict[str, Any], timestamp_ms: Optional[int] = None, pipe=None):
+        """
+        Record a tick's close and volume
+
+        Args:
+            ticker: Ticker symbol
+            data: Tick fields; 'close' and 'volume' are recorded when present
+            timestamp_ms: Sample time, now when None
+            pipe: Optional pipeline to queue the writes on (otherwise sent immediately)
+        """
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        target = pipe if pipe is not None else self.client.pipeline(transaction=False)
+
+        if self.use_module:
+            self._ensure_series(ticker)
+
+        for field in SERIES_AGGREGATION:
+            value = data.get(field)
+            if value is None:
+                continue
+            if self.use_module:
+                target.execute_command('TS.ADD', series_key(ticker, field, 'raw'), timestamp_ms, float(value),
+                                       'ON_DUPLICATE', 'LAST')
+            else:
+                keys = [series_key(ticker, field, resolution) for resolution in RESOLUTIONS]
+                args = [timestamp_ms, float(value)]
+                for spec in RESOLUTIONS.values():
+                    args += [spec['bucket_ms'] or 0, spec['retention_ms']]
+                self._zset_add(keys=keys, args=args, client=target)
+
+        if pipe is None:
+            target.execute()
+
+    def add_many(self, ticker: str, samples: List[Dict[str, Any]], batch_size: int = 500):
+        """Bulk-load samples (each with 'timestamp' in ms plus close/volume) in pipelined batches"""
+        for start in range(0, len(samples), batch_size):
+            pipe = self.client.pipeline(transaction=False)
+            for sample in samples[start:start + batch_size]:
+                self.add(ticker, sample, int(sample['timestamp']), pipe=pipe)
+            pipe.execute()
+
+    @staticmethod
+    def pick_resolution(from_ms: int, to_ms: int, max_points: int) -> str:
+        """Pick the finest resolution that fits the range into max_points buckets"""
+        span_ms = max(to_ms - from_ms, 1)
+        for resolution, spec in RESOLUTIONS.items():
+            if spec['bucket_ms'] is None:
+                continue
+            if span_ms / spec['bucket_ms'] <= max_points:
+                return resolution
+        return '1d'
+
+    def range(self, ticker: str, field: str = 'close', from_ms: Optional[int] = None,
+              to_ms: Optional[int] = None, resolution: str = 'auto',
+              max_points: int = 500) -> Dict[str, Any]:
+        """
+        Read one series over a time range with a single Redis call
+
+        Args:
+            ticker: Ticker symbol
+            field: 'close' or 'volume'
+            from_ms: Range start in epoch ms (default: one day before to_ms)
+            to_ms: Range end in epoch ms (default: now)
+            resolution: 'raw', '1m', '1h', '1d' or 'auto' to fit max_points
+            max_points: Target number of points for 'auto'
+
+        Returns:
+            Dict with the chosen resolution and [timestamp_ms, value] points
+        """
+        if field not in SERIES_AGGREGATION:
+            raise ValueError(f"Unknown series field: {field}")
+        if to_ms is None:
+            to_ms = int(time.time() * 1000)
+        if from_ms is None:
+            from_ms = to_ms - 24 * 3600 * 1000
+        if resolution == 'auto':
+            resolution = self.pick_resolution(from_ms, to_ms, max_points)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+
+        key = series_key(ticker, field, resolution)
+        if self.use_module:
+            try:
+                raw = self.client.execute_command('TS.RANGE', key, from_ms, to_ms)
+            except Exception as e:
+                if 'does not exist' in str(e).lower():
+                    raw = []
+                else:
+                    raise
+            points = [[int(ts), float(value)] for ts, value in raw]
+        else:
+            raw = self.client.zrangebyscore(key, from_ms, to_ms)
+            points = []
+            for member in raw:
+                ts, value = member.split(':', 1)
+                points.append([int(ts), float(value)])
+
+        return {
+            'ticker': ticker,
+            'field': field,
+            'resolution': resolution,
+            'from': from_ms,
+            'to': to_ms,
+            'points': points
+        }
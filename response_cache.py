@@ -0,0 +1,136 @@
+"""
+Read-through cache for serialized API responses
+Entries (body plus headers) are kept in LRU order and bounded by count and
+total bytes, so a burst of distinct query strings cannot grow a worker's
+memory without limit.
+Writers call invalidate() when the underlying table changes; a result computed
+while an invalidation happened is returned but never stored, so the cache
+never serves data older than the last invalidation.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple, Any
+from polygon_config import config
+
+# Serialized body and the extra headers to send with it
+CachedResponse = Tuple[bytes, Dict[str, str]]
+
+class ResponseCache:
+    """LRU cache of response bodies with byte/entry limits and generation-based invalidation"""
+
+    def __init__(self, name: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            name: Label used in stats
+            max_entries: Entries kept at most (default RESPONSE_CACHE_MAX_ENTRIES)
+            max_bytes: Total body bytes kept at most (default RESPONSE_CACHE_MAX_MB)
+            ttl_seconds: Age after which an entry is recomputed even without an
+                invalidation, 0 for never (default RESPONSE_CACHE_TTL_SECONDS)
+        """
+        self.name = name
+        self.max_entries = max_entries or config.response_cache_max_entries
+        self.max_bytes = max_bytes or config.response_cache_max_mb * 1024 * 1024
+        self.ttl_seconds = config.response_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        self.entries: 'OrderedDict[Hashable, Tuple[CachedResponse, float]]' = OrderedDict()
+        self.size = 0
+        self.generation = 0
+        self.inflight: Dict[Hashable, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Optional[CachedResponse]:
+        """Fresh cached response or None (caller holds the lock)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        response, stored_at = entry
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return response
+
+    def _remove(self, key: Hashable):
+        (body, _), _ = self.entries.pop(key)
+        self.size -= len(body)
+
+    def _store(self, key: Hashable, response: CachedResponse):
+        """Insert an entry and evict least recently used ones over the limits (caller holds the lock)"""
+        body = response[0]
+        if len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (response, time.monotonic())
+        self.size += len(body)
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def get_or_compute(self, key: Hashable,
+                       compute: Callable[[], CachedResponse]) -> Tuple[bytes, Dict[str, str], bool]:
+        """
+        Return the cached response for key, computing and storing it on a miss
+
+        Concurrent misses for the same key wait for the first caller's result
+        rather than all querying the database. Exceptions from compute are
+        propagated and nothing is cached.
+
+        Args:
+            key: Hashable form of the request parameters
+            compute: Returns (body, extra response headers)
+
+        Returns:
+            (body, headers, hit)
+        """
+        while True:
+            with self.lock:
+                response = self._lookup(key)
+                if response is not None:
+                    self.hits += 1
+                    return response[0], response[1], True
+                pending = self.inflight.get(key)
+                if pending is None:
+                    self.misses += 1
+                    generation = self.generation
+                    pending = self.inflight[key] = threading.Event()
+                    break
+            # Another caller is computing this key; use its result once stored
+            pending.wait(timeout=30)
+
+        try:
+            body, headers = compute()
+            with self.lock:
+                if generation == self.generation:
+                    self._store(key, (body, headers))
+            return body, headers, False
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            pending.set()
+
+    def invalidate(self):
+        """Drop every entry, and results being computed right now, after the source data changed"""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self.lock:
+            return {
+                'name': self.name,
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'generation': self.generation
+            }
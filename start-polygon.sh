@@ -103,7 +103,7 @@ fi
 
 # Copy Python scripts to the container
 print_status $BLUE "📁 Copying Polygon.io scripts to container..."
-scripts=("polygon_config.py" "polygon_fetcher.py" "polygon_monitor.py" "polygon_utils.py")
+scripts=("polygon_config.py" "polygon_fetcher.py" "polygon_monitor.py" "polygon_utils.py" "polygon_jobs.py" "polygon_retention.py" "polygon_health.py" "polygon_sharding.py")
 
 for script in "${scripts[@]}"; do
     if [ -f "./$script" ]; then
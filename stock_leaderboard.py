@@ -0,0 +1,103 @@
+"""
+Top-movers leaderboards in Redis sorted sets
+Every writer of latest:{ticker} also scores the ticker in one sorted set per
+metric (percent change and volume), on the same pipeline as the hash write.
+Top-N gainers, losers or most traded tickers are then a ZRANGE away,
+O(log n + N), instead of reading and sorting every latest:* hash. RDI jobs keep
+the sets current with sorted_set outputs (see latest_stock_job_config.txt).
+"""
+
+from typing import Dict, List, Any
+
+LEADERBOARD_PREFIX = 'leaderboard:'
+
+# Leaderboard metric -> the latest:{ticker} field it ranks by
+LEADERBOARD_METRICS = {
+    'change_percent': 'price_change_percent',
+    'volume': 'volume'
+}
+
+MAX_LEADERBOARD_COUNT = 100
+
+def leaderboard_key(metric: str) -> str:
+    """Get the sorted set for a metric, e.g. leaderboard:change_percent"""
+    return f"{LEADERBOARD_PREFIX}{metric}"
+
+def record_movers(client, rows: Dict[str, Dict[str, Any]]):
+    """
+    Score tickers on every leaderboard
+
+    Queue it on the pipeline that writes latest:{ticker} so rankings change
+    together with the hashes.
+
+    Args:
+        client: Redis client or pipeline
+        rows: latest:{ticker} fields per ticker; tickers without a metric's
+            field are left out of that leaderboard
+    """
+    for metric, field in LEADERBOARD_METRICS.items():
+        scores = {}
+        for ticker, data in rows.items():
+            try:
+                scores[ticker] = float(data[field])
+            except (KeyError, TypeError, ValueError):
+                continue
+        if scores:
+            client.zadd(leaderboard_key(metric), scores)
+
+def remove_movers(client, tickers: List[str]):
+    """Drop tickers whose latest:{ticker} hash is gone from every leaderboard"""
+    if tickers:
+        for metric in LEADERBOARD_METRICS:
+            client.zrem(leaderboard_key(metric), *tickers)
+
+def top_movers(client, metric: str = 'change_percent', direction: str = 'top', count: int = 10,
+               with_latest: bool = True) -> List[Dict[str, Any]]:
+    """
+    Read the top or bottom of a leaderboard
+
+    Args:
+        client: Redis client (decode_responses=True)
+        metric: 'change_percent' or 'volume'
+        direction: 'top' (gainers, most traded) or 'bottom' (losers, least traded)
+        count: Entries wanted (at most MAX_LEADERBOARD_COUNT)
+        with_latest: Attach each ticker's latest:{ticker} fields, read in one pipeline
+
+    Returns:
+        Entries with rank, ticker and score, best first in the requested direction
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(LEADERBOARD_METRICS)}")
+    if direction not in ('top', 'bottom'):
+        raise ValueError("direction must be top or bottom")
+    count = max(1, min(count, MAX_LEADERBOARD_COUNT))
+
+    key = leaderboard_key(metric)
+    if direction == 'top':
+        members = client.zrevrange(key, 0, count - 1, withscores=True)
+    else:
+        members = client.zrange(key, 0, count - 1, withscores=True)
+
+    entries = [{'rank': rank, 'ticker': ticker, 'score': score}
+               for rank, (ticker, score) in enumerate(members, start=1)]
+    if with_latest and entries:
+        pipe = client.pipeline(transaction=False)
+        for entry in entries:
+            pipe.hgetall(f"latest:{entry['ticker']}")
+        for entry, latest in zip(entries, pipe.execute()):
+            entry['latest'] = latest or None
+    return entries
+
+def rebuild_leaderboards(client, stocks: List[Dict[str, Any]], batch_size: int = 1000):
+    """
+    Re-score tickers from latest:* hashes written before writers maintained the leaderboards
+
+    Args:
+        stocks: latest:{ticker} hashes tagged with redis_key (see redis_stock_store.read_latest_stocks)
+    """
+    for start in range(0, len(stocks), batch_size):
+        rows = {data.get('ticker') or data['redis_key'].split(':', 1)[1]: data
+                for data in stocks[start:start + batch_size]}
+        pipe = client.pipeline(transaction=False)
+        record_movers(pipe, rows)
+        pipe.execute()
@@ -0,0 +1,261 @@
+"""
+Per-ticker Socket.IO subscriptions for the stock dashboards
+Clients start in the market room (every ticker) and may switch to ticker:{T}
+rooms. Subscriber counts per room decide which keys the change feed reads and
+which rooms get a stock_update delta, so unwatched tickers cost nothing.
+"""
+
+import re
+import logging
+import threading
+from typing import Dict, List, Set, Tuple, Iterable, Optional, Any
+from redis_stock_store import fetch_hashes, read_latest_stocks
+from stock_update_deltas import StockDeltaEncoder
+
+MARKET_ROOM = 'market'
+TICKER_ROOM_PREFIX = 'ticker:'
+
+# Guard against clients subscribing to the whole symbol space one ticker at a time
+MAX_TICKERS_PER_CLIENT = 200
+TICKER_PATTERN = re.compile(r'^[A-Z0-9.\-]{1,12}$')
+
+def ticker_room(ticker: str) -> str:
+    """Get the room name for a ticker, e.g. ticker:AAPL"""
+    return f"{TICKER_ROOM_PREFIX}{ticker}"
+
+def key_ticker(key: str) -> str:
+    """Get the ticker a hash key belongs to, e.g. latest:AAPL -> AAPL"""
+    return key.rsplit(':', 1)[-1]
+
+def subscriber_rooms(tickers: Iterable[str]) -> List[str]:
+    """
+    Rooms whose clients care about any of the tickers
+
+    Emitting to this list reaches each client once even when it is in several
+    of the rooms, on every worker when a message queue is configured.
+    """
+    return [MARKET_ROOM] + [ticker_room(ticker) for ticker in tickers]
+
+def normalize_tickers(tickers: Iterable[Any]) -> List[str]:
+    """Upper-case and validate requested tickers, dropping anything malformed"""
+    normalized = []
+    for ticker in tickers or []:
+        ticker = str(ticker).strip().upper()
+        if TICKER_PATTERN.match(ticker) and ticker not in normalized:
+            normalized.append(ticker)
+    return normalized
+
+class StockSubscriptions:
+    """Room membership, subscriber counts and one delta encoder per watched room"""
+
+    def __init__(self, redis_client, logger: logging.Logger = None):
+        self.redis_client = redis_client
+        self.logger = logger or logging.getLogger(__name__)
+        self.members: Dict[str, Set[str]] = {}  # sid -> rooms
+        self.counts: Dict[str, int] = {}  # room -> subscribers
+        self.encoders: Dict[str, StockDeltaEncoder] = {}
+        self.lock = threading.RLock()
+
+    def _room_stocks(self, room: str) -> List[Dict[str, Any]]:
+        """Read the current latest:* hashes a room covers"""
+        if room == MARKET_ROOM:
+            return read_latest_stocks(self.redis_client)
+        key = f"latest:{room[len(TICKER_ROOM_PREFIX):]}"
+        data = fetch_hashes(self.redis_client, [key])[0]
+        if not data:
+            return []
+        data['redis_key'] = key
+        return [data]
+
+    def join(self, sid: str, rooms: List[str]) -> List[Dict[str, Any]]:
+        """
+        Add a client to rooms, seeding a room's encoder when it gets its first subscriber
+
+        Returns:
+            Full snapshot payload for each room joined
+        """
+        snapshots = []
+        with self.lock:
+            joined = self.members.setdefault(sid, set())
+            for room in rooms:
+                if room not in joined:
+                    joined.add(room)
+                    self.counts[room] = self.counts.get(room, 0) + 1
+                    if room not in self.encoders:
+                        # Unwatched rooms are not kept current, so start from Redis
+                        encoder = StockDeltaEncoder(room)
+                        encoder.seed(self._room_stocks(room))
+                        self.encoders[room] = encoder
+                snapshots.append(self.encoders[room].snapshot())
+        return snapshots
+
+    def leave(self, sid: str, rooms: List[str]) -> List[str]:
+        """
+        Remove a client from rooms, dropping encoders nobody needs any more
+
+        Returns:
+            Rooms the client actually left
+        """
+        left = []
+        with self.lock:
+            joined = self.members.get(sid, set())
+            for room in rooms:
+                if room not in joined:
+                    continue
+                joined.discard(room)
+                left.append(room)
+                self.counts[room] -= 1
+                if self.counts[room] <= 0:
+                    del self.counts[room]
+                    self.encoders.pop(room, None)
+            if not joined:
+                self.members.pop(sid, None)
+        return left
+
+    def drop(self, sid: str) -> List[str]:
+        """Forget a disconnected client"""
+        with self.lock:
+            return self.leave(sid, list(self.members.get(sid, ())))
+
+    def rooms_of(self, sid: str) -> Set[str]:
+        """Rooms a client is in"""
+        with self.lock:
+            return set(self.members.get(sid, ()))
+
+    def subscriber_counts(self) -> Dict[str, int]:
+        """Subscribers per room"""
+        with self.lock:
+            return dict(self.counts)
+
+    def is_watched(self, key: str) -> bool:
+        """Whether any client needs updates for a hash key"""
+        with self.lock:
+            return MARKET_ROOM in self.counts or ticker_room(key_ticker(key)) in self.counts
+
+    def encode(self, stocks: List[Dict[str, Any]], removed_keys: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Turn a change-feed batch into stock_update payloads for the rooms watching it
+
+        Returns:
+            (room, payload) pairs: a delta per room with changes, plus any
+            periodic snapshots that are due
+        """
+        with self.lock:
+            encoders = dict(self.encoders)
+
+        payloads = []
+        for room, encoder in encoders.items():
+            if room == MARKET_ROOM:
+                room_stocks, room_removed = stocks, removed_keys
+            else:
+                ticker = room[len(TICKER_ROOM_PREFIX):]
+                room_stocks = [stock for stock in stocks if key_ticker(stock['redis_key']) == ticker]
+                room_removed = [key for key in removed_keys if key_ticker(key) == ticker]
+                if not room_stocks and not room_removed:
+                    continue
+
+            delta = encoder.encode(room_stocks, room_removed)
+            if delta is not None:
+                payloads.append((room, delta))
+            snapshot = encoder.snapshot_if_due()
+            if snapshot is not None:
+                payloads.append((room, snapshot))
+        return payloads
+
+    def snapshot(self, room: str) -> Optional[Dict[str, Any]]:
+        """Full snapshot for a room, None when nobody is subscribed to it"""
+        with self.lock:
+            encoder = self.encoders.get(room)
+        return encoder.snapshot() if encoder is not None else None
+
+    def reseed(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Re-read every watched room from Redis (after the change feed missed messages)
+
+        Returns:
+            (room, snapshot) pairs to broadcast
+        """
+        with self.lock:
+            encoders = dict(self.encoders)
+        if not encoders:
+            return []
+
+        latest = {stock['redis_key']: stock for stock in read_latest_stocks(self.redis_client)}
+        snapshots = []
+        for room, encoder in encoders.items():
+            if room == MARKET_ROOM:
+                room_stocks = list(latest.values())
+            else:
+                ticker = room[len(TICKER_ROOM_PREFIX):]
+                room_stocks = [stock for key, stock in latest.items() if key_ticker(key) == ticker]
+            snapshots.append((room, encoder.seed(room_stocks)))
+        self.logger.info(f"Reseeded {len(snapshots)} stock_update rooms from Redis")
+        return snapshots
+
+def set_client_rooms(subscriptions: StockSubscriptions, rooms: List[str]):
+    """
+    Move the current Socket.IO client into exactly these rooms and send it a
+    snapshot of each (call from inside a Socket.IO event handler)
+    """
+    from flask import request
+    from flask_socketio import emit, join_room, leave_room
+
+    sid = request.sid
+    stale = [room for room in subscriptions.rooms_of(sid) if room not in rooms]
+    for room in subscriptions.leave(sid, stale):
+        leave_room(room)
+    for room in rooms:
+        join_room(room)
+    for snapshot in subscriptions.join(sid, rooms):
+        emit('stock_update', snapshot)
+    emit('subscription', {'rooms': sorted(subscriptions.rooms_of(sid))})
+
+def register_subscription_handlers(socketio, subscriptions: StockSubscriptions):
+    """
+    Add subscribe/unsubscribe/stock_snapshot/disconnect handlers to a SocketIO server
+
+    The app's own connect handler should call set_client_rooms(subscriptions,
+    [MARKET_ROOM]) so clients that never subscribe keep receiving every ticker.
+    """
+    from flask import request
+    from flask_socketio import emit, leave_room
+
+    def requested_rooms(data) -> List[str]:
+        tickers = (data or {}).get('tickers') or []
+        if isinstance(tickers, str):
+            tickers = tickers.split(',')
+        if '*' in tickers:
+            return [MARKET_ROOM]
+        return [ticker_room(ticker) for ticker in normalize_tickers(tickers)[:MAX_TICKERS_PER_CLIENT]]
+
+    @socketio.on('subscribe')
+    def handle_subscribe(data=None):
+        """Watch only the given tickers ({'tickers': [...]}), or '*' for the whole market"""
+        rooms = requested_rooms(data)
+        if not rooms:
+            emit('subscription', {'rooms': sorted(subscriptions.rooms_of(request.sid)),
+                                  'error': 'No valid tickers to subscribe to'})
+            return
+        set_client_rooms(subscriptions, rooms)
+
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data=None):
+        """Stop watching the given tickers"""
+        for room in subscriptions.leave(request.sid, requested_rooms(data)):
+            leave_room(room)
+        emit('subscription', {'rooms': sorted(subscriptions.rooms_of(request.sid))})
+
+    @socketio.on('stock_snapshot')
+    def handle_stock_snapshot(data=None):
+        """Send a full snapshot of a room to a client that detected a version gap"""
+        room = (data or {}).get('room', MARKET_ROOM)
+        if room not in subscriptions.rooms_of(request.sid):
+            return
+        snapshot = subscriptions.snapshot(room)
+        if snapshot is not None:
+            emit('stock_update', snapshot)
+
+    @socketio.on('disconnect')
+    def handle_disconnect():
+        """Release the client's subscriptions"""
+        subscriptions.drop(request.sid)
@@ -0,0 +1,105 @@
+"""
+Delta encoding for stock_update socket payloads
+Remembers the last state broadcast for each Redis hash and turns change-feed
+batches into versioned deltas holding only the fields that changed. Clients
+apply deltas in version order and ask for a full snapshot when they see a gap;
+a full snapshot is also broadcast periodically. Each Socket.IO room has its
+own encoder and version sequence.
+"""
+
+import time
+import threading
+from typing import Dict, List, Optional, Any
+from polygon_config import config
+
+class StockDeltaEncoder:
+    """Versioned field-level deltas against the last state sent to clients"""
+
+    def __init__(self, room: str = 'market', snapshot_interval_seconds: Optional[int] = None):
+        self.room = room
+        self.snapshot_interval = (config.stock_snapshot_interval_seconds
+                                  if snapshot_interval_seconds is None else snapshot_interval_seconds)
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.last_snapshot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """Full snapshot payload (caller holds the lock)"""
+        self.last_snapshot = time.monotonic()
+        return {
+            'room': self.room,
+            'full': True,
+            'version': self.version,
+            'stocks': [dict(stock) for stock in self.state.values()]
+        }
+
+    def seed(self, stocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Replace the tracked state (on startup or after the change feed reconnects)
+
+        Args:
+            stocks: Current hashes, each tagged with its redis_key
+
+        Returns:
+            Full snapshot payload for the new state
+        """
+        with self.lock:
+            self.state = {}
+            for stock in stocks:
+                row = dict(stock)
+                row.setdefault('key_type', row['redis_key'].split(':')[0])
+                self.state[row['redis_key']] = row
+            self.version += 1
+            return self._snapshot()
+
+    def encode(self, stocks: List[Dict[str, Any]], removed_keys: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Diff changed hashes against the last state sent
+
+        Args:
+            stocks: Changed hashes, each tagged with its redis_key
+            removed_keys: Keys that no longer exist
+
+        Returns:
+            Delta payload {'room', 'version', 'base_version', 'changes', 'removed'}, or
+            None when nothing actually changed. Fields deleted from a hash are
+            sent as None.
+        """
+        with self.lock:
+            changes = {}
+            for stock in stocks:
+                key = stock['redis_key']
+                previous = self.state.get(key, {})
+                diff = {field: value for field, value in stock.items() if previous.get(field) != value}
+                for field in previous:
+                    if field not in stock:
+                        diff[field] = None
+                if diff:
+                    changes[key] = diff
+                    self.state[key] = dict(stock)
+
+            removed = [key for key in removed_keys if self.state.pop(key, None) is not None]
+            if not changes and not removed:
+                return None
+
+            self.version += 1
+            return {
+                'room': self.room,
+                'version': self.version,
+                'base_version': self.version - 1,
+                'changes': changes,
+                'removed': removed
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Full snapshot of the current state at the current version"""
+        with self.lock:
+            return self._snapshot()
+
+    def snapshot_if_due(self) -> Optional[Dict[str, Any]]:
+        """Full snapshot when the periodic snapshot interval has elapsed, else None"""
+        with self.lock:
+            if self.snapshot_interval <= 0 or time.monotonic() - self.last_snapshot < self.snapshot_interval:
+                return None
+            return self._snapshot()
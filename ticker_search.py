@@ -0,0 +1,221 @@
+"""
+In-process search index over stock_tickers for autocomplete
+Ticker symbols and the words of company names are kept in sorted arrays, so a
+prefix is two binary searches, and every term's single-character deletions are
+kept in a map for typo-tolerant matching (symmetric delete: one substitution,
+insertion, deletion or adjacent swap). Each worker builds the index once and
+rebuilds it in the background when stock_tickers changes, so queries never
+touch the database.
+"""
+
+import re
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any
+from polygon_config import config
+
+# Columns kept per ticker and returned by search()
+TICKER_COLUMNS = ['ticker', 'name', 'active', 'market', 'locale', 'primary_exchange', 'type',
+                  'currency_name', 'created_at', 'updated_at']
+
+MAX_SEARCH_RESULTS = 50
+# Queries shorter than this are too ambiguous for fuzzy matching
+MIN_FUZZY_LENGTH = 3
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def normalize(text: str) -> str:
+    """Lower-case and drop punctuation, e.g. 'BRK.B' -> 'brkb'"""
+    return ''.join(WORD_PATTERN.findall((text or '').lower()))
+
+def deletions(term: str) -> Set[str]:
+    """The term with each single character removed"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein plus adjacent swaps)"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+class TickerIndex:
+    """Immutable snapshot of the search structures for one set of rows"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        # Sorted by normalized symbol so prefix searches can bisect self.symbols
+        self.rows = sorted(rows, key=lambda row: normalize(row['ticker']))
+        self.symbols = [normalize(row['ticker']) for row in self.rows]
+
+        # (word, row index) for every word of every company name, sorted by word
+        words = []
+        for index, row in enumerate(self.rows):
+            for word in set(WORD_PATTERN.findall((row.get('name') or '').lower())):
+                words.append((word, index))
+        words.sort()
+        self.words = words
+        self.word_keys = [word for word, _ in words]
+
+        # Fuzzy lookup: each distinct term's rows, and the term and its single deletions -> terms
+        self.term_rows: Dict[str, List[int]] = {}
+        for index, symbol in enumerate(self.symbols):
+            self.term_rows.setdefault(symbol, []).append(index)
+        for word, index in words:
+            if len(word) >= MIN_FUZZY_LENGTH:
+                self.term_rows.setdefault(word, []).append(index)
+        self.variants: Dict[str, List[str]] = {}
+        for term in self.term_rows:
+            for variant in deletions(term) | {term}:
+                self.variants.setdefault(variant, []).append(term)
+
+    def _prefix_range(self, keys: List[str], prefix: str) -> range:
+        """Positions of keys starting with prefix"""
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\uffff', lo=start)
+        return range(start, end)
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """
+        Rank tickers for a query: exact symbol, symbol prefix, company-name word
+        prefix, then (if fuzzy) symbols and name words one typo away
+
+        Returns:
+            Row dicts, each with match ('exact', 'symbol', 'name' or 'fuzzy')
+        """
+        terms = WORD_PATTERN.findall((query or '').lower())
+        if not terms:
+            return []
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        symbol = ''.join(terms)
+        results: List[Dict[str, Any]] = []
+        seen: Set[int] = set()
+
+        def add(index: int, match: str) -> bool:
+            if index not in seen and self._matches_rest(index, terms):
+                seen.add(index)
+                results.append(dict(self.rows[index], match=match))
+            return len(results) >= limit
+
+        for position in self._prefix_range(self.symbols, symbol):
+            if add(position, 'exact' if self.symbols[position] == symbol else 'symbol'):
+                return self._ordered(results)
+
+        # Multi-word queries match names on the first word; _matches_rest checks the others
+        for position in self._prefix_range(self.word_keys, terms[0]):
+            if add(self.words[position][1], 'name'):
+                return self._ordered(results)
+
+        term = terms[0] if len(terms) > 1 else symbol
+        if fuzzy and len(term) >= MIN_FUZZY_LENGTH:
+            candidates = {candidate for variant in deletions(term) | {term}
+                          for candidate in self.variants.get(variant, ())}
+            matches = sorted((edit_distance(term, candidate), candidate) for candidate in candidates)
+            for distance, candidate in matches:
+                if distance > 1:
+                    break
+                if any(add(index, 'fuzzy') for index in self.term_rows[candidate]):
+                    break
+        return self._ordered(results)
+
+    def _matches_rest(self, index: int, terms: List[str]) -> bool:
+        """Every query word after the first prefixes some word of the name (or the symbol)"""
+        if len(terms) < 2:
+            return True
+        name_words = WORD_PATTERN.findall((self.rows[index].get('name') or '').lower())
+        symbol = self.symbols[index]
+        if symbol.startswith(''.join(terms)):
+            return True
+        return all(any(word.startswith(term) for word in name_words) for term in terms[1:])
+
+    @staticmethod
+    def _ordered(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Active tickers first, otherwise keep the match-quality order"""
+        return sorted(results, key=lambda row: row.get('active') is False)
+
+class TickerSearch:
+    """
+    Search over stock_tickers that rebuilds its index when the table changes
+
+    A background thread compares the table's row count and latest updated_at
+    with the indexed snapshot every refresh_seconds; call refresh() after
+    writing tickers to pick changes up at once.
+    """
+
+    def __init__(self, connection: Callable, refresh_seconds: Optional[int] = None,
+                 logger: logging.Logger = None):
+        """
+        Args:
+            connection: Returns a PostgreSQL connection context manager with
+                dict rows, e.g. DatabasePool.connection
+            refresh_seconds: Change probe interval (default from config)
+        """
+        self.connection = connection
+        self.refresh_seconds = config.ticker_search_refresh_seconds if refresh_seconds is None else refresh_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self.index: Optional[TickerIndex] = None
+        self.version = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def _table_version(self, cur) -> Tuple:
+        cur.execute("SELECT COUNT(*) AS count, MAX(updated_at) AS updated_at FROM stock_tickers")
+        row = cur.fetchone()
+        return row['count'], row['updated_at']
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild the index if stock_tickers changed since it was built
+
+        Returns:
+            True when the index was rebuilt
+        """
+        with self.lock:
+            with self.connection() as conn:
+                with conn.cursor() as cur:
+                    version = self._table_version(cur)
+                    if not force and self.index is not None and version == self.version:
+                        return False
+                    cur.execute(f"SELECT {', '.join(TICKER_COLUMNS)} FROM stock_tickers")
+                    rows = [dict(row) for row in cur.fetchall()]
+            started = time.monotonic()
+            self.index = TickerIndex(rows)
+            self.version = version
+        self.logger.info(f"Ticker search index built: {len(rows)} tickers in "
+                         f"{(time.monotonic() - started) * 1000:.0f}ms")
+        return True
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """Search the current index, building it on first use"""
+        if self.index is None:
+            self.refresh()
+        return self.index.search(query, limit=limit, fuzzy=fuzzy)
+
+    def _loop(self):
+        while not self.stop_event.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.warning(f"Ticker search refresh failed: {e}")
+
+    def start(self):
+        """Probe for stock_tickers changes in a daemon thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='ticker-search', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop probing"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
@@ -9,48 +9,61 @@ Features:
 - RDI job configuration documentation
 """
 
+# Make socket, threading and psycopg2 I/O cooperative before anything else uses them
+from dashboard_io import patch_for_eventlet, DatabasePool, create_redis_client
+ASYNC_MODE = patch_for_eventlet()
+
 import os
-import json
-import redis
 import random
 import time
 import threading
 import logging
 from datetime import datetime, timedelta
-from decimal import Decimal
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, stream_with_context
 from flask_socketio import SocketIO, emit
 
 # Import existing components
 from polygon_config import PolygonConfig
 from polygon_fetcher import PolygonDataFetcher
-import psycopg2
-import psycopg2.extras
+from polygon_health import HealthMonitor, register_health_endpoint
+from redis_stock_store import (read_key_families, read_latest_stocks, register_keys, ensure_registries,
+                               KEY_FAMILY_PATTERNS, apply_market_event, publish_changes)
+from redis_change_feed import ChangeFeedSubscriber
+from pg_change_feed import PostgresChangeFeed, install_notify_trigger
+from dashboard_state import FleetLease
+from response_cache import ResponseCache
+from fast_json import FastJSONProvider, dumps_bytes
+from columnar_format import negotiate_format, encode_columnar, JSON_MIMETYPE
+from daily_aggregates_query import parse_filters, parse_date, filters_key, fetch_page, TICKER_PATTERN
+from daily_aggregates_export import ExportLimiter, stream_export, export_format, EXPORT_MIMETYPES
+from indicator_engine import IndicatorEngine
+from market_anomaly import AnomalyDetector
+from stock_leaderboard import record_movers, remove_movers, top_movers, rebuild_leaderboards
+from chart_downsampling import load_bars, downsample_chart, CHART_SOURCES, MAX_CHART_POINTS
+from stock_subscriptions import (StockSubscriptions, register_subscription_handlers, set_client_rooms,
+                                 subscriber_rooms, MARKET_ROOM)
+from redis_tick_stream import append_tick, read_tick_range, read_tick_tail, read_ticks_after, purge_legacy_tick_keys
+from redis_timeseries import PriceTimeSeries
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Custom JSON encoder for Decimal and date objects
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif hasattr(obj, 'isoformat'):
-            return obj.isoformat()
-        return super().default(obj)
-
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'unified-stock-dashboard-secret'
-app.json_encoder = CustomJSONEncoder
-socketio = SocketIO(app, cors_allowed_origins="*")
+# orjson-backed JSON (Decimal as numbers, dates as ISO strings) with a stdlib fallback
+app.json = FastJSONProvider(app)
 
 # Initialize components
 config = PolygonConfig()
 fetcher = PolygonDataFetcher()
 
-# Redis connection
-redis_client = redis.Redis(
+# With a message queue, emits from any worker reach clients connected to every worker
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE,
+                    message_queue=config.socketio_message_queue or None, channel='unified-dashboard')
+
+# Redis connection (bounded pool; requests wait for a free connection)
+redis_client = create_redis_client(
     host='redis-16663.crce197.us-east-2-1.ec2.redns.redis-cloud.com',
     port=16663,
     username='default',
@@ -58,11 +71,46 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
-# Global variables
-fetching_active = False
-fetching_thread = None
-demo_active = False
-demo_thread = None
+# PostgreSQL connections shared by request handlers and the demo updater
+db_pool = DatabasePool()
+
+# Streaming exports hold a pooled connection each; the rest stay free for the API
+export_limiter = ExportLimiter()
+
+# /api/data/daily_aggregates responses; writers to daily_aggregates invalidate it
+daily_aggregates_cache = ResponseCache('daily_aggregates')
+
+# /api/chart responses, keyed by (ticker, interval, kind, range, width); daily_aggregates
+# writers invalidate it and minute bars age out with the cache TTL
+chart_cache = ResponseCache('chart')
+
+# SMA/EMA/RSI/Bollinger/volatility per ticker, carried forward bar by bar from the Postgres change feed
+indicator_engine = IndicatorEngine(redis_client, db_pool.connection)
+
+# Close/volume series with 1m/1h/1d downsampling for charts
+price_series = PriceTimeSeries(redis_client)
+
+# Key families listed by /api/redis/stocks, in page order
+REDIS_STOCK_FAMILIES = [
+    ('ticker', 'AAPL'),
+    ('ticker', 'GOOGL'),
+    ('ticker', 'MSFT'),
+    ('ticker', 'TSLA'),
+    ('ticker', 'AMZN'),
+    ('stock_tickers', 'stock_tickers:ticker:*'),
+    ('latest', 'latest:*'),
+    ('crash', 'live:crash:*'),
+    ('surge', 'live:surge:*')
+]
+
+# Cached dependency health served at /healthz
+health_monitor = HealthMonitor(redis_client=redis_client, polygon_client=fetcher.polygon_client, logger=logger)
+register_health_endpoint(app, health_monitor)
+
+# Jobs that must run on one worker at a time; any worker can stop them by revoking the lease
+fetch_lease = FleetLease(redis_client, 'unified:polygon_fetch', ttl_seconds=config.dashboard_lease_ttl_seconds)
+market_feed_lease = FleetLease(redis_client, 'unified:market_feed', ttl_seconds=config.dashboard_lease_ttl_seconds)
+demo_lease = FleetLease(redis_client, 'unified:demo_stock', ttl_seconds=config.dashboard_lease_ttl_seconds)
 
 class UnifiedStockManager:
     def __init__(self):
@@ -78,11 +126,8 @@ class UnifiedStockManager:
         self.demo_price = 100.00
         self.demo_direction = 1  # 1 for up, -1 for down
     
-    def fetch_polygon_data(self):
-        """Fetch real data from Polygon.io"""
-        global fetching_active
-        fetching_active = True
-        
+    def fetch_polygon_data(self, lease_token):
+        """Fetch real data from Polygon.io (caller acquired fetch_lease as lease_token)"""
         try:
             socketio.emit('status_update', {
                 'status': 'Running',
@@ -104,7 +149,7 @@ class UnifiedStockManager:
             logger.info(f"Starting to process {total_tickers} tickers: {self.tickers}")
 
             for i, ticker in enumerate(self.tickers):
-                if not fetching_active:
+                if not fetch_lease.renew(lease_token):  # Stopped by a user on any worker
                     break
                     
                 progress = int((i / total_tickers) * 100)
@@ -134,26 +179,25 @@ class UnifiedStockManager:
                     success = False
 
                 if success:
+                    daily_aggregates_cache.invalidate()
+                    chart_cache.invalidate()
                     socketio.emit('log_message', {
                         'message': f'Successfully fetched data for {ticker}',
                         'level': 'INFO'
                     })
 
-                    # Immediately refresh data displays after each successful fetch
-                    socketio.emit('data_update', {
+                    # Immediately refresh data displays watching this ticker
+                    emit_to_subscribers('data_update', {
                         'source': 'polygon',
                         'ticker': ticker,
                         'message': f'New data available for {ticker}'
-                    })
+                    }, [ticker])
 
                 else:
                     socketio.emit('log_message', {
                         'message': f'Failed to fetch data for {ticker}',
                         'level': 'WARNING'
                     })
-
-                # Rate limiting
-                time.sleep(12)  # 5 requests per minute limit
             
             socketio.emit('status_update', {
                 'status': 'Completed',
@@ -167,7 +211,7 @@ class UnifiedStockManager:
             })
             
             # Emit data update
-            socketio.emit('data_update', {'source': 'polygon'})
+            emit_to_subscribers('data_update', {'source': 'polygon'}, self.tickers)
             
         except Exception as e:
             logger.error(f"Error in fetch_polygon_data: {e}")
@@ -176,12 +220,13 @@ class UnifiedStockManager:
                 'level': 'ERROR'
             })
         finally:
-            fetching_active = False
+            fetch_lease.release(lease_token)
     
     def simulate_crash(self, intensity=0.3):
         """Simulate market crash"""
         logger.info(f"🔴 SIMULATING MARKET CRASH - Intensity: {intensity}")
         
+        crash_rows = {}
         for ticker in self.tickers:
             drop_percent = random.uniform(0.15, intensity)
             new_price = self.base_prices[ticker] * (1 - drop_percent)
@@ -201,18 +246,16 @@ class UnifiedStockManager:
                 'volatility': 'EXTREME'
             }
             
-            # Store in Redis
-            key = f"live:crash:{ticker}"
-            redis_client.hset(key, mapping=crash_data)
-            redis_client.expire(key, 3600)
-            
-            # Update latest
-            redis_client.hset(f"latest:{ticker}", mapping=crash_data)
+            crash_rows[ticker] = crash_data
+        
+        # Apply the whole event atomically in a single round trip
+        apply_market_event(redis_client, 'crash', crash_rows, timeseries=price_series)
     
     def simulate_surge(self, intensity=0.4):
         """Simulate market surge"""
         logger.info(f"🚀 SIMULATING MARKET SURGE - Intensity: {intensity}")
         
+        surge_rows = {}
         for ticker in self.tickers:
             gain_percent = random.uniform(0.20, intensity)
             new_price = self.base_prices[ticker] * (1 + gain_percent)
@@ -232,13 +275,10 @@ class UnifiedStockManager:
                 'volatility': 'EXTREME'
             }
             
-            # Store in Redis
-            key = f"live:surge:{ticker}"
-            redis_client.hset(key, mapping=surge_data)
-            redis_client.expire(key, 3600)
-            
-            # Update latest
-            redis_client.hset(f"latest:{ticker}", mapping=surge_data)
+            surge_rows[ticker] = surge_data
+        
+        # Apply the whole event atomically in a single round trip
+        apply_market_event(redis_client, 'surge', surge_rows, timeseries=price_series)
 
     def update_demo_stock(self):
         """Update the DEMO stock with realistic price movements"""
@@ -273,100 +313,104 @@ class UnifiedStockManager:
 
         # Insert into PostgreSQL
         try:
-            conn = psycopg2.connect(
-                host='localhost',
-                port=5432,
-                database='chinook',
-                user='postgres',
-                password='postgres'
-            )
-            cursor = conn.cursor()
-
-            # Insert into daily_aggregates table
-            insert_query = """
-                INSERT INTO daily_aggregates (ticker, date, open, high, low, close, volume)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ticker, date) DO UPDATE SET
-                    open = EXCLUDED.open,
-                    high = EXCLUDED.high,
-                    low = EXCLUDED.low,
-                    close = EXCLUDED.close,
-                    volume = EXCLUDED.volume
-            """
-
-            cursor.execute(insert_query, (
-                demo_data['ticker'],
-                demo_data['date'],
-                demo_data['open'],
-                demo_data['high'],
-                demo_data['low'],
-                demo_data['close'],
-                demo_data['volume']
-            ))
-
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with db_pool.connection() as conn:
+                cursor = conn.cursor()
+
+                # Insert into daily_aggregates table
+                insert_query = """
+                    INSERT INTO daily_aggregates (ticker, date, open, high, low, close, volume)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (ticker, date) DO UPDATE SET
+                        open = EXCLUDED.open,
+                        high = EXCLUDED.high,
+                        low = EXCLUDED.low,
+                        close = EXCLUDED.close,
+                        volume = EXCLUDED.volume
+                """
+
+                cursor.execute(insert_query, (
+                    demo_data['ticker'],
+                    demo_data['date'],
+                    demo_data['open'],
+                    demo_data['high'],
+                    demo_data['low'],
+                    demo_data['close'],
+                    demo_data['volume']
+                ))
+                cursor.close()
+            daily_aggregates_cache.invalidate()
+            chart_cache.invalidate()
 
             logger.info(f"📈 DEMO stock updated: ${self.demo_price:.2f} ({change_percent*100:+.2f}%)")
 
         except Exception as e:
             logger.error(f"Error updating DEMO stock in PostgreSQL: {e}")
 
-        # Also store directly in Redis for immediate visibility
-        redis_client.hset(f"latest:DEMO", mapping=demo_data)
-        redis_client.hset(f"live:demo:{datetime.now().strftime('%H%M%S')}", mapping=demo_data)
+        # Also store directly in Redis for immediate visibility (one atomic round trip)
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hset(f"latest:DEMO", mapping=demo_data)
+        append_tick(pipe, 'DEMO', demo_data)
+        price_series.add('DEMO', demo_data, pipe=pipe)
+        record_movers(pipe, {'DEMO': demo_data})
+        register_keys(pipe, 'latest', ["latest:DEMO"])
+        publish_changes(pipe, ["latest:DEMO"])
+        pipe.execute()
 
         return demo_data
 
 manager = UnifiedStockManager()
 
-def demo_stock_updater():
-    """Background thread to continuously update DEMO stock"""
-    global demo_active
-    demo_active = True
-
+def demo_stock_updater(lease_token):
+    """Background thread to continuously update DEMO stock (caller acquired demo_lease as lease_token)"""
     logger.info("🎬 Starting DEMO stock continuous updates...")
 
-    while demo_active:
-        try:
-            manager.update_demo_stock()
-            time.sleep(random.uniform(3, 7))  # Update every 3-7 seconds
-        except Exception as e:
-            logger.error(f"Demo stock updater error: {e}")
-            time.sleep(5)
+    # Continue from the last price another worker published rather than restarting at 100
+    last_close = redis_client.hget('latest:DEMO', 'close')
+    if last_close:
+        manager.demo_price = float(last_close)
+
+    try:
+        while demo_lease.renew(lease_token):  # Stopped by a user on any worker
+            try:
+                manager.update_demo_stock()
+                time.sleep(random.uniform(3, 7))  # Update every 3-7 seconds
+            except Exception as e:
+                logger.error(f"Demo stock updater error: {e}")
+                time.sleep(5)
+    finally:
+        demo_lease.release(lease_token)
 
 @app.route('/')
 def dashboard():
-    return render_template('unified_dashboard.html')
+    # Without a live change feed the page falls back to polling PostgreSQL
+    return render_template('unified_dashboard.html', pg_change_feed_live=pg_change_feed.is_live())
 
 @app.route('/clean')
 def clean_dashboard():
     """Clean side-by-side dashboard"""
-    return render_template('clean_dashboard.html')
+    return render_template('clean_dashboard.html', pg_change_feed_live=pg_change_feed.is_live())
 
 @app.route('/api/start', methods=['POST'])
 def start_fetching():
     """Start Polygon data fetching"""
-    global fetching_thread, fetching_active
-    
-    if fetching_active:
-        return jsonify({'success': False, 'error': 'Fetching already in progress'})
+    lease_token = fetch_lease.acquire()
+    if not lease_token:
+        return jsonify({'success': False, 'error': f'Fetching already in progress on {fetch_lease.holder()}'})
     
     try:
-        fetching_thread = threading.Thread(target=manager.fetch_polygon_data, daemon=True)
+        fetch_lease.keep_alive(lease_token)
+        fetching_thread = threading.Thread(target=manager.fetch_polygon_data, args=(lease_token,), daemon=True)
         fetching_thread.start()
         return jsonify({'success': True, 'message': 'Data fetching started'})
     except Exception as e:
+        fetch_lease.release(lease_token)
         logger.error(f"Error starting fetch: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/stop', methods=['POST'])
 def stop_fetching():
     """Stop Polygon data fetching"""
-    global fetching_active
-    
-    fetching_active = False
+    fetch_lease.revoke()
     socketio.emit('status_update', {
         'status': 'Stopped',
         'detail': 'Stopped by user'
@@ -379,12 +423,12 @@ def get_stats():
     """Get database statistics"""
     try:
         # Get stats directly from database
-        conn = fetcher.connect_db()
-        cursor = conn.cursor()
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
 
-        # Get daily aggregates count (this works)
-        cursor.execute("SELECT COUNT(*) FROM daily_aggregates")
-        daily_count = cursor.fetchone()[0]
+            # Get daily aggregates count (this works)
+            cursor.execute("SELECT COUNT(*) AS count FROM daily_aggregates")
+            daily_count = cursor.fetchone()['count']
 
         # Provide fallback values for now
         stats = {
@@ -393,7 +437,6 @@ def get_stats():
             'success_rate': "100%"
         }
 
-        conn.close()
         logger.info(f"Stats retrieved successfully: {stats}")
         return jsonify({'success': True, 'stats': stats})
     except Exception as e:
@@ -408,82 +451,251 @@ def get_stats():
             }
         })
 
+# Columns served by /api/data/daily_aggregates
+DAILY_AGGREGATE_COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume', 'vwap', 'transactions']
+
+def query_daily_aggregates(filters, fmt):
+    """Query one page of daily aggregates and serialize it in the negotiated format"""
+    with db_pool.connection() as conn:
+        rows, next_cursor = fetch_page(conn, DAILY_AGGREGATE_COLUMNS, filters)
+    logger.info(f"Query returned {len(rows)} rows")
+
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+    if fmt == 'json':
+        body = dumps_bytes({'success': True, 'data': rows, 'next_cursor': next_cursor})
+        headers['Content-Type'] = JSON_MIMETYPE
+    else:
+        body, headers['Content-Type'] = encode_columnar(rows, DAILY_AGGREGATE_COLUMNS, fmt,
+                                                        {'next_cursor': next_cursor})
+    return body, headers
+
 @app.route('/api/data/daily_aggregates')
 def get_daily_aggregates():
-    """Get daily aggregates data"""
+    """
+    Get daily aggregates data, newest first (served from daily_aggregates_cache until the table changes)
+
+    Query parameters: limit, ticker (comma-separated), start_date, end_date
+    (YYYY-MM-DD, inclusive) and cursor (next_cursor of the previous page).
+    Accept: application/x-msgpack or application/vnd.apache.arrow.stream
+    returns the page as columns instead of JSON rows.
+    """
     try:
-        limit = request.args.get('limit', 20, type=int)
-
-        conn = fetcher.connect_db()
-        cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute("""
-            SELECT ticker, date, open, high, low, close, volume, vwap, transactions
-            FROM daily_aggregates
-            ORDER BY date DESC, ticker
-            LIMIT %s
-        """, (limit,))
-
-        # Debug: Log what we're getting
-        rows = cursor.fetchall()
-        logger.info(f"Query returned {len(rows)} rows")
-        if rows:
-            logger.info(f"First row: {rows[0]}")
-
-        # Convert RealDictRow objects to regular dicts with proper type conversion
-        data = []
-        for row in rows:
-            row_dict = {}
-            for key, value in row.items():
-                if isinstance(value, Decimal):
-                    row_dict[key] = float(value)
-                elif hasattr(value, 'isoformat'):
-                    row_dict[key] = value.isoformat()
-                else:
-                    row_dict[key] = value
-            data.append(row_dict)
+        filters = parse_filters(request.args, default_limit=20)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    fmt = negotiate_format(request.accept_mimetypes)
 
-        conn.close()
-        return jsonify({'success': True, 'data': data})
+    try:
+        body, headers, hit = daily_aggregates_cache.get_or_compute(filters_key(filters) + (fmt,),
+                                                                   lambda: query_daily_aggregates(filters, fmt))
+        response = app.response_class(body, headers=headers)
+        response.vary.add('Accept')
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
     except Exception as e:
         logger.error(f"Error getting daily aggregates: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/data/daily_aggregates/export')
+def export_daily_aggregates():
+    """
+    Stream daily aggregates as NDJSON or CSV (format=ndjson|csv), newest first
+
+    Takes the same ticker, start_date, end_date and cursor filters as
+    /api/data/daily_aggregates; limit is optional and unbounded.
+    """
+    try:
+        filters = parse_filters(request.args, default_limit=None, max_limit=None)
+        fmt = export_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    if not export_limiter.try_acquire():
+        return jsonify({'success': False, 'error': 'Too many exports in progress, try again shortly'}), 503
+
+    rows = stream_export(db_pool.connection, DAILY_AGGREGATE_COLUMNS, filters, fmt)
+    response = app.response_class(stream_with_context(rows), mimetype=EXPORT_MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename=daily_aggregates.{fmt}'
+    })
+    response.call_on_close(export_limiter.release)
+    return response
+
+def query_chart(ticker, interval, kind, start, end, width):
+    """Load a ticker's bars and downsample them to the requested width"""
+    with db_pool.connection() as conn:
+        bars = load_bars(conn, ticker, interval, start, end)
+    data = downsample_chart(bars, width, kind)
+    body = dumps_bytes({
+        'success': True,
+        'ticker': ticker,
+        'interval': interval,
+        'kind': kind,
+        'source_points': len(bars),
+        'points': len(data['time']),
+        'data': data
+    })
+    return body, {'Content-Type': JSON_MIMETYPE}
+
+@app.route('/api/chart/<ticker>')
+def get_chart(ticker):
+    """
+    Get a ticker's price history reduced to one point per pixel of chart width
+
+    Query parameters: width (pixels, default 800), kind (line: LTTB over close,
+    or ohlc: merged candles), interval (day or minute), start_date and end_date
+    (YYYY-MM-DD, inclusive). Times are epoch milliseconds.
+    """
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            raise ValueError(f"Invalid ticker: {ticker}")
+        interval = request.args.get('interval', 'day')
+        if interval not in CHART_SOURCES:
+            raise ValueError(f"interval must be one of: {', '.join(CHART_SOURCES)}")
+        kind = request.args.get('kind', 'line')
+        if kind not in ('line', 'ohlc'):
+            raise ValueError("kind must be line or ohlc")
+        width = request.args.get('width', 800, type=int)
+        if width < 1:
+            raise ValueError("width must be a positive integer")
+        width = min(width, MAX_CHART_POINTS)
+        start = parse_date(request.args.get('start_date'), 'start_date')
+        end = parse_date(request.args.get('end_date'), 'end_date')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        body, headers, hit = chart_cache.get_or_compute(
+            (ticker, interval, kind, start, end, width),
+            lambda: query_chart(ticker, interval, kind, start, end, width))
+        response = app.response_class(body, headers=headers)
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+    except Exception as e:
+        logger.error(f"Error building chart for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/redis/stocks')
 def get_redis_stocks():
-    """Get stock data from Redis"""
+    """Get stock data from Redis (optionally paginated with cursor/page_size)"""
     try:
+        cursor = request.args.get('cursor')
+        page_size = request.args.get('page_size', type=int)
+
+        page = read_key_families(redis_client, REDIS_STOCK_FAMILIES, cursor=cursor, page_size=page_size)
+
         stocks = []
-        
-        # Get all stock keys
-        ticker_keys = redis_client.keys('AAPL') + redis_client.keys('GOOGL') + redis_client.keys('MSFT') + redis_client.keys('TSLA') + redis_client.keys('AMZN')
-        stock_ticker_keys = redis_client.keys('stock_tickers:ticker:*')
-        latest_keys = redis_client.keys('latest:*')
-        crash_keys = redis_client.keys('live:crash:*')
-        surge_keys = redis_client.keys('live:surge:*')
-
-        all_keys = ticker_keys + stock_ticker_keys + latest_keys + crash_keys + surge_keys
-        
-        for key in all_keys:
-            data = redis_client.hgetall(key)
-            if data:
-                data['redis_key'] = key
-                data['key_type'] = key.split(':')[0]
-                stocks.append(data)
-        
+        for family, key, data in page['items']:
+            data['redis_key'] = key
+            data['key_type'] = key.split(':')[0]
+            stocks.append(data)
+
+        counts = page['counts']
         return jsonify({
             'success': True,
             'stocks': stocks,
-            'total_keys': len(all_keys),
-            'stock_keys': len(ticker_keys + stock_ticker_keys),
-            'latest_keys': len(latest_keys),
-            'crash_keys': len(crash_keys),
-            'surge_keys': len(surge_keys)
+            'total_keys': sum(counts.values()),
+            'stock_keys': counts['ticker'] + counts['stock_tickers'],
+            'latest_keys': counts['latest'],
+            'crash_keys': counts['crash'],
+            'surge_keys': counts['surge'],
+            'next_cursor': page['next_cursor']
         })
     
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching Redis stocks: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/redis/ticks/<ticker>')
+def get_redis_ticks(ticker):
+    """Get tick history for a ticker from its Redis stream"""
+    # after=<id> catches up from a stream ID, start/end reads a range oldest-first,
+    # otherwise the latest ticks are returned (page further back with before)
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            return jsonify({'success': False, 'error': f"Invalid ticker: {ticker}"}), 400
+        count = request.args.get('count', 100, type=int)
+        after = request.args.get('after')
+
+        if after is not None:
+            ticks = read_ticks_after(redis_client, {ticker: after}, count=count).get(ticker, [])
+            return jsonify({'success': True, 'ticker': ticker, 'ticks': ticks,
+                            'last_id': ticks[-1]['id'] if ticks else after})
+
+        if 'start' in request.args or 'end' in request.args:
+            page = read_tick_range(redis_client, ticker, start=request.args.get('start', '-'),
+                                   end=request.args.get('end', '+'), count=count)
+        else:
+            page = read_tick_tail(redis_client, ticker, count=count, before=request.args.get('before', '+'))
+
+        page.update({'success': True, 'ticker': ticker})
+        return jsonify(page)
+
+    except Exception as e:
+        logger.error(f"Error fetching ticks for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/redis/timeseries/<ticker>')
+def get_redis_timeseries(ticker):
+    """Get a downsampled close/volume series for charting in one Redis call"""
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            return jsonify({'success': False, 'error': f"Invalid ticker: {ticker}"}), 400
+        series = price_series.range(
+            ticker,
+            field=request.args.get('field', 'close'),
+            from_ms=request.args.get('from', type=int),
+            to_ms=request.args.get('to', type=int),
+            resolution=request.args.get('resolution', 'auto'),
+            max_points=request.args.get('max_points', 500, type=int)
+        )
+        series['success'] = True
+        return jsonify(series)
+
+    except Exception as e:
+        logger.error(f"Error fetching time series for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/indicators/<ticker>')
+def get_indicators(ticker):
+    """Get a ticker's latest technical indicators from Redis (computed from history on first request)"""
+    try:
+        ticker = ticker.upper()
+        if not TICKER_PATTERN.match(ticker):
+            return jsonify({'success': False, 'error': f"Invalid ticker: {ticker}"}), 400
+        indicators = indicator_engine.read(ticker)
+        if indicators is None:
+            return jsonify({'success': False, 'error': f"No daily aggregates for {ticker}"}), 404
+        return jsonify({'success': True, 'ticker': ticker, 'indicators': indicators})
+
+    except Exception as e:
+        logger.error(f"Error fetching indicators for {ticker}: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/leaderboard')
+def get_leaderboard():
+    """
+    Get the top movers from the leaderboard sorted sets
+
+    Query parameters: metric (change_percent or volume), direction (top:
+    gainers / most traded, bottom: losers / least traded) and count.
+    """
+    try:
+        metric = request.args.get('metric', 'change_percent')
+        direction = request.args.get('direction', 'top')
+        movers = top_movers(redis_client, metric, direction, count=request.args.get('count', 10, type=int))
+        return jsonify({'success': True, 'metric': metric, 'direction': direction, 'movers': movers})
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error reading leaderboard: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/simulate/crash', methods=['POST'])
 def simulate_crash():
     """Simulate market crash"""
@@ -491,11 +703,12 @@ def simulate_crash():
         intensity = float(request.json.get('intensity', 0.3))
         manager.simulate_crash(intensity)
         
-        socketio.emit('market_event', {
+        emit_to_subscribers('market_event', {
             'type': 'CRASH',
             'intensity': intensity,
+            'tickers': manager.tickers,
             'message': f'🔴 MARKET CRASH SIMULATED! Average drop: {intensity*100:.0f}%'
-        })
+        }, manager.tickers)
         
         return jsonify({'success': True, 'message': 'Market crash simulated!'})
     
@@ -510,11 +723,12 @@ def simulate_upturn():
         intensity = float(request.json.get('intensity', 0.4))
         manager.simulate_surge(intensity)
 
-        socketio.emit('market_event', {
+        emit_to_subscribers('market_event', {
             'type': 'SURGE',
             'intensity': intensity,
+            'tickers': manager.tickers,
             'message': f'🚀 MARKET SURGE SIMULATED! Average gain: {intensity*100:.0f}%'
-        })
+        }, manager.tickers)
 
         return jsonify({'success': True, 'message': 'Market surge simulated!'})
 
@@ -525,28 +739,28 @@ def simulate_upturn():
 @app.route('/api/demo/start', methods=['POST'])
 def start_demo_stock():
     """Start continuous DEMO stock updates"""
-    global demo_thread, demo_active
-
+    lease_token = None
     try:
-        if demo_active:
-            return jsonify({'success': False, 'message': 'Demo stock already running'})
+        lease_token = demo_lease.acquire()
+        if not lease_token:
+            return jsonify({'success': False, 'message': f'Demo stock already running on {demo_lease.holder()}'})
 
-        demo_thread = threading.Thread(target=demo_stock_updater, daemon=True)
+        demo_lease.keep_alive(lease_token)
+        demo_thread = threading.Thread(target=demo_stock_updater, args=(lease_token,), daemon=True)
         demo_thread.start()
 
         return jsonify({'success': True, 'message': 'Demo stock updates started'})
 
     except Exception as e:
+        demo_lease.release(lease_token)
         logger.error(f"Error starting demo stock: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/demo/stop', methods=['POST'])
 def stop_demo_stock():
     """Stop continuous DEMO stock updates"""
-    global demo_active
-
     try:
-        demo_active = False
+        demo_lease.revoke()
         logger.info("🛑 Stopping DEMO stock updates...")
         return jsonify({'success': True, 'message': 'Demo stock updates stopped'})
 
@@ -644,6 +858,99 @@ def get_rdi_jobs():
                 ]
             }
         },
+        'key_registry': {
+            'name': 'Key Registry Convention',
+            'description': 'Records written keys in registry:{family} sorted sets so dashboards never scan the keyspace',
+            'config': {
+                'name': 'latest-prices-registry',
+                'source': {'table': 'daily_aggregates'},
+                'transform': [
+                    {
+                        'uses': 'add_field',
+                        'with': {
+                            'field': 'registry_member',
+                            'expression': "concat('latest:', ticker)",
+                            'language': 'sql'
+                        }
+                    },
+                    {
+                        'uses': 'add_field',
+                        'with': {
+                            'field': 'registry_score',
+                            'expression': '9999999999',
+                            'language': 'sql'
+                        }
+                    }
+                ],
+                'output': [
+                    {
+                        'uses': 'redis.write',
+                        'with': {
+                            'connection': 'target',
+                            'data_type': 'sorted_set',
+                            'key': {
+                                'expression': "'registry:latest'",
+                                'language': 'sql'
+                            },
+                            'args': {
+                                'score': 'registry_score',
+                                'member': 'registry_member'
+                            }
+                        }
+                    }
+                ]
+            }
+        },
+        'leaderboards': {
+            'name': 'Top Movers Leaderboards',
+            'description': 'Scores each ticker in leaderboard:{metric} sorted sets so top-N queries never read every latest key',
+            'config': {
+                'name': 'latest-prices-leaderboards',
+                'source': {'table': 'daily_aggregates'},
+                'transform': [
+                    {
+                        'uses': 'add_field',
+                        'with': {
+                            'field': 'price_change_percent',
+                            'expression': 'round(((close - open) / open) * 100, 2)',
+                            'language': 'sql'
+                        }
+                    }
+                ],
+                'output': [
+                    {
+                        'uses': 'redis.write',
+                        'with': {
+                            'connection': 'target',
+                            'data_type': 'sorted_set',
+                            'key': {
+                                'expression': "'leaderboard:change_percent'",
+                                'language': 'sql'
+                            },
+                            'args': {
+                                'score': 'price_change_percent',
+                                'member': 'ticker'
+                            }
+                        }
+                    },
+                    {
+                        'uses': 'redis.write',
+                        'with': {
+                            'connection': 'target',
+                            'data_type': 'sorted_set',
+                            'key': {
+                                'expression': "'leaderboard:volume'",
+                                'language': 'sql'
+                            },
+                            'args': {
+                                'score': 'volume',
+                                'member': 'ticker'
+                            }
+                        }
+                    }
+                ]
+            }
+        },
         'high_volume_alerts': {
             'name': 'High Volume Trading Alerts',
             'description': 'Filters stocks with >100M volume',
@@ -679,36 +986,149 @@ def get_rdi_jobs():
 def handle_connect():
     logger.info('Client connected to unified dashboard')
     emit('status', {'message': 'Connected to Unified Stock Dashboard'})
-
-def background_monitor():
-    """Background monitoring thread"""
+    # Every client watches the whole market until it subscribes to specific tickers
+    set_client_rooms(subscriptions, [MARKET_ROOM])
+
+# Socket.IO room membership (market or ticker:{T}) and per-room stock_update deltas
+subscriptions = StockSubscriptions(redis_client, logger=logger)
+register_subscription_handlers(socketio, subscriptions)
+
+# Every worker runs its own change feed and versions deltas for its own clients,
+# so stock_update skips the message queue (ignore_queue) to avoid duplicates
+def emit_stock_changes(stocks, removed_keys):
+    """Push only the fields that changed to the rooms watching them"""
+    for room, payload in subscriptions.encode(stocks, removed_keys):
+        socketio.emit('stock_update', payload, to=room, ignore_queue=True)
+
+def emit_stock_resync():
+    """Re-read watched rooms and broadcast full snapshots after the change feed may have missed messages"""
+    for room, snapshot in subscriptions.reseed():
+        socketio.emit('stock_update', snapshot, to=room, ignore_queue=True)
+
+def emit_to_subscribers(event, payload, tickers):
+    """Emit an event once to each client (on any worker) watching the market or any of the tickers"""
+    socketio.emit(event, payload, to=subscriber_rooms(tickers))
+
+# Change feed replacing the periodic re-read of every latest:* key
+change_feed = ChangeFeedSubscriber(redis_client, emit_stock_changes, on_resync=emit_stock_resync,
+                                   key_filter=subscriptions.is_watched, logger=logger)
+
+# Scores every latest:* write, whichever tickers clients watch; runs on the market_feed_lease holder only
+anomaly_detector = AnomalyDetector()
+
+def process_market_changes(stocks, removed_keys):
+    """
+    Keep the leaderboards in step with latest:* hashes written by any process and raise
+    market_event for ticks whose return or volume is an outlier for that ticker
+    """
+    # Re-scores writes the app already scored (harmless) and catches RDI writes via keyspace notifications
+    pipe = redis_client.pipeline(transaction=False)
+    record_movers(pipe, {data.get('ticker') or data['redis_key'].split(':', 1)[1]: data for data in stocks})
+    remove_movers(pipe, [key.split(':', 1)[1] for key in removed_keys])
+    pipe.execute()
+
+    if config.anomaly_detection_enabled:
+        for alert in anomaly_detector.observe_stocks(stocks):
+            logger.warning(f"Market anomaly: {alert['message']}")
+            emit_to_subscribers('market_event', alert, alert['tickers'])
+
+market_feed = ChangeFeedSubscriber(redis_client, process_market_changes, logger=logger)
+
+def market_feed_runner():
+    """Run the market feed on whichever worker holds market_feed_lease, taking over when its holder dies"""
+    interval = market_feed_lease.ttl_ms / 3000
     while True:
         try:
-            # Monitor Redis and emit updates
-            stocks = []
-            latest_keys = redis_client.keys('latest:*')
-            
-            for key in latest_keys:
-                data = redis_client.hgetall(key)
-                if data:
-                    data['redis_key'] = key
-                    stocks.append(data)
-            
-            if stocks:
-                socketio.emit('stock_update', {'stocks': stocks})
-            
-            time.sleep(5)  # Update every 5 seconds
-            
+            lease_token = market_feed_lease.acquire()
+            if lease_token:
+                logger.info("Market feed (leaderboards, anomaly detection) running on this worker")
+                market_feed.start()
+                try:
+                    while market_feed_lease.renew(lease_token):
+                        time.sleep(interval)
+                finally:
+                    market_feed.stop()
+                    market_feed_lease.release(lease_token)
         except Exception as e:
-            logger.error(f"Background monitor error: {e}")
-            time.sleep(10)
+            logger.error(f"Market feed error: {e}")
+        time.sleep(interval)
+
+# Each worker LISTENs itself (its cache must be invalidated too), so these emits
+# also skip the message queue
+def emit_daily_aggregate_changes(changes):
+    """Invalidate cached responses and tell clients watching the changed tickers to refresh"""
+    daily_aggregates_cache.invalidate()
+    chart_cache.invalidate()
+    tickers = sorted({change['ticker'] for change in changes if change.get('ticker')})
+    # A TRUNCATE touches every ticker
+    rooms = None if any(change['op'] == 'TRUNCATE' for change in changes) else subscriber_rooms(tickers)
+    socketio.emit('daily_aggregates_update', {'changes': changes, 'tickers': tickers},
+                  to=rooms, ignore_queue=True)
+    emit_indicator_updates(lambda: indicator_engine.apply_changes(changes))
+
+def emit_daily_aggregates_resync():
+    """Invalidate cached responses and have every client refresh after notifications may have been missed"""
+    daily_aggregates_cache.invalidate()
+    chart_cache.invalidate()
+    socketio.emit('daily_aggregates_update', {'changes': [], 'tickers': [], 'resync': True}, ignore_queue=True)
+    emit_indicator_updates(indicator_engine.rebuild_all)
+
+def emit_indicator_updates(compute):
+    """Carry indicators forward and send the new values to clients watching those tickers"""
+    # Every worker applies the same bars; reapplying a bar is a no-op, so this stays idempotent
+    try:
+        updated = {ticker: values for ticker, values in compute().items() if values is not None}
+    except Exception as e:
+        logger.warning(f"Could not update indicators: {e}")
+        return
+    for ticker, values in updated.items():
+        socketio.emit('indicators_update', {'ticker': ticker, 'indicators': values},
+                      to=subscriber_rooms([ticker]), ignore_queue=True)
+
+# Row changes written to daily_aggregates by any process, replacing PostgreSQL polling
+pg_change_feed = PostgresChangeFeed(emit_daily_aggregate_changes, on_resync=emit_daily_aggregates_resync,
+                                    logger=logger)
+
+# Held while one worker runs the one-off startup maintenance so workers starting with it skip it
+maintenance_lease = FleetLease(redis_client, 'unified:startup_maintenance', ttl_seconds=600)
+
+def start_background_services():
+    """Start this worker's background work (called once per worker process)"""
+    # Start background health probes for /healthz
+    health_monitor.start()
+
+    maintenance_token = maintenance_lease.acquire()
+    if maintenance_token:
+        try:
+            # Bootstrap key registries once for keys written before writers maintained them
+            ensure_registries(redis_client, list(KEY_FAMILY_PATTERNS))
+
+            # Tick history now lives in capped streams; drop the old per-tick live:demo:* hashes
+            purge_legacy_tick_keys(redis_client)
+
+            # Score latest:* hashes written before writers maintained the leaderboards
+            rebuild_leaderboards(redis_client, read_latest_stocks(redis_client))
+
+            # Announce daily_aggregates writes on the Postgres change feed
+            if config.pg_change_feed_enabled:
+                try:
+                    with db_pool.connection() as conn:
+                        install_notify_trigger(conn, logger)
+                except Exception as e:
+                    logger.warning(f"Could not install daily_aggregates NOTIFY triggers: {e}")
+        finally:
+            maintenance_lease.release(maintenance_token)
+
+    # Push Redis changes to dashboards as producers publish them
+    change_feed.start()
+    if config.pg_change_feed_enabled:
+        pg_change_feed.start()
+    threading.Thread(target=market_feed_runner, name='market-feed', daemon=True).start()
 
 if __name__ == '__main__':
     logger.info("Starting Unified Stock Dashboard...")
     logger.info("Access the dashboard at: http://localhost:9999")
 
-    # Start background monitoring - TEMPORARILY DISABLED FOR DEBUGGING
-    # monitor_thread = threading.Thread(target=background_monitor, daemon=True)
-    # monitor_thread.start()
+    start_background_services()
 
     socketio.run(app, host='0.0.0.0', port=9999, debug=True)